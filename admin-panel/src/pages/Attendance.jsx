@@ -2,22 +2,33 @@ import { useEffect, useState } from "react";
 import API from "../api";
 import {
   Table, TableBody, TableCell,
-  TableHead, TableRow
+  TableHead, TableRow, Button
 } from "@mui/material";
 
 export default function Attendance() {
 
   const [records, setRecords] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
+    loadPage();
+  }, []);
 
-    API.get("/attendance")
-      .then(res => setRecords(res.data));
 
-  }, []);
+  function loadPage(cursor = null) {
+
+    API.get("/attendance", { params: cursor ? { cursor } : {} })
+      .then(res => {
+        setRecords(prev => cursor ? [...prev, ...res.data] : res.data);
+        setNextCursor(res.headers["x-next-cursor"] || null);
+      });
+
+  }
 
   return (
 
+    <>
+
     <Table>
 
       <TableHead>
@@ -58,5 +69,13 @@ export default function Attendance() {
 
     </Table>
 
+    {nextCursor && (
+      <Button onClick={() => loadPage(nextCursor)}>
+        Load more
+      </Button>
+    )}
+
+    </>
+
   );
 }
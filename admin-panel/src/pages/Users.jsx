@@ -22,6 +22,7 @@ import CloseIcon from "@mui/icons-material/Close";
 export default function Users() {
 
   const [users, setUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [faces, setFaces] = useState({});
   const faceInputRefs = useRef({});
 
@@ -36,9 +37,12 @@ export default function Users() {
   }, [users]);
 
 
-  function loadUsers() {
-    API.get("/users")
-      .then(res => setUsers(res.data));
+  function loadUsers(cursor = null) {
+    API.get("/users", { params: cursor ? { cursor } : {} })
+      .then(res => {
+        setUsers(prev => cursor ? [...prev, ...res.data] : res.data);
+        setNextCursor(res.headers["x-next-cursor"] || null);
+      });
   }
 
 
@@ -143,6 +147,8 @@ export default function Users() {
 
   return (
 
+    <>
+
     <Table>
 
       <TableHead>
@@ -204,7 +210,7 @@ export default function Users() {
                         </IconButton>
 
                         <Avatar
-                          src={`${src}?t=${Date.now()}`}
+                          src={`${src}&size=96`}
                           sx={{ width: 50, height: 50 }}
                           onClick={() =>
                             faceInputRefs.current[refKey]?.click()
@@ -322,5 +328,13 @@ export default function Users() {
 
     </Table>
 
+    {nextCursor && (
+      <Button onClick={() => loadUsers(nextCursor)}>
+        Load more
+      </Button>
+    )}
+
+    </>
+
   );
 }
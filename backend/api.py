@@ -1,26 +1,65 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Request, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, date, timezone
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 
+import csv
+import hmac
+import io
+import json
 import os
 import shutil
+import time
 import traceback
 
-from bot.database import SessionLocal
-from bot.models import User, Attendance
+from bot.database import SessionLocal, AsyncSessionLocal
+from bot.migrations import upgrade as migrate
+from bot.models import User, Attendance, DailyAttendanceStats, FaceJob, AuditEvent
 from bot.config import (
     ALLOWED_MIME_TYPES,
     MAX_UPLOAD_SIZE_BYTES,
+    BOT_MODE,
+    WEBHOOK_IN_API,
+    STATE_PURGE_MINUTES,
+    TEMP_SWEEP_MINUTES,
+    METRICS_TOKEN,
+)
+from bot.face import (
+    FaceAnalysis,
+    analyze_face,
+    save_image,
+    validate_face_image,
+    cache_reference_embedding,
+    drop_reference_embeddings,
 )
-from bot.face import validate_face_image
 from bot.logging_config import get_app_logger, get_security_logger
+from bot.metrics import CONTENT_TYPE, registry, query_scope
 from bot.rate_limiter import login_limiter
+from bot.rollup import remove_user as remove_user_from_rollup, work_seconds
+from bot.scheduler import scheduler, add_default_jobs
+from bot.user_cache import bump_users_version
 from backend.auth_config import ADMIN_USERNAME, ADMIN_PASSWORD
-from backend.auth import create_token, verify_token
-from sqlalchemy import func
+from backend.auth import create_token, security, verify_token
+from backend.bulk_import import ManifestError, import_users
+from backend.jobs import (
+    PENDING, JobQueueFull, analysis_pool, fail_interrupted_jobs, job_status, runner, sweep_staging,
+)
+from backend.thumbnails import face_image_response, image_version, invalidate_thumbnails, sweep_thumbnails
+from backend.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    TOTAL_COUNT_HEADER,
+    decode_cursor,
+    paginate,
+    prefix_range,
+)
+from sqlalchemy import func, case, select
 
 log = get_app_logger("api")
 sec_log = get_security_logger()
@@ -43,7 +82,22 @@ class MessageResponse(BaseModel):
 
 
 # ---------- APP ----------
-app = FastAPI(title="Attendance Admin API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    migrate()
+    fail_interrupted_jobs()
+
+    add_default_jobs()
+    scheduler.every("upload_staging_sweep", TEMP_SWEEP_MINUTES * 60, sweep_staging)
+    scheduler.every("thumbnail_sweep", TEMP_SWEEP_MINUTES * 60, sweep_thumbnails)
+    if BOT_MODE == "webhook" and WEBHOOK_IN_API:
+        from bot.handlers import purge_states
+        scheduler.every("state_purge", STATE_PURGE_MINUTES * 60, purge_states)
+    scheduler.start()
+    yield
+
+
+app = FastAPI(title="Attendance Admin API", lifespan=lifespan)
 
 
 # ---------- Global exception handler ----------
@@ -68,16 +122,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
 
+# ---------- Telegram webhook (optional) ----------
+if BOT_MODE == "webhook" and WEBHOOK_IN_API:
+    from bot.webhook import require_secret, router as telegram_router
+    require_secret()
+    app.include_router(telegram_router)
+
+
+# ---------- Metrics ----------
+REQUEST_SECONDS = registry.histogram(
+    "api_request_seconds", "Admin API latency per route", ("method", "route", "status"))
+REQUEST_QUERIES = registry.histogram(
+    "api_db_queries", "SQL statements per admin API request", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+RATE_LIMITED = registry.counter(
+    "api_rate_limited_total", "Requests rejected by a rate limiter", ("limiter",))
+
+
+@app.middleware("http")
+async def record_metrics(request, call_next):
+    started = time.perf_counter()
+    status = 500
+    with query_scope() as queries:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Route template, not the raw path, so /users/{user_id} stays one series
+            route = request.scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.labels(request.method, path, str(status)).observe(time.perf_counter() - started)
+            REQUEST_QUERIES.labels(request.method, path).observe(queries.value)
+
+
 @app.middleware("http")
 async def disable_cache(request, call_next):
     response = await call_next(request)
-    response.headers["Cache-Control"] = "no-store"
+    # Routes that manage their own caching (face images) set Cache-Control themselves
+    if "cache-control" not in response.headers:
+        response.headers["Cache-Control"] = "no-store"
     return response
 
 
 # ---------- DATABASE ----------
+async def get_async_db():
+    """Async session for read-only endpoints."""
+    async with AsyncSessionLocal()() as db:
+        yield db
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -104,75 +201,98 @@ def _validate_upload(file: UploadFile) -> None:
         raise HTTPException(400, f"File too large ({size} bytes). Max {MAX_UPLOAD_SIZE_BYTES // (1024*1024)} MB")
 
 
-def _save_and_validate_face(file: UploadFile, dest_path: str) -> None:
-    """Save uploaded file to dest_path, downscale, validate it contains exactly 1 face.
-    Deletes the file and raises HTTPException on failure."""
-    with open(dest_path, "wb") as buf:
-        shutil.copyfileobj(file.file, buf)
-
-    from bot.face import downscale_image
-    downscale_image(dest_path)
+def _analyze_upload(data: bytes) -> FaceAnalysis:
+    """Decode and downscale an upload in memory and validate it contains exactly 1 face.
+    The detector runs once; validation and the cached embedding share its output.
+    Raises HTTPException on failure."""
+    try:
+        analysis = analyze_face(data)
+    except ValueError:
+        raise HTTPException(400, "Could not read image")
 
-    ok, reason = validate_face_image(dest_path)
+    ok, reason = validate_face_image(analysis)
     if not ok:
-        try:
-            os.remove(dest_path)
-        except OSError:
-            pass
-        log.warning("Face validation failed for %s: %s", dest_path, reason)
+        log.warning("Face validation failed: %s", reason)
         raise HTTPException(400, reason)
+    return analysis
 
 
-# ---------- DASHBOARD ----------
+def _analyze_uploads(images: list[bytes]) -> list[FaceAnalysis]:
+    """Analyze several uploads in parallel on the shared analysis pool.
+    Nothing is written; the first failure is raised."""
+    futures = [analysis_pool.submit(_analyze_upload, data) for data in images]
+    return [f.result() for f in futures]
 
-@app.get("/dashboard")
-def dashboard(admin=Depends(verify_token), db: Session = Depends(get_db)):
 
-    now = datetime.now(timezone.utc)
-    today = now.date()
+def _store_face(analysis: FaceAnalysis, dest_path: str, phone: str, index: int) -> None:
+    """Write a validated face to dest_path and cache its embedding as reference `index`."""
+    save_image(analysis.image, dest_path)
+    cache_reference_embedding(phone, index, dest_path, analysis)
+
+
+def _queue_job(kind: str, phone: str, images: list[bytes], task, user_id: int | None = None) -> JSONResponse:
+    """Hand an upload to the background runner and answer 202 with the job id."""
+    try:
+        job_id = runner.submit(kind, phone, images, task, user_id)
+    except JobQueueFull:
+        raise HTTPException(503, "Too many uploads in progress. Try again shortly.")
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": PENDING, "status_url": f"/jobs/{job_id}"},
+    )
+
 
-    total_users = db.query(User).count()
-    total_attendance = db.query(Attendance).count()
+# ---------- DASHBOARD ----------
 
-    # Today
-    today_start = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
-    today_end = today_start + timedelta(days=1)
+# Allowed trend windows (days) for /dashboard
+TREND_WINDOWS = (7, 30, 90)
 
-    today_attendance = db.query(Attendance).filter(
-        Attendance.check_in >= today_start,
-        Attendance.check_in < today_end,
-    ).count()
 
-    active_users_today = db.query(
-        func.count(func.distinct(Attendance.user_id))
-    ).filter(
-        Attendance.check_in >= today_start,
-        Attendance.check_in < today_end,
-    ).scalar()
+@app.get("/dashboard")
+async def dashboard(
+    days: int = Query(7, description="Trend window in days (7, 30 or 90)"),
+    admin=Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if days not in TREND_WINDOWS:
+        raise HTTPException(400, f"days must be one of {TREND_WINDOWS}")
+
+    today = datetime.now(timezone.utc).date()
+    week_start = today - timedelta(days=7)
+    month_start = today.replace(day=1)
+    trend_start = today - timedelta(days=days - 1)
+
+    # Query 1: summary figures from the per-day rollup (one row per day, not per check-in)
+    R = DailyAttendanceStats
+    (
+        total_users,
+        total_attendance,
+        today_attendance,
+        active_users_today,
+        weekly_attendance,
+        monthly_attendance,
+    ) = (await db.execute(select(
+        select(func.count(User.id)).scalar_subquery(),
+        func.coalesce(func.sum(R.checked_in), 0),
+        func.coalesce(func.sum(case((R.date == today, R.checked_in), else_=0)), 0),
+        func.coalesce(func.sum(case((R.date == today, R.distinct_users), else_=0)), 0),
+        func.coalesce(func.sum(case((R.date >= week_start, R.checked_in), else_=0)), 0),
+        func.coalesce(func.sum(case((R.date >= month_start, R.checked_in), else_=0)), 0),
+    ).select_from(R))).one()
 
     attendance_rate = (
         round((active_users_today / total_users) * 100, 2)
         if total_users > 0 else 0
     )
 
-    # Weekly / Monthly
-    week_start = today_start - timedelta(days=7)
-    weekly_attendance = db.query(Attendance).filter(Attendance.check_in >= week_start).count()
-
-    month_start = today_start.replace(day=1)
-    monthly_attendance = db.query(Attendance).filter(Attendance.check_in >= month_start).count()
-
-    # Last 7 days trend
+    # Query 2: rollup rows for the trend window
+    per_day = dict(
+        (await db.execute(select(R.date, R.checked_in).where(R.date >= trend_start))).all()
+    )
     trend_data = []
-    for i in range(7):
-        day = today_start - timedelta(days=i)
-        next_day = day + timedelta(days=1)
-        count = db.query(Attendance).filter(
-            Attendance.check_in >= day,
-            Attendance.check_in < next_day,
-        ).count()
-        trend_data.append({"date": day.strftime("%Y-%m-%d"), "attendance": count})
-    trend_data.reverse()
+    for i in range(days):
+        day = trend_start + timedelta(days=i)
+        trend_data.append({"date": day.strftime("%Y-%m-%d"), "attendance": per_day.get(day, 0)})
 
     return {
         "summary": {
@@ -190,10 +310,66 @@ def dashboard(admin=Depends(verify_token), db: Session = Depends(get_db)):
     }
 
 
+# Longest range /reports/daily will return in one call
+MAX_REPORT_DAYS = 366
+
+
+# ---------- DAILY REPORT ----------
+@app.get("/reports/daily")
+async def daily_report(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    admin=Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if date_to < date_from:
+        raise HTTPException(400, "'to' must not be before 'from'")
+    if (date_to - date_from).days >= MAX_REPORT_DAYS:
+        raise HTTPException(400, f"Range must be at most {MAX_REPORT_DAYS} days")
+
+    rows = {
+        r.date: r
+        for r in await db.scalars(select(DailyAttendanceStats).where(
+            DailyAttendanceStats.date >= date_from,
+            DailyAttendanceStats.date <= date_to,
+        ))
+    }
+    report = []
+    for i in range((date_to - date_from).days + 1):
+        day = date_from + timedelta(days=i)
+        r = rows.get(day)
+        checked_out = r.checked_out if r else 0
+        report.append({
+            "date": day.strftime("%Y-%m-%d"),
+            "checked_in": r.checked_in if r else 0,
+            "checked_out": checked_out,
+            "distinct_users": r.distinct_users if r else 0,
+            "avg_work_seconds": round(r.total_work_seconds / checked_out, 1) if checked_out else None,
+        })
+    return report
+
+
 # ---------- GET USERS ----------
 @app.get("/users")
-def get_users(admin=Depends(verify_token), db: Session = Depends(get_db)):
-    users = db.query(User).all()
+async def get_users(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    phone_prefix: str | None = Query(None, min_length=1),
+    include_total: bool = False,
+    admin=Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(User)
+    if phone_prefix:
+        stmt = stmt.where(prefix_range(User.phone, phone_prefix))
+
+    users = await paginate(
+        db, stmt, [User.id],
+        decode_cursor(cursor, int) if cursor else None,
+        order == "desc", limit, response, include_total,
+    )
     return [
         {
             "id": u.id,
@@ -207,12 +383,45 @@ def get_users(admin=Depends(verify_token), db: Session = Depends(get_db)):
 
 
 # ---------- CREATE USER WITH UP TO 3 FACES ----------
+def _create_user(db: Session, admin: str, name: str, phone: str, images: list[bytes]) -> dict:
+    if db.query(User).filter(User.phone == phone).first():
+        raise HTTPException(400, "User already exists")
+
+    # Every image is validated before anything is written
+    analyses = _analyze_uploads(images)
+
+    user_dir = os.path.join(REGISTERED_FACES_DIR, phone)
+    os.makedirs(user_dir, exist_ok=True)
+    try:
+        for i, analysis in enumerate(analyses, start=1):
+            _store_face(analysis, os.path.join(user_dir, f"reference_{i}.jpg"), phone, i)
+
+        user = User(
+            name=name,
+            phone=phone,
+            telegram_id=None,
+            face_registered=len(analyses),
+        )
+        db.add(user)
+        bump_users_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        shutil.rmtree(user_dir, ignore_errors=True)
+        drop_reference_embeddings(phone)
+        raise
+
+    log.info("action=user_created | admin=%s | phone=%s | faces=%d", admin, phone, len(analyses))
+    return {"message": f"User created with {len(analyses)} reference images", "user_id": user.id}
+
+
 @app.post("/users", response_model=MessageResponse)
 def create_user(
     admin=Depends(verify_token),
     name: str = Form(...),
     phone: str = Form(...),
     faces: list[UploadFile] = File(...),
+    background: bool = Query(False, description="Process faces in the background and return 202 with a job id"),
     db: Session = Depends(get_db),
 ):
     existing = db.query(User).filter(User.phone == phone).first()
@@ -222,32 +431,35 @@ def create_user(
     if len(faces) > 3:
         raise HTTPException(400, "Maximum 3 reference images allowed")
 
-    user_dir = os.path.join(REGISTERED_FACES_DIR, phone)
-    os.makedirs(user_dir, exist_ok=True)
-
-    saved_count = 0
-    for i, face in enumerate(faces, start=1):
+    for face in faces:
         _validate_upload(face)
-        face_path = os.path.join(user_dir, f"reference_{i}.jpg")
-        try:
-            _save_and_validate_face(face, face_path)
-            saved_count += 1
-        except HTTPException:
-            # Clean up all previously saved faces for this user
-            shutil.rmtree(user_dir, ignore_errors=True)
-            raise
-
-    user = User(
-        name=name,
-        phone=phone,
-        telegram_id=None,
-        face_registered=saved_count,
-    )
-    db.add(user)
-    db.commit()
+    images = [face.file.read() for face in faces]
 
-    log.info("action=user_created | admin=%s | phone=%s | faces=%d", admin, phone, saved_count)
-    return {"message": f"User created with {saved_count} reference images"}
+    if background:
+        return _queue_job(
+            "create_user", phone, images,
+            lambda job_db, job_images: _create_user(job_db, admin, name, phone, job_images),
+        )
+    return _create_user(db, admin, name, phone, images)
+
+
+# ---------- BULK IMPORT ----------
+@app.post("/users/bulk")
+def bulk_create_users(
+    manifest: UploadFile = File(..., description="CSV with name and phone columns"),
+    archive: UploadFile = File(..., description="ZIP with one folder of face images per phone"),
+    admin=Depends(verify_token),
+):
+    try:
+        result = import_users(manifest.file, archive.file)
+    except ManifestError as e:
+        raise HTTPException(400, str(e))
+
+    log.info(
+        "action=users_bulk_imported | admin=%s | created=%d | failed=%d",
+        admin, result["created"], result["failed"],
+    )
+    return result
 
 
 # ---------- DELETE USER ----------
@@ -257,6 +469,7 @@ def delete_user(user_id: int, admin=Depends(verify_token), db: Session = Depends
     if not user:
         raise HTTPException(404, "User not found")
 
+    remove_user_from_rollup(db, user_id)
     db.query(Attendance).filter(Attendance.user_id == user_id).delete()
 
     face_dir = os.path.join(REGISTERED_FACES_DIR, user.phone)
@@ -264,16 +477,54 @@ def delete_user(user_id: int, admin=Depends(verify_token), db: Session = Depends
         shutil.rmtree(face_dir)
 
     db.delete(user)
+    # The bot's cached record must not outlive the row
+    bump_users_version(db)
     db.commit()
+    # After commit: the embedding cache uses its own session and SQLite allows one writer
+    drop_reference_embeddings(user.phone)
+    invalidate_thumbnails(user.phone)
 
     log.info("action=user_deleted | admin=%s | user_id=%d | phone=%s", admin, user_id, user.phone)
     return {"message": "User deleted"}
 
 
 # ---------- GET ATTENDANCE ----------
+def _filter_attendance(stmt, date_from: date | None, date_to: date | None):
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(400, "'to' must not be before 'from'")
+    if date_from:
+        stmt = stmt.where(Attendance.date >= date_from)
+    if date_to:
+        stmt = stmt.where(Attendance.date <= date_to)
+    return stmt
+
+
 @app.get("/attendance")
-def get_attendance(admin=Depends(verify_token), db: Session = Depends(get_db)):
-    records = db.query(Attendance, User).join(User, Attendance.user_id == User.id).all()
+async def get_attendance(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    user_id: int | None = None,
+    phone_prefix: str | None = Query(None, min_length=1),
+    include_total: bool = False,
+    admin=Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(Attendance, User).join(User, Attendance.user_id == User.id)
+    stmt = _filter_attendance(stmt, date_from, date_to)
+    if user_id is not None:
+        stmt = stmt.where(Attendance.user_id == user_id)
+    if phone_prefix:
+        stmt = stmt.where(prefix_range(User.phone, phone_prefix))
+
+    records = await paginate(
+        db, stmt, [Attendance.check_in, Attendance.id],
+        decode_cursor(cursor, datetime, int) if cursor else None,
+        order == "desc", limit, response, include_total,
+    )
     return [
         {
             "id": a.id,
@@ -286,9 +537,108 @@ def get_attendance(admin=Depends(verify_token), db: Session = Depends(get_db)):
     ]
 
 
+# Rows fetched per round trip and rows per streamed chunk for /attendance/export
+EXPORT_FETCH_SIZE = 2000
+EXPORT_CHUNK_ROWS = 500
+
+EXPORT_COLUMNS = (
+    "id", "user_id", "name", "phone", "date",
+    "check_in", "check_out", "work_seconds", "lat", "lon",
+)
+
+
+def _export_rows(date_from: date, date_to: date):
+    """
+    Yield export rows as tuples, streamed from a server-side cursor.
+    Opens its own session: the response body is produced after the request's
+    dependencies have been torn down.
+    """
+    db = SessionLocal()
+    try:
+        stmt = (
+            select(
+                Attendance.id, Attendance.user_id, User.name, User.phone, Attendance.date,
+                Attendance.check_in, Attendance.check_out, Attendance.lat, Attendance.lon,
+            )
+            .join(User, Attendance.user_id == User.id)
+            .where(Attendance.date >= date_from, Attendance.date <= date_to)
+            .order_by(Attendance.date, Attendance.id)
+            .execution_options(yield_per=EXPORT_FETCH_SIZE)
+        )
+        for aid, uid, name, phone, day, check_in, check_out, lat, lon in db.execute(stmt):
+            yield (
+                aid, uid, name, phone, day.isoformat(),
+                check_in.isoformat() if check_in else None,
+                check_out.isoformat() if check_out else None,
+                round(work_seconds(check_in, check_out)) if check_in and check_out else None,
+                lat, lon,
+            )
+    finally:
+        db.close()
+
+
+def _export_csv(rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for n, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _export_ndjson(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(EXPORT_COLUMNS, row))))
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk.clear()
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+# ---------- EXPORT ATTENDANCE ----------
+@app.get("/attendance/export")
+def export_attendance(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    admin=Depends(verify_token),
+):
+    if date_to < date_from:
+        raise HTTPException(400, "'to' must not be before 'from'")
+
+    log.info("action=attendance_export | admin=%s | from=%s | to=%s | format=%s",
+             admin, date_from, date_to, format)
+
+    rows = _export_rows(date_from, date_to)
+    if format == "csv":
+        body, media_type = _export_csv(rows), "text/csv"
+    else:
+        body, media_type = _export_ndjson(rows), "application/x-ndjson"
+
+    filename = f"attendance_{date_from}_{date_to}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # ---------- GET USER FACE (first reference) ----------
 @app.get("/users/{user_id}/face")
-def get_user_face(user_id: int, admin=Depends(verify_token), db: Session = Depends(get_db)):
+def get_user_face(
+    user_id: int,
+    request: Request,
+    size: int | None = None,
+    v: str | None = None,
+    admin=Depends(verify_token),
+    db: Session = Depends(get_db),
+):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(404, "User not found")
@@ -304,7 +654,7 @@ def get_user_face(user_id: int, admin=Depends(verify_token), db: Session = Depen
     if not reference_images:
         raise HTTPException(404, "No reference images found")
 
-    return FileResponse(os.path.join(user_dir, reference_images[0]))
+    return face_image_response(request, user.phone, os.path.join(user_dir, reference_images[0]), size, v)
 
 
 # ---------- GET ALL FACES ----------
@@ -322,13 +672,34 @@ def get_all_faces(user_id: int, admin=Depends(verify_token), db: Session = Depen
         f for f in os.listdir(user_dir)
         if f.startswith("reference_") and f.endswith(".jpg")
     ])
-    return {"faces": [f"/users/{user_id}/face/{i+1}" for i in range(len(reference_images))]}
+    return {"faces": [
+        f"/users/{user_id}/face/{i}?v={image_version(os.path.join(user_dir, f'reference_{i}.jpg'))}"
+        for i in range(1, len(reference_images) + 1)
+    ]}
 
 
 # ---------- USER ATTENDANCE ----------
 @app.get("/users/{user_id}/attendance")
-def get_user_attendance(user_id: int, admin=Depends(verify_token), db: Session = Depends(get_db)):
-    records = db.query(Attendance).filter(Attendance.user_id == user_id).all()
+async def get_user_attendance(
+    user_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    include_total: bool = False,
+    admin=Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(Attendance).where(Attendance.user_id == user_id)
+    stmt = _filter_attendance(stmt, date_from, date_to)
+
+    records = await paginate(
+        db, stmt, [Attendance.check_in, Attendance.id],
+        decode_cursor(cursor, datetime, int) if cursor else None,
+        order == "desc", limit, response, include_total,
+    )
     return [
         {
             "id": r.id,
@@ -342,10 +713,47 @@ def get_user_attendance(user_id: int, admin=Depends(verify_token), db: Session =
 
 
 # ---------- ADD FACE ----------
+def _existing_references(user_dir: str) -> list[str]:
+    if not os.path.isdir(user_dir):
+        return []
+    return sorted([
+        f for f in os.listdir(user_dir)
+        if f.startswith("reference_") and f.endswith(".jpg")
+    ])
+
+
+def _add_face(db: Session, admin: str, user_id: int, image: bytes) -> dict:
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(404, "User not found")
+
+    user_dir = os.path.join(REGISTERED_FACES_DIR, user.phone)
+    if len(_existing_references(user_dir)) >= 3:
+        raise HTTPException(400, "Maximum 3 reference images allowed")
+
+    analysis = _analyze_upload(image)
+
+    os.makedirs(user_dir, exist_ok=True)
+    next_index = len(_existing_references(user_dir)) + 1
+    if next_index > 3:
+        raise HTTPException(400, "Maximum 3 reference images allowed")
+    face_path = os.path.join(user_dir, f"reference_{next_index}.jpg")
+    _store_face(analysis, face_path, user.phone, next_index)
+
+    user.face_registered = next_index
+    bump_users_version(db)
+    db.commit()
+    invalidate_thumbnails(user.phone)
+
+    log.info("action=face_added | admin=%s | user_id=%d | index=%d", admin, user_id, next_index)
+    return {"message": f"Reference image {next_index} saved", "user_id": user_id}
+
+
 @app.post("/users/{user_id}/face", response_model=MessageResponse)
 def add_face(
     user_id: int,
     face: UploadFile = File(...),
+    background: bool = Query(False, description="Process the face in the background and return 202 with a job id"),
     admin=Depends(verify_token),
     db: Session = Depends(get_db),
 ):
@@ -355,25 +763,17 @@ def add_face(
 
     _validate_upload(face)
 
-    user_dir = os.path.join(REGISTERED_FACES_DIR, user.phone)
-    os.makedirs(user_dir, exist_ok=True)
-
-    existing = sorted([
-        f for f in os.listdir(user_dir)
-        if f.startswith("reference_") and f.endswith(".jpg")
-    ])
-    if len(existing) >= 3:
+    if len(_existing_references(os.path.join(REGISTERED_FACES_DIR, user.phone))) >= 3:
         raise HTTPException(400, "Maximum 3 reference images allowed")
 
-    next_index = len(existing) + 1
-    face_path = os.path.join(user_dir, f"reference_{next_index}.jpg")
-    _save_and_validate_face(face, face_path)
-
-    user.face_registered = next_index
-    db.commit()
-
-    log.info("action=face_added | admin=%s | user_id=%d | index=%d", admin, user_id, next_index)
-    return {"message": f"Reference image {next_index} saved"}
+    image = face.file.read()
+    if background:
+        return _queue_job(
+            "add_face", user.phone, [image],
+            lambda job_db, job_images: _add_face(job_db, admin, user_id, job_images[0]),
+            user_id=user_id,
+        )
+    return _add_face(db, admin, user_id, image)
 
 
 # ---------- GET FACE BY INDEX ----------
@@ -381,6 +781,9 @@ def add_face(
 def get_face_by_index(
     user_id: int,
     index: int,
+    request: Request,
+    size: int | None = None,
+    v: str | None = None,
     # admin=Depends(verify_token),
     db: Session = Depends(get_db),
 ):
@@ -395,15 +798,34 @@ def get_face_by_index(
     if not os.path.exists(face_path):
         raise HTTPException(404, "Face not found")
 
-    return FileResponse(face_path)
+    return face_image_response(request, user.phone, face_path, size, v)
 
 
 # ---------- UPDATE FACE BY INDEX ----------
+def _update_face(db: Session, admin: str, user_id: int, index: int, image: bytes) -> dict:
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(404, "User not found")
+
+    analysis = _analyze_upload(image)
+
+    face_path = os.path.join(REGISTERED_FACES_DIR, user.phone, f"reference_{index}.jpg")
+    if not os.path.exists(face_path):
+        raise HTTPException(404, f"Face {index} does not exist")
+
+    _store_face(analysis, face_path, user.phone, index)
+    invalidate_thumbnails(user.phone)
+
+    log.info("action=face_updated | admin=%s | user_id=%d | index=%d", admin, user_id, index)
+    return {"message": f"Face {index} updated successfully", "user_id": user_id}
+
+
 @app.put("/users/{user_id}/face/{index}", response_model=MessageResponse)
 def update_face_by_index(
     user_id: int,
     index: int,
     face: UploadFile = File(...),
+    background: bool = Query(False, description="Process the face in the background and return 202 with a job id"),
     admin=Depends(verify_token),
     db: Session = Depends(get_db),
 ):
@@ -420,10 +842,78 @@ def update_face_by_index(
     if not os.path.exists(face_path):
         raise HTTPException(404, f"Face {index} does not exist")
 
-    _save_and_validate_face(face, face_path)
+    image = face.file.read()
+    if background:
+        return _queue_job(
+            "update_face", user.phone, [image],
+            lambda job_db, job_images: _update_face(job_db, admin, user_id, index, job_images[0]),
+            user_id=user_id,
+        )
+    return _update_face(db, admin, user_id, index, image)
+
+
+# ---------- JOB STATUS ----------
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, admin=Depends(verify_token), db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(FaceJob, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job_status(job)
+
+
+# ---------- AUDIT LOG ----------
+@app.get("/audit")
+async def get_audit_events(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    action: str | None = None,
+    phone: str | None = None,
+    telegram_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    include_total: bool = False,
+    admin=Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Security events, newest first (AUDIT_SINK=db)."""
+    stmt = select(AuditEvent)
+    if action:
+        stmt = stmt.where(AuditEvent.action == action)
+    if phone:
+        stmt = stmt.where(AuditEvent.phone == phone)
+    if telegram_id:
+        stmt = stmt.where(AuditEvent.telegram_id == telegram_id)
+    # Stored as UTC; naive bounds are taken as UTC
+    if since is not None:
+        stmt = stmt.where(AuditEvent.created_at >= _as_utc(since))
+    if until is not None:
+        stmt = stmt.where(AuditEvent.created_at < _as_utc(until))
+
+    events = await paginate(
+        db, stmt, [AuditEvent.created_at, AuditEvent.id],
+        decode_cursor(cursor, datetime, int) if cursor else None,
+        True, limit, response, include_total,
+    )
+    return [
+        {
+            "id": e.id,
+            "created_at": e.created_at,
+            "level": e.level,
+            "action": e.action,
+            "telegram_id": e.telegram_id,
+            "phone": e.phone,
+            "ip": e.ip,
+            "details": json.loads(e.details) if e.details else {},
+        }
+        for e in events
+    ]
+
 
-    log.info("action=face_updated | admin=%s | user_id=%d | index=%d", admin, user_id, index)
-    return {"message": f"Face {index} updated successfully"}
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
 
 
 # ---------- DELETE FACE BY INDEX ----------
@@ -447,6 +937,7 @@ def delete_face_by_index(
         raise HTTPException(404, f"Face {index} does not exist")
 
     os.remove(face_path)
+    drop_reference_embeddings(user.phone, index)
 
     remaining = sorted([
         f for f in os.listdir(user_dir)
@@ -459,26 +950,47 @@ def delete_face_by_index(
             os.rename(old, new)
 
     user.face_registered = len(remaining)
+    bump_users_version(db)
     db.commit()
+    invalidate_thumbnails(user.phone)
 
     log.info("action=face_deleted | admin=%s | user_id=%d | index=%d | remaining=%d", admin, user_id, index, len(remaining))
     return {"message": f"Face {index} deleted. {len(remaining)} face(s) remaining."}
 
 
+# ---------- METRICS ----------
+@app.get("/metrics", include_in_schema=False)
+def metrics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Prometheus text exposition. Needs `Authorization: Bearer METRICS_TOKEN`
+    or, when no METRICS_TOKEN is set (or another one is sent), an admin token.
+    """
+    scraper = METRICS_TOKEN and hmac.compare_digest(
+        credentials.credentials.encode(), METRICS_TOKEN.encode()
+    )
+    if not scraper:
+        verify_token(credentials)
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 # ---------- LOGIN ----------
 @app.post("/login")
 def login(data: LoginRequest, request: Request):
     client_ip = request.client.host if request.client else "unknown"
 
-    if not login_limiter.is_allowed(client_ip):
+    # Every attempt takes a slot up front, so concurrent requests (or other
+    # workers sharing the limiter) cannot all pass a separate check; a
+    # successful login gives its slot back below
+    if not login_limiter.hit(client_ip):
+        RATE_LIMITED.labels("login").inc()
         sec_log.warning("action=login_rate_limit | ip=%s", client_ip)
         raise HTTPException(429, "Too many login attempts. Try again later.")
 
     if data.username != ADMIN_USERNAME or data.password != ADMIN_PASSWORD:
-        login_limiter.record(client_ip)
         sec_log.warning("action=login_failed | ip=%s | username=%s", client_ip, data.username)
         raise HTTPException(401, "Invalid credentials")
 
+    login_limiter.refund(client_ip)
     token = create_token(data.username)
     sec_log.info("action=login_success | ip=%s | username=%s", client_ip, data.username)
     return {"access_token": token, "token_type": "bearer"}
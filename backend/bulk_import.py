@@ -0,0 +1,349 @@
+"""
+Bulk user + face import.
+
+Input is a CSV manifest with `name` and `phone` columns and a ZIP holding each
+user's reference images in a folder named after their phone number:
+
+    5550001/front.jpg
+    5550001/left.jpg
+    5550002/a.png
+    ...
+
+Archive entries are read one at a time from the ZIP's central directory, so
+the archive is never extracted or held in memory as a whole. Faces are
+validated on a process pool with a bounded number of images in flight; rows
+are finalized in manifest order and users are inserted BULK_BATCH_SIZE per
+transaction. Every row ends up in the returned report as created or failed.
+
+Used by POST /users/bulk and from the command line:
+
+    python -m backend.bulk_import manifest.csv faces.zip [--workers N] [--report out.json]
+"""
+
+import argparse
+import csv
+import dataclasses
+import io
+import json
+import multiprocessing
+import os
+import posixpath
+import shutil
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from bot.config import MAX_UPLOAD_SIZE_BYTES, BULK_IMPORT_WORKERS, BULK_BATCH_SIZE
+from bot.database import SessionLocal
+from bot.face import (
+    FACES_DIR,
+    FaceAnalysis,
+    analyze_face,
+    validate_face_image,
+    save_image,
+    cache_reference_embedding,
+    drop_reference_embeddings,
+)
+from bot.models import User
+from bot.user_cache import bump_users_version
+from bot.logging_config import get_app_logger
+
+log = get_app_logger("bulk_import")
+
+MAX_FACES_PER_USER = 3
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class ManifestError(ValueError):
+    """The manifest or archive is unusable as a whole (not a per-row failure)."""
+
+
+@dataclasses.dataclass(slots=True)
+class _Row:
+    line: int
+    name: str
+    phone: str
+    entries: list[zipfile.ZipInfo]
+    futures: list[Future] = dataclasses.field(default_factory=list)
+    error: str | None = None
+
+
+# ── Worker side ────────────────────────────────────────────────
+
+def _check_face(data: bytes) -> tuple[bool, str, FaceAnalysis | None]:
+    """Runs in a pool process: analyze and validate one image."""
+    try:
+        analysis = analyze_face(data)
+    except ValueError:
+        return False, "Could not read image", None
+    ok, reason = validate_face_image(analysis)
+    if not ok:
+        return False, reason, None
+    # The crop is only needed for the embedding, which is already computed
+    return True, "", dataclasses.replace(analysis, crop=None)
+
+
+# ── Input parsing ──────────────────────────────────────────────
+
+def read_manifest(stream) -> list[tuple[int, str, str]]:
+    """Parse the CSV manifest into (line, name, phone) tuples."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        fields = {f.strip().lower() for f in reader.fieldnames or []}
+        if not {"name", "phone"} <= fields:
+            raise ManifestError("Manifest must have 'name' and 'phone' columns")
+
+        rows = []
+        for record in reader:
+            record = {k.strip().lower(): (v or "").strip() for k, v in record.items() if k}
+            rows.append((reader.line_num, record.get("name", ""), record.get("phone", "")))
+        return rows
+    except UnicodeDecodeError:
+        raise ManifestError("Manifest must be UTF-8 encoded CSV")
+    finally:
+        text.detach()  # leave the caller's stream open
+
+
+def index_archive(archive: zipfile.ZipFile) -> dict[str, list[zipfile.ZipInfo]]:
+    """Group image entries by their parent folder (the phone), without reading any data."""
+    by_phone: dict[str, list[zipfile.ZipInfo]] = {}
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        name = info.filename
+        base = posixpath.basename(name)
+        if name.startswith("__MACOSX/") or base.startswith(".") or not base.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        phone = posixpath.basename(posixpath.dirname(name))
+        if phone:
+            by_phone.setdefault(phone, []).append(info)
+    for entries in by_phone.values():
+        entries.sort(key=lambda i: i.filename)
+    return by_phone
+
+
+# ── Import ─────────────────────────────────────────────────────
+
+class _Importer:
+
+    def __init__(self, archive: zipfile.ZipFile, workers: int, batch_size: int):
+        self.archive = archive
+        self.batch_size = batch_size
+        self.report: list[dict] = []
+        self._batch: list[tuple[_Row, int]] = []   # (row, faces written) awaiting commit
+        self._db = SessionLocal()
+        self._pool = None
+        self.max_in_flight = 1
+        if workers > 0:
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            self.max_in_flight = workers * 4
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        self._db.close()
+
+    def _submit(self, data: bytes) -> Future:
+        if self._pool is not None:
+            return self._pool.submit(_check_face, data)
+        future: Future = Future()
+        future.set_result(_check_face(data))
+        return future
+
+    def run(self, rows: list[_Row]) -> list[dict]:
+        pending: deque[_Row] = deque()
+        in_flight = 0
+        for row in rows:
+            if row.error is None:
+                for info in row.entries:
+                    with self.archive.open(info) as f:
+                        row.futures.append(self._submit(f.read()))
+                in_flight += len(row.futures)
+            pending.append(row)
+
+            # Finalize in manifest order once too many images are outstanding
+            while pending and in_flight >= self.max_in_flight:
+                done = pending.popleft()
+                in_flight -= len(done.futures)
+                self._finalize(done)
+
+        while pending:
+            self._finalize(pending.popleft())
+        self._commit()
+        return self.report
+
+    def _finalize(self, row: _Row) -> None:
+        if row.error is None:
+            analyses = []
+            for info, future in zip(row.entries, row.futures):
+                try:
+                    ok, reason, analysis = future.result()
+                except Exception as e:
+                    ok, reason = False, f"Face check failed: {e}"
+                if not ok:
+                    row.error = f"{posixpath.basename(info.filename)}: {reason}"
+                    break
+                analyses.append(analysis)
+            row.futures.clear()
+
+        if row.error is not None:
+            self._record(row, "failed")
+            return
+
+        user_dir = os.path.join(FACES_DIR, row.phone)
+        try:
+            os.makedirs(user_dir, exist_ok=True)
+            for i, analysis in enumerate(analyses, start=1):
+                path = os.path.join(user_dir, f"reference_{i}.jpg")
+                save_image(analysis.image, path)
+                cache_reference_embedding(row.phone, i, path, analysis)
+        except OSError as e:
+            log.error("Could not store faces for %s: %s", row.phone, e)
+            row.error = "Could not store face images"
+            self._discard_faces(row)
+            self._record(row, "failed")
+            return
+
+        self._db.add(User(name=row.name, phone=row.phone, telegram_id=None, face_registered=len(analyses)))
+        self._batch.append((row, len(analyses)))
+        if len(self._batch) >= self.batch_size:
+            self._commit()
+
+    def _commit(self) -> None:
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        try:
+            bump_users_version(self._db)
+            self._db.commit()
+        except IntegrityError:
+            # Someone created one of these phones meanwhile: retry row by row
+            self._db.rollback()
+            for row, faces in batch:
+                try:
+                    self._db.add(User(name=row.name, phone=row.phone, telegram_id=None, face_registered=faces))
+                    bump_users_version(self._db)
+                    self._db.commit()
+                except IntegrityError:
+                    self._db.rollback()
+                    row.error = "User already exists"
+                    self._discard_faces(row)
+                    self._record(row, "failed")
+                else:
+                    self._record(row, "created", faces)
+            return
+        for row, faces in batch:
+            self._record(row, "created", faces)
+
+    @staticmethod
+    def _discard_faces(row: _Row) -> None:
+        shutil.rmtree(os.path.join(FACES_DIR, row.phone), ignore_errors=True)
+        drop_reference_embeddings(row.phone)
+
+    def _record(self, row: _Row, status: str, faces: int = 0) -> None:
+        self.report.append({
+            "line": row.line,
+            "name": row.name,
+            "phone": row.phone,
+            "status": status,
+            "faces": faces,
+            "error": row.error,
+        })
+
+
+def import_users(manifest, archive_file, workers: int = BULK_IMPORT_WORKERS,
+                 batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """
+    Import users from a manifest stream and a seekable ZIP file object.
+    Returns {"created": n, "failed": n, "rows": [per-row report]}.
+    Raises ManifestError if either input is unusable.
+    """
+    try:
+        archive = zipfile.ZipFile(archive_file)
+    except zipfile.BadZipFile:
+        raise ManifestError("Archive is not a valid ZIP file")
+
+    with archive:
+        by_phone = index_archive(archive)
+        parsed = read_manifest(manifest)
+
+        rows: list[_Row] = []
+        seen: set[str] = set()
+        for line, name, phone in parsed:
+            row = _Row(line=line, name=name, phone=phone, entries=by_phone.get(phone, []))
+            if not name or not phone:
+                row.error = "Missing name or phone"
+            elif posixpath.basename(phone) != phone or os.sep in phone or phone in (".", ".."):
+                row.error = "Invalid phone"
+            elif phone in seen:
+                row.error = "Duplicate phone in manifest"
+            elif not row.entries:
+                row.error = "No face images in archive"
+            elif len(row.entries) > MAX_FACES_PER_USER:
+                row.error = f"More than {MAX_FACES_PER_USER} face images"
+            elif any(info.file_size > MAX_UPLOAD_SIZE_BYTES for info in row.entries):
+                row.error = f"Image larger than {MAX_UPLOAD_SIZE_BYTES // (1024 * 1024)} MB"
+            seen.add(phone)
+            rows.append(row)
+
+        # One IN query per chunk instead of one lookup per row
+        db = SessionLocal()
+        try:
+            phones = [r.phone for r in rows if r.error is None]
+            existing: set[str] = set()
+            for i in range(0, len(phones), 500):
+                existing.update(
+                    p for (p,) in db.query(User.phone).filter(User.phone.in_(phones[i:i + 500]))
+                )
+        finally:
+            db.close()
+        for row in rows:
+            if row.error is None and row.phone in existing:
+                row.error = "User already exists"
+
+        importer = _Importer(archive, workers, batch_size)
+        try:
+            report = importer.run(rows)
+        finally:
+            importer.close()
+
+    report.sort(key=lambda r: r["line"])
+    created = sum(1 for r in report if r["status"] == "created")
+    log.info("Bulk import finished: %d created, %d failed", created, len(report) - created)
+    return {"created": created, "failed": len(report) - created, "rows": report}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import users and reference faces in bulk.")
+    parser.add_argument("manifest", help="CSV file with name and phone columns")
+    parser.add_argument("archive", help="ZIP with one folder of face images per phone")
+    parser.add_argument("--workers", type=int, default=BULK_IMPORT_WORKERS,
+                        help="face validation processes (0 = run inline)")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    parser.add_argument("--report", help="write the per-row report as JSON to this file")
+    args = parser.parse_args()
+
+    with open(args.manifest, "rb") as manifest, open(args.archive, "rb") as archive:
+        try:
+            result = import_users(manifest, archive, args.workers, args.batch_size)
+        except ManifestError as e:
+            sys.exit(f"error: {e}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(result, f, indent=2)
+    for row in result["rows"]:
+        if row["status"] == "failed":
+            print(f"line {row['line']} ({row['phone']}): {row['error']}")
+    print(f"{result['created']} created, {result['failed']} failed")
+
+
+# Guarded: validation workers are spawned and re-import this module
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Background processing of face uploads.
+
+With ?background=true the upload endpoints stage the raw files under
+UPLOAD_STAGING_DIR, record a FaceJob row and answer 202 with its id. A fixed
+pool of UPLOAD_WORKERS threads runs detection and writes the outcome back to
+the row, which GET /jobs/{id} reports. At most UPLOAD_QUEUE_SIZE jobs can be
+queued or running; past that submit() raises JobQueueFull and the endpoint
+answers 503, so a burst of uploads waits on disk rather than in memory.
+
+`analysis_pool` caps how many images are decoded and run through the detector
+at once across the whole API, for synchronous and background uploads alike.
+
+Jobs live in the process that queued them. Each row records that process as
+its owner, so with several API workers a starting worker only fails jobs
+whose owner process is gone (or that have been in flight implausibly long)
+and leaves the other workers' jobs and staged files alone.
+"""
+
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from bot.config import (
+    UPLOAD_WORKERS,
+    UPLOAD_QUEUE_SIZE,
+    UPLOAD_ANALYSIS_WORKERS,
+    UPLOAD_STAGING_DIR,
+    TEMP_FILE_MAX_AGE_HOURS,
+)
+from bot.database import SessionLocal
+from bot.models import FaceJob
+from bot.logging_config import get_app_logger
+
+log = get_app_logger("jobs")
+
+PENDING, RUNNING, SUCCEEDED, FAILED = "pending", "running", "succeeded", "failed"
+
+# This process, as recorded in face_jobs.owner
+HOST = socket.gethostname()[:30]
+OWNER = f"{HOST}:{os.getpid()}:{uuid.uuid4().hex[:16]}"
+
+analysis_pool = ThreadPoolExecutor(
+    max_workers=UPLOAD_ANALYSIS_WORKERS, thread_name_prefix="face-analyze"
+)
+
+# A job body: (session, raw image bytes) -> JSON-serializable result
+Task = Callable[[Session, list[bytes]], dict]
+
+
+class JobQueueFull(Exception):
+    """Raised by JobRunner.submit when UPLOAD_QUEUE_SIZE jobs are already in flight."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _update(job_id: str, **fields) -> None:
+    db = SessionLocal()
+    try:
+        db.query(FaceJob).filter(FaceJob.id == job_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+
+class JobRunner:
+
+    def __init__(self, workers: int, queue_size: int):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="face-job")
+        self._slots = threading.BoundedSemaphore(queue_size)
+
+    def submit(self, kind: str, phone: str, files: list[bytes], task: Task,
+               user_id: int | None = None) -> str:
+        """Stage `files`, record the job and queue `task`. Returns the job id."""
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull()
+
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(UPLOAD_STAGING_DIR, job_id)
+        try:
+            os.makedirs(job_dir)
+            paths = []
+            for i, data in enumerate(files, start=1):
+                path = os.path.join(job_dir, str(i))
+                with open(path, "wb") as f:
+                    f.write(data)
+                paths.append(path)
+
+            db = SessionLocal()
+            try:
+                db.add(FaceJob(id=job_id, kind=kind, status=PENDING, phone=phone,
+                               user_id=user_id, owner=OWNER))
+                db.commit()
+            finally:
+                db.close()
+
+            self._pool.submit(self._run, job_id, paths, task)
+        except BaseException:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            self._slots.release()
+            raise
+
+        log.info("action=face_job_queued | job=%s | kind=%s | phone=%s | files=%d",
+                 job_id, kind, phone, len(files))
+        return job_id
+
+    def _run(self, job_id: str, paths: list[str], task: Task) -> None:
+        try:
+            _update(job_id, status=RUNNING, started_at=_now())
+            images = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    images.append(f.read())
+
+            db = SessionLocal()
+            try:
+                result = task(db, images)
+            finally:
+                db.close()
+
+            _update(
+                job_id, status=SUCCEEDED, finished_at=_now(),
+                result=json.dumps(result), user_id=result.get("user_id"),
+            )
+            log.info("action=face_job_succeeded | job=%s", job_id)
+        except HTTPException as e:
+            _update(job_id, status=FAILED, finished_at=_now(), error=str(e.detail))
+            log.warning("action=face_job_failed | job=%s | reason=%s", job_id, e.detail)
+        except Exception:
+            log.error("Face job %s crashed", job_id, exc_info=True)
+            try:
+                _update(job_id, status=FAILED, finished_at=_now(), error="Internal error")
+            except Exception:
+                log.error("Could not record failure of face job %s", job_id, exc_info=True)
+        finally:
+            shutil.rmtree(os.path.dirname(paths[0]) if paths else "", ignore_errors=True)
+            self._slots.release()
+
+
+def _owner_alive(owner: str | None) -> bool:
+    """
+    Whether the process that owns a job may still be running it. Owners on
+    this host are checked by pid; other hosts' owners are assumed alive and
+    only expire by age.
+    """
+    try:
+        host, pid, _ = owner.split(":")
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False    # rows from before owners were recorded
+    if host != HOST:
+        return True
+    if pid == os.getpid():
+        return owner == OWNER   # a container restart reuses pids; the boot id tells them apart
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass            # alive, run by another user
+    return True
+
+
+def fail_interrupted_jobs() -> None:
+    """
+    Mark pending/running jobs whose owner process is gone, or that are older
+    than TEMP_FILE_MAX_AGE_HOURS, as failed and drop their staged files.
+    Jobs of other live API workers are left alone.
+    """
+    cutoff = _now() - timedelta(hours=TEMP_FILE_MAX_AGE_HOURS)
+    stale: list[str] = []
+    db = SessionLocal()
+    try:
+        in_flight = db.query(FaceJob.id, FaceJob.owner, FaceJob.created_at).filter(
+            FaceJob.status.in_((PENDING, RUNNING))
+        ).all()
+        stale = [
+            job_id for job_id, owner, created_at in in_flight
+            if not _owner_alive(owner) or _as_utc(created_at) < cutoff
+        ]
+        if stale:
+            db.query(FaceJob).filter(
+                FaceJob.id.in_(stale), FaceJob.status.in_((PENDING, RUNNING))
+            ).update(
+                {"status": FAILED, "error": "Interrupted by restart", "finished_at": _now()},
+                synchronize_session=False,
+            )
+            db.commit()
+            log.warning("Marked %d interrupted face job(s) as failed.", len(stale))
+    finally:
+        db.close()
+
+    for job_id in stale:
+        shutil.rmtree(os.path.join(UPLOAD_STAGING_DIR, job_id), ignore_errors=True)
+    sweep_staging()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes; they are stored in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def sweep_staging() -> int:
+    """
+    Remove staged upload folders left behind by crashed jobs: older than
+    TEMP_FILE_MAX_AGE_HOURS and not belonging to a pending or running job.
+    Returns how many were removed (run by the maintenance scheduler).
+    """
+    try:
+        entries = list(os.scandir(UPLOAD_STAGING_DIR))
+    except FileNotFoundError:
+        return 0
+    cutoff = time.time() - TEMP_FILE_MAX_AGE_HOURS * 3600
+    old = [e for e in entries if e.stat(follow_symlinks=False).st_mtime < cutoff]
+    if not old:
+        return 0
+
+    db = SessionLocal()
+    try:
+        active = {
+            job_id for (job_id,) in db.query(FaceJob.id).filter(
+                FaceJob.id.in_([e.name for e in old]), FaceJob.status.in_((PENDING, RUNNING))
+            )
+        }
+    finally:
+        db.close()
+
+    removed = 0
+    for entry in old:
+        if entry.name in active:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            os.remove(entry.path)
+        removed += 1
+    return removed
+
+
+def job_status(job: FaceJob) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "phone": job.phone,
+        "user_id": job.user_id,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+runner = JobRunner(UPLOAD_WORKERS, UPLOAD_QUEUE_SIZE)
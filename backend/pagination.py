@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination helpers for the admin API.
+
+A page is fetched with `WHERE (k1, k2) < (:last_k1, :last_k2) ORDER BY k1, k2
+LIMIT n`, which an index on the key columns answers directly, so page N costs
+the same as page 1. The cursor handed to the client is just the last row's key
+values, base64-encoded; it is returned in the X-Next-Cursor header so list
+endpoints keep returning a plain JSON array.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, and_, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Decode a cursor into values of `types` (datetime or int); 400 on garbage."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for t, v in zip(types, values)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def prefix_range(column, prefix: str):
+    """`column LIKE 'prefix%'` as a range predicate, so the column's index is used."""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+async def paginate(db: AsyncSession, stmt: Select, keys: list, cursor: tuple | None, descending: bool,
+                   limit: int, response: Response, include_total: bool = False) -> list:
+    """
+    Apply the keyset predicate and ordering for `keys` to `stmt` and return
+    one page of rows. Sets X-Next-Cursor when more rows follow and, on
+    request, X-Total-Count for the filtered (un-paginated) statement.
+    """
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+
+    if cursor is not None:
+        key_row = tuple_(*keys)
+        last = tuple_(*(literal(v, k.type) for k, v in zip(keys, cursor)))
+        stmt = stmt.where(key_row < last if descending else key_row > last)
+
+    stmt = stmt.order_by(*(k.desc() if descending else k.asc() for k in keys))
+    result = await db.execute(stmt.limit(limit + 1))
+    # Single-entity selects yield the entity itself, joins yield rows
+    rows = result.scalars().all() if len(stmt.column_descriptions) == 1 else result.all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*_key_values(rows[-1], keys))
+    return rows
+
+
+def _key_values(row, keys: list) -> list:
+    # Rows are either a single entity or a tuple whose first element owns the keys
+    entity = row[0] if isinstance(row, tuple) or hasattr(row, "_fields") else row
+    return [getattr(entity, k.key) for k in keys]
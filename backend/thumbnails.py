@@ -0,0 +1,126 @@
+"""
+Face image variants for the admin panel, with HTTP revalidation.
+
+Thumbnails are generated on first request and kept in bot/face_thumbnails,
+next to registered_faces, named after the source image's content hash:
+replacing a reference image changes the hash, so a stale thumbnail can never
+be served. invalidate_thumbnails() removes a user's variants once the source
+images change, so the cache does not accumulate dead files.
+
+ETags are the source content hash (plus the variant size). URLs carrying the
+current hash as `v` are immutable and cached by the browser; anything else
+must be revalidated, which costs a 304 instead of a full image.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+import cv2
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from bot.config import TEMP_FILE_MAX_AGE_HOURS
+from bot.face import FACES_DIR, file_hash, forget_file_hashes
+from bot.logging_config import get_app_logger
+
+log = get_app_logger("thumbnails")
+
+THUMBNAIL_DIR = os.path.join(os.path.dirname(FACES_DIR), "face_thumbnails")
+THUMBNAIL_SIZES = (96, 256)        # px – longest side
+THUMBNAIL_QUALITY = 80
+
+# Prefix of the content hash used in cache file names and `v` URL parameters
+HASH_PREFIX = 16
+
+def image_version(path: str) -> str:
+    """Short content hash used as the `v` cache-busting URL parameter."""
+    return file_hash(path)[:HASH_PREFIX]
+
+
+def _thumbnail(phone: str, source: str, digest: str, size: int) -> str:
+    """Return the path of the `size` variant of `source`, generating it if needed."""
+    user_dir = os.path.join(THUMBNAIL_DIR, str(phone))
+    path = os.path.join(user_dir, f"{digest[:HASH_PREFIX]}_{size}.webp")
+    if os.path.exists(path):
+        return path
+
+    img = cv2.imread(source)
+    if img is None:
+        raise HTTPException(404, "Face not found")
+    h, w = img.shape[:2]
+    if max(h, w) > size:
+        scale = size / max(h, w)
+        img = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))),
+                         interpolation=cv2.INTER_AREA)
+
+    ok, encoded = cv2.imencode(".webp", img, [cv2.IMWRITE_WEBP_QUALITY, THUMBNAIL_QUALITY])
+    if not ok:
+        raise OSError(f"Could not encode thumbnail for {source}")
+
+    os.makedirs(user_dir, exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(encoded.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def invalidate_thumbnails(phone: str) -> None:
+    """Drop every cached variant for a user (call after their images change)."""
+    shutil.rmtree(os.path.join(THUMBNAIL_DIR, str(phone)), ignore_errors=True)
+    forget_file_hashes(os.path.join(FACES_DIR, str(phone)))
+
+
+def sweep_thumbnails() -> int:
+    """
+    Remove variants of users whose face folder no longer exists and partial
+    `.tmp` writes older than TEMP_FILE_MAX_AGE_HOURS. Returns files/folders
+    removed (run by the maintenance scheduler).
+    """
+    try:
+        user_dirs = list(os.scandir(THUMBNAIL_DIR))
+    except FileNotFoundError:
+        return 0
+    cutoff = time.time() - TEMP_FILE_MAX_AGE_HOURS * 3600
+    removed = 0
+    for user_dir in user_dirs:
+        if not user_dir.is_dir(follow_symlinks=False):
+            continue
+        if not os.path.isdir(os.path.join(FACES_DIR, user_dir.name)):
+            shutil.rmtree(user_dir.path, ignore_errors=True)
+            removed += 1
+            continue
+        for entry in os.scandir(user_dir.path):
+            if entry.name.endswith(".tmp") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+    return removed
+
+
+def face_image_response(
+    request: Request, phone: str, source: str, size: int | None, version: str | None
+) -> Response:
+    """
+    Serve a reference image or one of its thumbnails with an ETag,
+    answering 304 when the client already holds the current content.
+    """
+    if size is not None and size not in THUMBNAIL_SIZES:
+        raise HTTPException(400, f"size must be one of {THUMBNAIL_SIZES}")
+
+    digest = file_hash(source)
+    etag = f'"{digest}-{size}"' if size else f'"{digest}"'
+    if version == digest[:HASH_PREFIX]:
+        cache_control = "private, max-age=31536000, immutable"
+    else:
+        cache_control = "private, no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    if size is None:
+        return FileResponse(source, media_type="image/jpeg", headers=headers)
+    return FileResponse(_thumbnail(phone, source, digest, size), media_type="image/webp", headers=headers)
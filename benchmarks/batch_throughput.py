@@ -0,0 +1,72 @@
+"""
+Embedding throughput by micro-batch size on CPU.
+
+Embeds the same set of aligned face crops with _embed_batch() in chunks of
+each batch size and reports crops/second, i.e. what one face worker can
+sustain at a given FACE_BATCH_MAX_SIZE:
+
+    python -m benchmarks.batch_throughput [--crops 256] [--sizes 1 2 4 8 16 32]
+                                          [--faces DIR]
+
+Crops are random 112×112 images unless --faces points at a directory of
+face images (they are detected and aligned first). Needs the SFace weights
+(~/.deepface/weights).
+
+Note that deepface's SFace graph is exported with a batch size of 1 and its
+predict() runs one session call per crop, so batching here saves the
+per-call preprocessing and DeepFace.represent overhead, not model time.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+from bot.face import MODEL_NAME, _embed_batch, _ensure_model, analyze_face
+
+CROP_SIZE = 112   # SFace input
+
+
+def _crops(count: int, faces_dir: str | None) -> list[np.ndarray]:
+    if faces_dir:
+        crops = []
+        for path in sorted(glob.glob(os.path.join(faces_dir, "**", "*.jpg"), recursive=True)):
+            analysis = analyze_face(path, embed=False)
+            if analysis.crop is not None:
+                crops.append(analysis.crop)
+        if not crops:
+            raise SystemExit(f"error: no faces found under {faces_dir}")
+        return [crops[i % len(crops)] for i in range(count)]
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (CROP_SIZE, CROP_SIZE, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--crops", type=int, default=256)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--faces", help="directory of face images to crop instead of random crops")
+    args = parser.parse_args()
+
+    _ensure_model()
+    crops = _crops(args.crops, args.faces)
+    _embed_batch(crops[:1])   # first call builds the graph
+
+    print(f"{MODEL_NAME}, {len(crops)} crops")
+    print(f"{'batch':>6} {'crops/s':>10} {'ms/batch':>10} {'speedup':>8}")
+    baseline = None
+    for size in args.sizes:
+        started = time.perf_counter()
+        for i in range(0, len(crops), size):
+            _embed_batch(crops[i:i + size])
+        elapsed = time.perf_counter() - started
+        rate = len(crops) / elapsed
+        baseline = baseline or rate
+        batches = -(-len(crops) // size)
+        print(f"{size:>6} {rate:>10.1f} {elapsed / batches * 1000:>10.2f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
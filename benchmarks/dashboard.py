@@ -0,0 +1,157 @@
+"""
+/dashboard latency on a seeded database.
+
+Seeds a SQLite database with --rows attendance rows (default 1M: one
+check-in per user per day, spread over enough users to fill the range
+ending today), builds the daily rollup, then times:
+
+- legacy : the original 13 sequential COUNT queries over `attendance`
+- rollup : GET /dashboard?days=7|30|90 through the API (two queries)
+- http   : an unmatched GET, the TestClient/middleware floor included in "rollup"
+
+    python -m benchmarks.dashboard [--rows 1000000] [--users 3000] [--repeat 20]
+                                   [--db /tmp/attendance_bench.db]
+
+The database is reused when it already holds --rows rows.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", default="/tmp/attendance_bench.db")
+    return parser.parse_args()
+
+
+args = _parse_args()
+# Point the app at the benchmark database before bot.config is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from fastapi.testclient import TestClient   # noqa: E402
+from sqlalchemy import func                 # noqa: E402
+
+from bot.database import SessionLocal, engine    # noqa: E402
+from bot.migrations import upgrade as migrate    # noqa: E402
+from bot.models import Attendance, User          # noqa: E402
+from bot.rollup import rebuild                   # noqa: E402
+from backend.api import app                      # noqa: E402
+from backend.auth import create_token            # noqa: E402
+
+
+def seed(rows: int, users: int) -> None:
+    migrate()
+    with engine.connect() as conn:
+        existing = conn.exec_driver_sql("SELECT COUNT(*) FROM attendance").scalar()
+    if existing == rows:
+        print(f"Reusing {args.db} ({rows:,} rows)")
+        return
+    if existing:
+        sys.exit(f"error: {args.db} holds {existing:,} rows; remove it or pass --rows {existing}")
+
+    days = -(-rows // users)
+    today = datetime.now(timezone.utc).date()
+    print(f"Seeding {rows:,} rows: {users:,} users × {days} days …", flush=True)
+    started = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO users (id, phone, telegram_id, name, face_registered) VALUES (?, ?, ?, ?, 0)",
+            [(u, f"9{u:09d}", str(100000 + u), f"User {u}") for u in range(1, users + 1)],
+        )
+        batch = []
+        written = 0
+        for d in range(days):
+            day = today - timedelta(days=d)
+            for u in range(1, users + 1):
+                if written == rows:
+                    break
+                check_in = datetime(day.year, day.month, day.day, 9, u % 60, tzinfo=timezone.utc)
+                check_out = check_in + timedelta(hours=8)
+                batch.append((u, check_in.strftime("%Y-%m-%d %H:%M:%S.%f"),
+                              check_out.strftime("%Y-%m-%d %H:%M:%S.%f"), day.isoformat()))
+                written += 1
+            if len(batch) >= 100_000 or written == rows:
+                cur.executemany(
+                    "INSERT INTO attendance (user_id, check_in, check_out, lat, lon, date)"
+                    " VALUES (?, ?, ?, 12.9, 77.6, ?)", batch,
+                )
+                batch.clear()
+        raw.commit()
+    finally:
+        raw.close()
+
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+
+def legacy_dashboard() -> None:
+    """The pre-rollup endpoint body: 6 counts plus one COUNT per trend day."""
+    db = SessionLocal()
+    try:
+        today_start = datetime.combine(datetime.now(timezone.utc).date(), datetime.min.time(), tzinfo=timezone.utc)
+        today_end = today_start + timedelta(days=1)
+        db.query(User).count()
+        db.query(Attendance).count()
+        db.query(Attendance).filter(Attendance.check_in >= today_start, Attendance.check_in < today_end).count()
+        db.query(func.count(func.distinct(Attendance.user_id))).filter(
+            Attendance.check_in >= today_start, Attendance.check_in < today_end,
+        ).scalar()
+        db.query(Attendance).filter(Attendance.check_in >= today_start - timedelta(days=7)).count()
+        db.query(Attendance).filter(Attendance.check_in >= today_start.replace(day=1)).count()
+        for i in range(7):
+            day = today_start - timedelta(days=i)
+            db.query(Attendance).filter(Attendance.check_in >= day, Attendance.check_in < day + timedelta(days=1)).count()
+    finally:
+        db.close()
+
+
+def _timed(fn, repeat: int) -> tuple[float, float]:
+    fn()   # warm the page cache
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main() -> None:
+    seed(args.rows, args.users)
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_token('bench')}"}
+
+    def endpoint(days: int):
+        response = client.get("/dashboard", params={"days": days}, headers=headers)
+        response.raise_for_status()
+
+    print(f"{'variant':<16} {'p50 ms':>9} {'max ms':>9}")
+    p50, worst = _timed(legacy_dashboard, max(args.repeat // 4, 3))
+    print(f"{'legacy (7 days)':<16} {p50:>9.1f} {worst:>9.1f}")
+    for days in (7, 30, 90):
+        p50, worst = _timed(lambda: endpoint(days), args.repeat)
+        print(f"{f'rollup ({days} days)':<16} {p50:>9.1f} {worst:>9.1f}")
+    p50, worst = _timed(lambda: client.get("/bench-floor"), args.repeat)
+    print(f"{'http floor':<16} {p50:>9.1f} {worst:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Admin API load test: requests/second per engine profile.
+
+Seeds the target database, starts `uvicorn backend.api:app` against it and
+drives the read endpoints with --concurrency clients for --seconds each:
+
+    python -m benchmarks.load_test --profile sqlite [--db /tmp/attendance_load.db]
+    python -m benchmarks.load_test --profile postgres --url postgresql://user:pw@host/db
+
+    options: [--workers 1] [--concurrency 32] [--seconds 10] [--users 500] [--days 60]
+
+The PostgreSQL profile needs the `postgres` extra (psycopg 3). Seeding is
+skipped when the database already holds users.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+ENDPOINTS = (
+    ("users page", "/users?limit=50"),
+    ("attendance page", "/attendance?limit=50"),
+    ("user history", "/users/{user}/attendance"),
+    ("dashboard", "/dashboard?days=30"),
+    ("daily report", "/reports/daily?from={from_}&to={to}"),
+)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--url", help="database URL (required for --profile postgres)")
+    parser.add_argument("--db", default="/tmp/attendance_load.db", help="SQLite file for --profile sqlite")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    if args.profile == "postgres" and not args.url:
+        parser.error("--profile postgres needs --url")
+    return args
+
+
+def seed(users: int, days: int) -> None:
+    """Run migrations and insert users × days closed check-ins plus the rollup."""
+    from sqlalchemy import func, insert, select
+
+    from bot.database import SessionLocal, engine
+    from bot.migrations import upgrade
+    from bot.models import Attendance, User
+    from bot.rollup import rebuild
+
+    upgrade()
+    with engine.begin() as conn:
+        if conn.execute(select(func.count(User.id))).scalar():
+            print("Reusing seeded database")
+            return
+        conn.execute(insert(User), [
+            {"id": u, "phone": f"7{u:09d}", "telegram_id": str(u), "name": f"User {u}", "face_registered": 1}
+            for u in range(1, users + 1)
+        ])
+        today = datetime.now(timezone.utc).date()
+        for d in range(days):
+            day = today - timedelta(days=d)
+            check_in = datetime(day.year, day.month, day.day, 9, tzinfo=timezone.utc)
+            conn.execute(insert(Attendance), [
+                {"user_id": u, "check_in": check_in, "check_out": check_in + timedelta(hours=8),
+                 "lat": 12.9, "lon": 77.6, "date": day}
+                for u in range(1, users + 1)
+            ])
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Seeded {users} users × {days} days")
+
+
+async def _drive(client: httpx.AsyncClient, paths: list[str], concurrency: int, seconds: float):
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(offset: int):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(paths[i % len(paths)])
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+            i += concurrency
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return len(latencies) / (time.perf_counter() - started), latencies, errors
+
+
+async def run(args, base_url: str, users: int, days: int) -> None:
+    today = date.today()
+    async with httpx.AsyncClient(base_url=base_url, timeout=30,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        login = await client.post("/login", json={
+            "username": os.environ["ADMIN_USERNAME"], "password": os.environ["ADMIN_PASSWORD"],
+        })
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        print(f"profile={args.profile} workers={args.workers} concurrency={args.concurrency}")
+        print(f"{'endpoint':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for name, template in ENDPOINTS:
+            paths = [
+                template.format(user=1 + n % users, from_=today - timedelta(days=days), to=today)
+                for n in range(256)
+            ]
+            await _drive(client, paths, args.concurrency, 1)   # warm-up
+            rps, latencies, errors = await _drive(client, paths, args.concurrency, args.seconds)
+            latencies.sort()
+            print(f"{name:<16} {rps:>8.0f} {statistics.median(latencies) * 1000:>8.1f} "
+                  f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>8.1f} {errors:>7}")
+
+
+def main() -> None:
+    args = _parse_args()
+    os.environ["DATABASE_URL"] = args.url if args.profile == "postgres" else f"sqlite:///{args.db}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("ADMIN_USERNAME", "admin")
+    os.environ.setdefault("ADMIN_PASSWORD", "admin")
+    os.environ.setdefault("SECRET_KEY", "load-test")
+    os.environ["MAINTENANCE_ENABLED"] = "false"
+
+    seed(args.users, args.days)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        for _ in range(600):
+            try:
+                httpx.get(base_url + "/docs", timeout=1)
+                break
+            except httpx.TransportError:
+                if server.poll() is not None:
+                    sys.exit("error: uvicorn exited")
+                time.sleep(0.5)
+        asyncio.run(run(args, base_url, args.users, args.days))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Per-call logging latency under concurrent load: synchronous file handler
+versus the queue pipeline in bot.logging_config.
+
+--threads threads each log --calls INFO records, either as fast as they can
+or one every --interval-us (request handlers logging between real work), and
+every logger.info() call is timed on the calling thread:
+
+- direct : a plain RotatingFileHandler on the logger (the original setup);
+           each call formats, writes and flushes under the handler lock
+- queue  : _BoundedQueueHandler feeding the batching listener thread, with
+           the same file rotation; the call only enqueues
+
+    python -m benchmarks.logging_latency [--threads 8] [--calls 20000] [--interval-us 0]
+                                         [--flush-delay-ms 0] [--overflow block|drop_info|drop]
+
+--flush-delay-ms stalls every flush, standing in for a slow or contended
+disk. "drain" is how long the listener needed after the last call to write
+out what was still queued. Files go to a temporary directory.
+"""
+
+import argparse
+import logging
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from bot.config import LOG_BATCH_SIZE, LOG_QUEUE_SIZE
+from bot.logging_config import (
+    _BatchedRotatingFileHandler, _BatchingQueueListener, _BoundedQueueHandler, _formatter,
+)
+
+MAX_BYTES = 3 * 1024 * 1024
+BACKUPS = 3
+
+
+def _slow_flush(handler: logging.Handler, delay_ms: float) -> None:
+    if delay_ms <= 0:
+        return
+    flush = handler.flush
+
+    def slow():
+        time.sleep(delay_ms / 1000)
+        flush()
+    handler.flush = slow
+
+
+def _direct(path: str, flush_delay_ms: float):
+    handler = RotatingFileHandler(path, maxBytes=MAX_BYTES, backupCount=BACKUPS, encoding="utf-8")
+    handler.setFormatter(_formatter)
+    _slow_flush(handler, flush_delay_ms)
+    return handler, handler.close
+
+
+def _queued(path: str, overflow: str, flush_delay_ms: float):
+    file_handler = _BatchedRotatingFileHandler(path, maxBytes=MAX_BYTES, backupCount=BACKUPS, encoding="utf-8")
+    file_handler.setFormatter(_formatter)
+    _slow_flush(file_handler, flush_delay_ms)
+    handler = _BoundedQueueHandler(queue.Queue(LOG_QUEUE_SIZE), overflow)
+    listener = _BatchingQueueListener(handler.queue, handler, file_handler)
+    listener.start()
+
+    def stop():
+        listener.stop()
+        file_handler.close()
+    return handler, stop
+
+
+def _run(name: str, handler, stop, threads: int, calls: int, interval_us: float) -> None:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    samples: list[list[int]] = [[] for _ in range(threads)]
+    start = threading.Barrier(threads + 1)
+
+    def worker(n: int):
+        out = samples[n]
+        clock = time.perf_counter_ns
+        pause = interval_us / 1e6
+        start.wait()
+        for i in range(calls):
+            t = clock()
+            logger.info("action=checkin | user=%d | lat=%.5f | lon=%.5f | seq=%d", n, 12.97, 77.59, i)
+            out.append(clock() - t)
+            if pause:
+                time.sleep(pause)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    start.wait()
+    began = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - began
+    stop_started = time.perf_counter()
+    stop()
+    drain = time.perf_counter() - stop_started
+
+    latencies = sorted(s for per_thread in samples for s in per_thread)
+    pick = lambda q: latencies[min(int(len(latencies) * q), len(latencies) - 1)] / 1000
+    print(f"{name:<8} {pick(0.5):>8.1f} {pick(0.99):>8.1f} {pick(0.999):>9.1f} "
+          f"{latencies[-1] / 1000:>9.0f} {len(latencies) / elapsed:>10,.0f} {drain * 1000:>8.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=20_000, help="calls per thread")
+    parser.add_argument("--interval-us", type=float, default=0, help="pause after each call")
+    parser.add_argument("--flush-delay-ms", type=float, default=0, help="stall added to every flush")
+    parser.add_argument("--overflow", default="block", choices=("block", "drop_info", "drop"),
+                        help="queue overflow policy (block keeps every record, like the direct handler)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="logbench-")
+    try:
+        print(f"{args.threads} threads × {args.calls:,} calls, interval {args.interval_us:g} µs, "
+              f"flush delay {args.flush_delay_ms:g} ms, queue {LOG_QUEUE_SIZE:,} "
+              f"(batch {LOG_BATCH_SIZE}, overflow {args.overflow})")
+        print(f"{'variant':<8} {'p50 µs':>8} {'p99 µs':>8} {'p99.9 µs':>9} {'max µs':>9} "
+              f"{'calls/s':>10} {'drain ms':>8}")
+        handler, stop = _direct(f"{directory}/direct.log", args.flush_delay_ms)
+        _run("direct", handler, stop, args.threads, args.calls, args.interval_us)
+        handler, stop = _queued(f"{directory}/queue.log", args.overflow, args.flush_delay_ms)
+        _run("queue", handler, stop, args.threads, args.calls, args.interval_us)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Matching latency: vectorized match_embeddings() vs one comparison per reference.
+
+Synthetic mode (default) times only the comparison step on random SFace-sized
+embeddings, so it runs without model weights:
+
+    python -m benchmarks.match_latency [--refs 1 3 10 100] [--repeat 2000]
+
+With --phone and --selfie it also times the full path on real images: the
+old loop of DeepFace.verify() calls (detect + embed both images, per
+reference) against verify_face() with cached reference embeddings. This
+needs the SFace/SSD weights and the user's reference_N.jpg files under
+bot/registered_faces/<phone>/.
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import time
+
+import numpy as np
+from deepface.modules.verification import find_threshold
+
+from bot.face import (
+    FACES_DIR,
+    DETECTOR,
+    MODEL_NAME,
+    _ensure_model,
+    match_embeddings,
+    verify_face,
+)
+
+EMBEDDING_DIM = 128   # SFace
+THRESHOLD = find_threshold(MODEL_NAME, "cosine")
+
+
+def _timed(fn, repeat: int) -> tuple[float, float]:
+    """Median and p95 latency of fn() in microseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def _cosine_loop(selfie: np.ndarray, references: np.ndarray) -> bool:
+    """The pre-vectorization shape: one distance and one threshold check per reference."""
+    for ref in references:
+        distance = 1.0 - float(np.dot(ref, selfie) / (np.linalg.norm(ref) * np.linalg.norm(selfie)))
+        if distance <= THRESHOLD:
+            return True
+    return False
+
+
+def synthetic(ref_counts: list[int], repeat: int) -> None:
+    rng = np.random.default_rng(0)
+    print(f"{'refs':>6} {'loop p50 µs':>12} {'loop p95 µs':>12} {'vector p50 µs':>14} {'vector p95 µs':>14}")
+    for n in ref_counts:
+        references = rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+        selfie = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        indexes = list(range(1, n + 1))
+        loop = _timed(lambda: _cosine_loop(selfie, references), repeat)
+        vector = _timed(lambda: match_embeddings(selfie, references, indexes, THRESHOLD), repeat)
+        print(f"{n:>6} {loop[0]:>12.1f} {loop[1]:>12.1f} {vector[0]:>14.1f} {vector[1]:>14.1f}")
+
+
+def end_to_end(phone: str, selfie: str, repeat: int) -> None:
+    from deepface import DeepFace
+
+    _ensure_model()
+    references = sorted(glob.glob(os.path.join(FACES_DIR, phone, "reference_*.jpg")))
+    if not references:
+        raise SystemExit(f"error: no reference images for {phone}")
+
+    def sequential():
+        for ref in references:
+            try:
+                if DeepFace.verify(
+                    img1_path=ref, img2_path=selfie, model_name=MODEL_NAME,
+                    detector_backend=DETECTOR, distance_metric="cosine",
+                    enforce_detection=True, align=True, silent=True,
+                )["verified"]:
+                    return True
+            except ValueError:
+                continue
+        return False
+
+    verify_face(phone, selfie)   # fill the reference embedding cache
+    old = _timed(sequential, repeat)
+    new = _timed(lambda: verify_face(phone, selfie), repeat)
+    print(f"{len(references)} reference(s)")
+    print(f"sequential DeepFace.verify : p50 {old[0] / 1000:8.1f} ms   p95 {old[1] / 1000:8.1f} ms")
+    print(f"verify_face (cached refs)  : p50 {new[0] / 1000:8.1f} ms   p95 {new[1] / 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--refs", type=int, nargs="+", default=[1, 3, 10, 100])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--phone", help="registered user to verify against (end-to-end mode)")
+    parser.add_argument("--selfie", help="selfie image for end-to-end mode")
+    args = parser.parse_args()
+
+    synthetic(args.refs, args.repeat)
+    if args.phone and args.selfie:
+        print()
+        end_to_end(args.phone, args.selfie, max(1, args.repeat // 200))
+
+
+if __name__ == "__main__":
+    main()
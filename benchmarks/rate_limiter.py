@@ -0,0 +1,90 @@
+"""
+Rate limiter engines at 100k keys: memory held and hit() throughput.
+
+For each engine, every key is hit --hits times (the login limit is 5 per
+5 minutes, so 5 is a client at the limit). Reports the heap the limiter
+holds afterwards (tracemalloc) and hit() calls per second, single-threaded
+and then from --threads threads against the already-filled limiter:
+
+    python -m benchmarks.rate_limiter [--keys 100000] [--hits 5] [--threads 8]
+                                      [--sqlite /tmp/rate_limits_bench.db]
+
+The SQLite engine's rows live in the database file, so its heap figure is
+only the connection; its file size is printed alongside.
+"""
+
+import argparse
+import gc
+import os
+import threading
+import time
+import tracemalloc
+
+from bot.rate_limiter import RateLimiter, SlidingWindowLimiter, SqliteRateLimiter
+
+WINDOW_SECONDS = 300
+
+
+def _engines(args):
+    yield "exact", lambda: RateLimiter(args.hits, WINDOW_SECONDS)
+    yield "sliding", lambda: SlidingWindowLimiter(args.hits, WINDOW_SECONDS)
+    if args.sqlite:
+        def sqlite():
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(args.sqlite + suffix):
+                    os.remove(args.sqlite + suffix)
+            return SqliteRateLimiter(args.sqlite, "bench", args.hits, WINDOW_SECONDS)
+        yield "sqlite", sqlite
+
+
+def _hit_all(limiter, keys: list[str], hits: int) -> float:
+    started = time.perf_counter()
+    for _ in range(hits):
+        for key in keys:
+            limiter.hit(key)
+    return len(keys) * hits / (time.perf_counter() - started)
+
+
+def _hit_threaded(limiter, keys: list[str], threads: int) -> float:
+    chunks = [keys[n::threads] for n in range(threads)]
+    workers = [threading.Thread(target=lambda c=chunk: [limiter.hit(k) for k in c]) for chunk in chunks]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(keys) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--hits", type=int, default=5, help="hits per key (also the limit)")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sqlite", help="also benchmark SqliteRateLimiter on this file")
+    args = parser.parse_args()
+
+    keys = [f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}" for n in range(args.keys)]
+    print(f"{args.keys:,} keys × {args.hits} hits, {args.threads} threads")
+    print(f"{'engine':<8} {'heap MB':>9} {'B/key':>7} {'hits/s':>10} {'threaded/s':>11}")
+    for name, build in _engines(args):
+        gc.collect()
+        tracemalloc.start()
+        limiter = build()
+        _hit_all(limiter, keys, args.hits)
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Throughput without tracemalloc's overhead, on a fresh limiter
+        del limiter
+        gc.collect()
+        limiter = build()
+        rate = _hit_all(limiter, keys, args.hits)
+        threaded = _hit_threaded(limiter, keys, args.threads)
+        extra = f"  (file {os.path.getsize(args.sqlite) / 2**20:.1f} MB)" if name == "sqlite" else ""
+        print(f"{name:<8} {held / 2**20:>9.1f} {held / args.keys:>7.0f} {rate:>10,.0f} {threaded:>11,.0f}{extra}")
+        del limiter
+
+
+if __name__ == "__main__":
+    main()
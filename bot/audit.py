@@ -0,0 +1,145 @@
+"""
+Structured sink for security events.
+
+Security log lines follow the `action=<name> | key=value | ...` convention.
+AuditHandler sits on the logging listener thread next to the security.log
+file handler and only parses each record into fields. The events go to the
+handler's own writer thread, which writes whatever has accumulated in one go,
+so a slow database or disk never holds up the log files:
+
+- AUDIT_SINK=db    : one multi-row INSERT per batch into audit_events,
+                     queried through GET /audit
+- AUDIT_SINK=jsonl : one JSON object per line appended to logs/audit.jsonl
+- AUDIT_SINK=off   : disabled
+
+Callers keep logging exactly as before; nothing here runs on their thread.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+from bot.config import AUDIT_SINK
+
+# Fields stored in their own indexed columns; everything else goes to details
+COLUMNS = ("telegram_id", "phone", "ip")
+
+
+def parse_event(message: str) -> dict | None:
+    """Split an `action=... | k=v` message into a dict; None if it does not follow the convention."""
+    fields = {}
+    for part in message.split(" | "):
+        key, sep, value = part.partition("=")
+        if not sep:
+            return None
+        fields[key.strip()] = value.strip()
+    if not fields.get("action"):
+        return None
+    return fields
+
+
+class AuditHandler(logging.Handler):
+    """
+    Parses on the calling (listener) thread and hands events to a writer
+    thread that batches up to `capacity` per write. The hand-off queue is
+    unbounded: security events are rare, and none may be lost while the
+    sink is slow.
+    """
+
+    # How long close() waits for queued events to be written at shutdown
+    CLOSE_TIMEOUT = 10
+
+    def __init__(self, sink: str, capacity: int, jsonl_path: str):
+        super().__init__(logging.INFO)
+        self.sink = sink
+        self.capacity = capacity
+        self.jsonl_path = jsonl_path
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._stop = object()
+        self._writer = threading.Thread(target=self._drain, name="audit-writer", daemon=True)
+        self._writer.start()
+
+    def emit(self, record):
+        fields = parse_event(record.getMessage())
+        if fields is None:
+            return
+        event = {
+            "created_at": datetime.fromtimestamp(record.created, timezone.utc),
+            "level": record.levelname,
+            "action": fields.pop("action"),
+        }
+        for column in COLUMNS:
+            event[column] = fields.pop(column, None)
+        event["details"] = fields
+        self._pending.put(event)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._pending.put(self._stop)
+            self._writer.join(self.CLOSE_TIMEOUT)
+        super().close()
+
+    def _drain(self):
+        pending = self._pending
+        stop = False
+        while not stop:
+            events = []
+            item = pending.get()
+            while True:
+                if item is self._stop:
+                    stop = True
+                    break
+                events.append(item)
+                if len(events) >= self.capacity:
+                    break
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+            if events:
+                self._write(events)
+
+    def _write(self, events: list[dict]) -> None:
+        try:
+            if self.sink == "jsonl":
+                self._write_jsonl(events)
+            else:
+                self._write_db(events)
+        except Exception as e:
+            # Never raise into logging; the text line is already in security.log
+            logging.lastResort.handle(logging.makeLogRecord({
+                "name": "attendance.audit", "levelno": logging.ERROR, "levelname": "ERROR",
+                "msg": "Could not write %d audit event(s): %s: %s",
+                "args": (len(events), type(e).__name__, e),
+            }))
+
+    def _write_db(self, events: list[dict]) -> None:
+        # Imported here: the logging setup must not pull in the database at import time
+        from sqlalchemy import insert
+        from bot.database import engine
+        from bot.models import AuditEvent
+
+        rows = [
+            {**e, "details": json.dumps(e["details"]) if e["details"] else None}
+            for e in events
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(AuditEvent), rows)
+
+    def _write_jsonl(self, events: list[dict]) -> None:
+        with open(self.jsonl_path, "a", encoding="utf-8") as f:
+            for e in events:
+                line = {**e, "created_at": e["created_at"].isoformat()}
+                details = line.pop("details")
+                line.update(details)
+                f.write(json.dumps(line) + "\n")
+
+
+def make_audit_handler(log_dir: str, capacity: int) -> AuditHandler | None:
+    """The configured sink, or None when AUDIT_SINK=off."""
+    if AUDIT_SINK not in ("db", "jsonl"):
+        return None
+    return AuditHandler(AUDIT_SINK, capacity, os.path.join(log_dir, "audit.jsonl"))
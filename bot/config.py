@@ -9,6 +9,28 @@ DATABASE_URL = os.getenv(
     f"sqlite:///{os.path.join(BASE_DIR, 'instance', 'attendance.db')}"
 )
 
+# Async driver URL for the admin API's read endpoints; derived from
+# DATABASE_URL when unset (sqlite -> aiosqlite, postgresql -> psycopg, or
+# asyncpg when DATABASE_URL names another driver such as psycopg2)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# PostgreSQL pool: connections kept open, extra burst connections, seconds to
+# wait for one, seconds before a connection is recycled. Pre-ping costs a round
+# trip per checkout and is off by default; recycling handles stale connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+# Compiled-SQL cache entries, and server-side prepared statements per connection
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 1000))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", 500))
+
+# SQLite pragmas: page cache (KiB), memory-mapped I/O (MiB), lock wait (ms)
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 65536))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", 256))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 OFFICE_LAT = float(os.getenv("OFFICE_LAT"))
@@ -22,4 +44,98 @@ ALLOW_MULTIPLE_SESSIONS = os.getenv("ALLOW_MULTIPLE_SESSIONS", "true").lower() =
 MAX_UPLOAD_SIZE_BYTES = int(os.getenv("MAX_UPLOAD_SIZE_MB", 5)) * 1024 * 1024
 
 # Allowed image MIME types for face uploads
-ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
\ No newline at end of file
+ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+# Telegram update delivery: "polling" (default) or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+# Webhook mode: public base URL Telegram posts to and the shared secret it
+# must echo back. The secret is required; webhook mode refuses to start
+# without it. Host and port are where the standalone ASGI server listens;
+# workers and queue size bound how updates are drained.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 4))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+# "true" = serve the webhook from the admin API process instead of bot.main
+WEBHOOK_IN_API = os.getenv("WEBHOOK_IN_API", "false").lower() == "true"
+
+# Base URL of the Telegram Bot API (override to point at a local/fake server)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+
+# Conversation state store: "memory" (per process) or "sqlite" (shared file)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join(BASE_DIR, "instance", "bot_state.db"))
+
+# Admin API face uploads: threads running background upload jobs, how many
+# jobs may be queued or running at once, images analyzed concurrently across
+# all uploads, and where raw files wait for their job.
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", 2))
+UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", 20))
+UPLOAD_ANALYSIS_WORKERS = int(os.getenv("UPLOAD_ANALYSIS_WORKERS", 3))
+UPLOAD_STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", os.path.join(BASE_DIR, "instance", "upload_staging"))
+
+# Bulk import (POST /users/bulk, python -m backend.bulk_import): face
+# validation processes and users inserted per transaction
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", 2))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 200))
+
+# Group commit for bot writes (check-in/checkout): writes arriving within this
+# many milliseconds share one transaction and one fsync. 0 = commit each alone.
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", 0))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))
+
+# Bot-side user lookup cache: max entries, seconds an entry lives, and how
+# often (seconds) the shared users version counter is polled for changes
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 300))
+USER_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("USER_CACHE_VERSION_CHECK_SECONDS", 2))
+
+# Rate limiter engine: "exact" (per-key timestamp log, never admits more than
+# the limit), "sliding" (fixed-size approximate counters, sharded locks, idle
+# keys evicted) or "sqlite" (sliding counters in a file shared by all API
+# workers and bot processes). See benchmarks/rate_limiter.py.
+RATE_LIMIT_ENGINE = os.getenv("RATE_LIMIT_ENGINE", "exact").lower()
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", 16))
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", os.path.join(BASE_DIR, "instance", "rate_limits.db"))
+
+# Periodic maintenance (bot.scheduler). Intervals of 0 disable a job; each run
+# is shifted by up to ±MAINTENANCE_JITTER of its interval.
+MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true"
+MAINTENANCE_JITTER = float(os.getenv("MAINTENANCE_JITTER", 0.1))
+MAINTENANCE_LOCK_DIR = os.getenv("MAINTENANCE_LOCK_DIR", os.path.join(BASE_DIR, "instance", "locks"))
+USED_PHOTO_RETENTION_DAYS = int(os.getenv("USED_PHOTO_RETENTION_DAYS", 30))
+RETENTION_PURGE_MINUTES = float(os.getenv("RETENTION_PURGE_MINUTES", 60))
+MAINTENANCE_DELETE_CHUNK = int(os.getenv("MAINTENANCE_DELETE_CHUNK", 1000))
+ROLLUP_REFRESH_MINUTES = float(os.getenv("ROLLUP_REFRESH_MINUTES", 30))
+ROLLUP_REFRESH_DAYS = int(os.getenv("ROLLUP_REFRESH_DAYS", 2))
+SQLITE_OPTIMIZE_MINUTES = float(os.getenv("SQLITE_OPTIMIZE_MINUTES", 360))
+SQLITE_VACUUM_HOURS = float(os.getenv("SQLITE_VACUUM_HOURS", 0))   # full rewrite; off by default
+RATE_LIMIT_COMPACT_MINUTES = float(os.getenv("RATE_LIMIT_COMPACT_MINUTES", 10))
+STATE_PURGE_MINUTES = float(os.getenv("STATE_PURGE_MINUTES", 10))
+TEMP_SWEEP_MINUTES = float(os.getenv("TEMP_SWEEP_MINUTES", 60))
+TEMP_FILE_MAX_AGE_HOURS = float(os.getenv("TEMP_FILE_MAX_AGE_HOURS", 6))
+
+# Logging pipeline (bot.logging_config): directory for app.log, security.log
+# and audit.jsonl, queued records, records written per flush, and what to do
+# when the queue is full: "drop_info" (drop DEBUG/INFO, wait for WARNING+),
+# "drop" or "block"
+LOG_DIR = os.getenv("LOG_DIR", os.path.join(BASE_DIR, "logs"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 256))
+LOG_OVERFLOW = os.getenv("LOG_OVERFLOW", "drop_info").lower()
+
+# Structured copy of security events (bot.audit): "db" (audit_events table,
+# GET /audit), "jsonl" (LOG_DIR/audit.jsonl) or "off"; rows older than
+# AUDIT_RETENTION_DAYS are purged by the maintenance scheduler (0 = keep)
+AUDIT_SINK = os.getenv("AUDIT_SINK", "db").lower()
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", 90))
+
+# Metrics (bot.metrics): the bot serves GET /metrics on this host/port (0 =
+# off). The admin API's /metrics accepts METRICS_TOKEN as a Bearer token, or
+# an admin login token; without METRICS_TOKEN only admins can scrape it.
+BOT_METRICS_HOST = os.getenv("BOT_METRICS_HOST", "127.0.0.1")
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", 9101))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
@@ -1,31 +1,140 @@
+"""
+Engine and session factories.
+
+The engine is configured per backend:
+- SQLite: WAL with synchronous=NORMAL, a larger page cache, memory-mapped I/O,
+  in-memory temp tables and a busy timeout, set on every new connection.
+- PostgreSQL: a sized QueuePool (LIFO, so idle connections age out), periodic
+  recycling instead of a pre-ping round trip per checkout, a larger compiled
+  statement cache and server-side prepared statements. A plain postgresql://
+  URL uses psycopg 3 (the `postgres` extra), which serves both the sync and
+  the async engine.
+
+SessionLocal is the sync factory used by the bot and write endpoints.
+AsyncSessionLocal() returns an async factory for the admin API's read
+endpoints; the async driver (aiosqlite / psycopg) is imported on first use.
+"""
+
 import os
+import threading
+
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url, URL
 from sqlalchemy.orm import sessionmaker, declarative_base
-from bot.config import DATABASE_URL
 
-_is_sqlite = DATABASE_URL.startswith("sqlite")
+from bot.config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_PREPARED_STATEMENT_CACHE_SIZE,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE_MB,
+    SQLITE_BUSY_TIMEOUT_MS,
+)
+from bot.metrics import count_query
+
+_url = make_url(DATABASE_URL)
+_is_sqlite = _url.get_backend_name() == "sqlite"
+_is_postgres = _url.get_backend_name() == "postgresql"
+
+# SQLAlchemy's default PostgreSQL driver is psycopg2, which has no server-side
+# prepared statements; use psycopg 3 unless a driver is named explicitly
+if _is_postgres and _url.drivername == "postgresql":
+    _url = _url.set(drivername="postgresql+psycopg")
 
 # Ensure the directory for the SQLite file exists
-if _is_sqlite:
-    db_path = DATABASE_URL.replace("sqlite:///", "")
-    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+if _is_sqlite and _url.database and _url.database != ":memory:":
+    os.makedirs(os.path.dirname(os.path.abspath(_url.database)), exist_ok=True)
+
+
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-    connect_args={"check_same_thread": False} if _is_sqlite else {},
-)
 
-# Enable foreign key enforcement for SQLite
+def _engine_options(url: URL) -> dict:
+    if _is_sqlite:
+        options = {"pool_pre_ping": False}
+        if not url.get_driver_name().startswith("aiosqlite"):
+            options["connect_args"] = {
+                "check_same_thread": False,
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            }
+        return options
+
+    if _is_postgres:
+        options = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+            "pool_use_lifo": True,
+            "query_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+        if url.get_driver_name() == "psycopg":
+            # psycopg 3 prepares a statement server-side after this many executions
+            options["connect_args"] = {"prepare_threshold": 5}
+        return options
+
+    return {"pool_pre_ping": True}
+
+
+engine = create_engine(_url, echo=False, **_engine_options(_url))
+
 if _is_sqlite:
-    @event.listens_for(engine, "connect")
-    def _set_sqlite_pragma(dbapi_conn, connection_record):
-        cursor = dbapi_conn.cursor()
-        cursor.execute("PRAGMA journal_mode=WAL")
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
+    event.listen(engine, "connect", _sqlite_pragmas)
+event.listen(engine, "before_cursor_execute", count_query)
 
 SessionLocal = sessionmaker(bind=engine)
 
 Base = declarative_base()
+
+
+# ── Async sessions (admin API reads) ───────────────────────────
+
+_async_lock = threading.Lock()
+_async_sessionmaker = None
+
+
+def _async_url() -> URL:
+    if ASYNC_DATABASE_URL:
+        return make_url(ASYNC_DATABASE_URL)
+    if _is_sqlite:
+        return _url.set(drivername="sqlite+aiosqlite")
+    if _is_postgres:
+        if _url.get_driver_name() == "psycopg":
+            return _url  # psycopg 3 is sync and async
+        return _url.set(drivername="postgresql+asyncpg").update_query_dict(
+            {"prepared_statement_cache_size": str(DB_PREPARED_STATEMENT_CACHE_SIZE)}
+        )
+    raise RuntimeError(f"No async driver known for {_url.drivername}; set ASYNC_DATABASE_URL")
+
+
+def AsyncSessionLocal():
+    """Return the async_sessionmaker, creating the async engine on first call."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        with _async_lock:
+            if _async_sessionmaker is None:
+                from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+                url = _async_url()
+                async_engine = create_async_engine(url, echo=False, **_engine_options(url))
+                if _is_sqlite:
+                    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+                event.listen(async_engine.sync_engine, "before_cursor_execute", count_query)
+                _async_sessionmaker = async_sessionmaker(async_engine, expire_on_commit=False)
+    return _async_sessionmaker
@@ -1,9 +1,22 @@
 import os
-import shutil
+import time
+import queue
+import hashlib
 import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 import cv2
+import numpy as np
 from deepface import DeepFace
+from deepface.modules.verification import find_threshold
+from sqlalchemy.exc import IntegrityError
+from bot.database import SessionLocal
+from bot.models import FaceEmbedding
 from bot.logging_config import get_app_logger, get_security_logger
+from bot.metrics import registry
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 FACES_DIR = os.path.join(BASE_DIR, "bot", "registered_faces")
@@ -11,8 +24,39 @@ os.makedirs(FACES_DIR, exist_ok=True)
 
 MODEL_NAME = "SFace"
 DETECTOR = "ssd"
+DISTANCE_METRIC = "cosine"
 MAX_IMAGE_DIMENSION = 1920  # px – longest side
 
+# "best": the closest reference decides; "k_of_n": at least k references must agree
+MATCH_POLICY = os.getenv("FACE_MATCH_POLICY", "best")
+MATCH_MIN_AGREEMENT = int(os.getenv("FACE_MATCH_MIN_AGREEMENT", 2))
+
+# Inference service: worker processes (0 = run inline in dispatcher threads),
+# bounded queue length and how long callers wait for a result. The timeout
+# must stay well under the bot's 30 s window for sending the selfie, so a
+# user told to retry still has time to do so.
+INFERENCE_WORKERS = int(os.getenv("FACE_WORKERS", 2))
+INFERENCE_QUEUE_SIZE = int(os.getenv("FACE_QUEUE_SIZE", 16))
+INFERENCE_TIMEOUT_SECONDS = float(os.getenv("FACE_TIMEOUT_SECONDS", 10))
+
+FACE_STAGE = registry.histogram(
+    "face_stage_seconds", "Time spent in each face pipeline stage", ("stage",))
+FACE_QUEUE_WAIT = registry.histogram(
+    "face_queue_wait_seconds", "Time a verification waited in the inference queue")
+FACE_BATCH_RUN = registry.histogram(
+    "face_batch_run_seconds", "Time to verify one micro-batch on a worker")
+FACE_BATCH_SIZE = registry.histogram(
+    "face_batch_size", "Verifications per micro-batch", buckets=(1, 2, 4, 8, 16, 32))
+FACE_VERIFICATIONS = registry.counter(
+    "face_verifications_total", "Finished verifications by outcome", ("outcome",))
+FACE_REJECTED = registry.counter(
+    "face_rejected_total", "Verifications refused because the inference queue was full")
+
+# Micro-batching: concurrent selfies are embedded together, collecting for at
+# most BATCH_MAX_WAIT_MS after the first one or until BATCH_MAX_SIZE are queued.
+BATCH_MAX_SIZE = int(os.getenv("FACE_BATCH_MAX_SIZE", 8))
+BATCH_MAX_WAIT_MS = float(os.getenv("FACE_BATCH_MAX_WAIT_MS", 25))
+
 log = get_app_logger("face")
 sec_log = get_security_logger()
 
@@ -36,52 +80,344 @@ def _ensure_model() -> None:
         log.info("Face recognition model loaded.")
 
 
-def downscale_image(image_path: str) -> None:
-    """Resize image in-place if either dimension exceeds MAX_IMAGE_DIMENSION."""
-    img = cv2.imread(image_path)
+# ── In-memory image pipeline ───────────────────────────────────
+
+# Raw bytes (as downloaded from Telegram or uploaded), a decoded BGR array,
+# or a path on disk.
+ImageInput = bytes | np.ndarray | str
+
+
+def load_image(image: ImageInput) -> np.ndarray:
+    """Decode an image into a BGR array. Raises ValueError if it cannot be read."""
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        img = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+    else:
+        img = cv2.imread(image)
     if img is None:
-        return
+        raise ValueError("Could not decode image")
+    return img
+
+
+def downscale_image(image: ImageInput) -> np.ndarray:
+    """Return the image as an array, resized if either dimension exceeds MAX_IMAGE_DIMENSION."""
+    img = load_image(image)
     h, w = img.shape[:2]
     if max(h, w) <= MAX_IMAGE_DIMENSION:
-        return
+        return img
     scale = MAX_IMAGE_DIMENSION / max(h, w)
     new_w, new_h = int(w * scale), int(h * scale)
-    log.info("Downscaling %s from %dx%d to %dx%d", os.path.basename(image_path), w, h, new_w, new_h)
-    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
-    cv2.imwrite(image_path, resized, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    log.info("Downscaling image from %dx%d to %dx%d", w, h, new_w, new_h)
+    return cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+
+def save_image(img: np.ndarray, path: str) -> None:
+    """Encode an array as JPEG at `path`."""
+    if not cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 90]):
+        raise OSError(f"Could not write image to {path}")
+
+
+# ── Reference embedding cache ──────────────────────────────────
 
+_hashes: dict[str, tuple[int, int, str]] = {}   # path -> (mtime_ns, size, sha256)
+_hash_lock = threading.Lock()
 
-def validate_face_image(image_path: str) -> tuple[bool, str]:
+
+def file_hash(path: str) -> str:
     """
-    Validate that an image contains exactly one clearly detectable face.
-    Returns (True, "") on success or (False, reason) on failure.
+    SHA-256 of a file's contents (hex), recomputed only when its mtime or size
+    changes. Shared with backend.thumbnails, which names variants after it.
+    """
+    st = os.stat(path)
+    with _hash_lock:
+        cached = _hashes.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _hash_lock:
+        _hashes[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def forget_file_hashes(directory: str) -> None:
+    """Drop memoized hashes of files under `directory` (after its images change)."""
+    prefix = os.path.join(directory, "")
+    with _hash_lock:
+        for path in [p for p in _hashes if p.startswith(prefix)]:
+            del _hashes[path]
+
+
+def _reference_index(path: str) -> int:
+    """Extract N from ``reference_N.jpg``."""
+    return int(os.path.basename(path)[len("reference_"):-len(".jpg")])
+
+
+def _embed_batch(crops: list[np.ndarray]) -> np.ndarray:
+    """Embed aligned face crops with one model call; returns an (n × dim) matrix."""
+    with FACE_STAGE.time("embed"):
+        objs = DeepFace.represent(
+            img_path=list(crops),
+            model_name=MODEL_NAME,
+            detector_backend="skip",
+        )
+    if len(crops) == 1:
+        objs = [objs]
+    return np.stack([
+        np.asarray(per_image[0]["embedding"], dtype=np.float32).reshape(-1)
+        for per_image in objs
+    ])
+
+
+@dataclass(slots=True)
+class FaceAnalysis:
+    """Everything derived from one detector pass over an image."""
+    image: np.ndarray                   # decoded and downscaled input
+    regions: list[dict]                 # facial_area of each detection
+    confidences: list[float]            # detector confidence of each detection
+    crop: np.ndarray | None = None      # aligned BGR crop of the most confident face
+    embedding: np.ndarray | None = None
+
+
+def analyze_face(image: ImageInput, embed: bool = True) -> FaceAnalysis:
+    """
+    Decode and downscale an image, run the detector exactly once and, if a
+    face was found and `embed` is set, embed the most confident one.
+    Raises ValueError if the image cannot be decoded.
+    """
+    with FACE_STAGE.time("decode"):
+        img = downscale_image(image)
+    try:
+        with FACE_STAGE.time("detect"):
+            faces = DeepFace.extract_faces(
+                img_path=img,
+                detector_backend=DETECTOR,
+                enforce_detection=True,
+                align=True,
+                color_face="bgr",
+                normalize_face=False,
+            )
+    except ValueError:
+        # enforce_detection: no face found
+        faces = []
+
+    analysis = FaceAnalysis(
+        image=img,
+        regions=[f["facial_area"] for f in faces],
+        confidences=[f.get("confidence", 0) for f in faces],
+    )
+    if faces:
+        analysis.crop = max(faces, key=lambda f: f.get("confidence", 0))["face"]
+        if embed:
+            analysis.embedding = _embed_batch([analysis.crop])[0]
+    return analysis
+
+
+def _represent(image: np.ndarray | str) -> np.ndarray:
+    """Embed the most confident face in an image. Raises if no face is found."""
+    embedding = analyze_face(image).embedding
+    if embedding is None:
+        raise ValueError("No face detected in image")
+    return embedding
+
+
+def _store_embedding(phone: str, index: int, file_hash: str, vector: np.ndarray) -> None:
+    db = SessionLocal()
+    try:
+        row = db.query(FaceEmbedding).filter_by(
+            phone=phone, ref_index=index, model_name=MODEL_NAME
+        ).first()
+        if row is None:
+            row = FaceEmbedding(phone=phone, ref_index=index, model_name=MODEL_NAME)
+            db.add(row)
+        row.file_hash = file_hash
+        row.vector = vector.astype(np.float32).tobytes()
+        db.commit()
+    except IntegrityError:
+        # Another worker cached the same reference concurrently
+        db.rollback()
+    finally:
+        db.close()
+
+
+def cache_reference_embedding(
+    phone: str, index: int, reference_path: str, analysis: FaceAnalysis | None = None,
+) -> bool:
+    """
+    Store the embedding of reference image `index` for a user.
+    Pass the FaceAnalysis the reference was validated with to reuse its
+    embedding instead of running the model again.
+    Returns False (and logs) on failure; verification will retry lazily.
     """
     _ensure_model()
-    downscale_image(image_path)
     try:
-        faces = DeepFace.extract_faces(
-            img_path=image_path,
-            detector_backend=DETECTOR,
-            enforce_detection=True,
-            align=True,
-        )
-        if len(faces) == 0:
-            return False, "No face detected in image"
-        # Filter out low-confidence detections
-        confident = [f for f in faces if f.get("confidence", 0) > 0.5]
-        if len(confident) == 0:
-            return False, "No face detected with sufficient confidence"
-        if len(confident) > 1:
-            return False, f"Multiple faces detected ({len(confident)}); upload one face per image"
-        return True, ""
+        if analysis is not None and analysis.embedding is not None:
+            vector = analysis.embedding
+        else:
+            vector = _represent(reference_path)
+        _store_embedding(str(phone), index, file_hash(reference_path), vector)
+        log.info("Cached embedding for reference %d of %s", index, phone)
+        return True
     except Exception as e:
-        log.warning("Face validation error: %s", e)
+        log.warning("Could not cache embedding for reference %d of %s: %s", index, phone, e)
+        return False
+
+
+def drop_reference_embeddings(phone: str, index: int | None = None) -> None:
+    """
+    Forget cached embeddings for a user.
+    With `index`, remove only that reference and renumber the ones above it,
+    mirroring the file compaction done when a reference image is deleted.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(FaceEmbedding).filter(FaceEmbedding.phone == str(phone))
+        if index is None:
+            query.delete(synchronize_session=False)
+        else:
+            # Shifting rows in place can trip uq_face_embedding_ref mid-flush,
+            # so the rows above `index` are deleted and re-inserted one lower.
+            above = [
+                {
+                    "phone": row.phone,
+                    "ref_index": row.ref_index - 1,
+                    "file_hash": row.file_hash,
+                    "model_name": row.model_name,
+                    "vector": row.vector,
+                    "created_at": row.created_at,
+                }
+                for row in query.filter(FaceEmbedding.ref_index > index)
+            ]
+            query.filter(FaceEmbedding.ref_index >= index).delete(synchronize_session=False)
+            db.add_all(FaceEmbedding(**fields) for fields in above)
+        db.commit()
+    except Exception:
+        db.rollback()
+        log.error("Failed to drop cached embeddings for %s", phone, exc_info=True)
+    finally:
+        db.close()
+
+
+def _reference_embeddings(phone: str, reference_images: list[str]) -> list[tuple[str, np.ndarray]]:
+    """
+    Return (path, embedding) for every usable reference image.
+    Cached vectors are reused while the file hash matches; stale or missing
+    entries are recomputed and written back.
+    """
+    db = SessionLocal()
+    try:
+        cached = {
+            row.ref_index: row
+            for row in db.query(FaceEmbedding).filter_by(phone=str(phone), model_name=MODEL_NAME)
+        }
+    finally:
+        db.close()
+
+    result = []
+    for ref in reference_images:
+        index = _reference_index(ref)
+        digest = file_hash(ref)
+        row = cached.get(index)
+        if row is not None and row.file_hash == digest:
+            result.append((ref, np.frombuffer(row.vector, dtype=np.float32)))
+            continue
+        try:
+            vector = _represent(ref)
+        except Exception as e:
+            log.warning("Skipping bad reference %s for %s: %s", os.path.basename(ref), phone, e)
+            continue
+        _store_embedding(str(phone), index, digest, vector)
+        result.append((ref, vector))
+    return result
+
+
+# ── Matching ───────────────────────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class FaceMatch:
+    """Outcome of comparing one selfie against a user's references."""
+    verified: bool
+    threshold: float
+    distance: float | None = None   # best cosine distance
+    reference: int | None = None    # index N of the closest reference_N.jpg
+    agreeing: int = 0               # references within threshold
+    compared: int = 0               # references compared
+    reason: str = ""                # set when no comparison could be made
+
+    def __bool__(self) -> bool:
+        return self.verified
+
+
+def match_embeddings(
+    selfie: np.ndarray,
+    references: np.ndarray,
+    ref_indexes: list[int],
+    threshold: float,
+    policy: str = MATCH_POLICY,
+    min_agreement: int = MATCH_MIN_AGREEMENT,
+) -> FaceMatch:
+    """
+    Compare one embedding against an (n_refs × dim) matrix in a single pass.
+    With policy "k_of_n", `min_agreement` references (capped at n_refs) must
+    fall within the threshold; otherwise the best distance alone decides.
+    """
+    refs = references / np.linalg.norm(references, axis=1, keepdims=True)
+    distances = 1.0 - refs @ (selfie / np.linalg.norm(selfie))
+    best = int(np.argmin(distances))
+    agreeing = int(np.count_nonzero(distances <= threshold))
+
+    if policy == "k_of_n":
+        verified = agreeing >= min(min_agreement, len(ref_indexes))
+    else:
+        verified = bool(distances[best] <= threshold)
+
+    return FaceMatch(
+        verified=verified,
+        threshold=threshold,
+        distance=float(distances[best]),
+        reference=ref_indexes[best],
+        agreeing=agreeing,
+        compared=len(ref_indexes),
+    )
+
+
+def validate_face_image(image: ImageInput | FaceAnalysis) -> tuple[bool, str]:
+    """
+    Validate that an image contains exactly one clearly detectable face.
+    Accepts an existing FaceAnalysis so callers can reuse its detector pass.
+    Returns (True, "") on success or (False, reason) on failure.
+    """
+    _ensure_model()
+    if isinstance(image, FaceAnalysis):
+        analysis = image
+    else:
+        try:
+            analysis = analyze_face(image, embed=False)
+        except ValueError:
+            return False, "Could not read image"
+        except Exception as e:
+            log.warning("Face validation error: %s", e)
+            return False, "Could not detect a face in the image"
+
+    if len(analysis.confidences) == 0:
         return False, "Could not detect a face in the image"
+    # Filter out low-confidence detections
+    confident = [c for c in analysis.confidences if c > 0.5]
+    if len(confident) == 0:
+        return False, "No face detected with sufficient confidence"
+    if len(confident) > 1:
+        return False, f"Multiple faces detected ({len(confident)}); upload one face per image"
+    return True, ""
 
 
-def register_face(phone: str, image_path: str) -> bool:
+def register_face(phone: str, image: ImageInput) -> bool:
     """
-    Validate and copy a face image into the user's reference folder.
+    Validate a face image and save it into the user's reference folder.
     Returns True on success.
     """
     _ensure_model()
@@ -101,18 +437,17 @@ def register_face(phone: str, image_path: str) -> bool:
             log.warning("User %s already has 3 reference images", phone)
             return False
 
-        reference_path = os.path.join(user_dir, f"reference_{next_index}.jpg")
-        shutil.copy(image_path, reference_path)
-        downscale_image(reference_path)
-
         log.info("Validating reference image %d for %s", next_index, phone)
 
-        ok, reason = validate_face_image(reference_path)
+        analysis = analyze_face(image)
+        ok, reason = validate_face_image(analysis)
         if not ok:
-            os.remove(reference_path)
             log.warning("Face validation failed for %s: %s", phone, reason)
             return False
 
+        reference_path = os.path.join(user_dir, f"reference_{next_index}.jpg")
+        save_image(analysis.image, reference_path)
+        cache_reference_embedding(phone, next_index, reference_path, analysis)
         log.info("Reference image %d saved for %s", next_index, phone)
         return True
 
@@ -123,18 +458,18 @@ def register_face(phone: str, image_path: str) -> bool:
         return False
 
 
-def verify_face(phone: str, image_path: str) -> bool:
+def _prepare_verification(
+    phone: str, image: ImageInput, threshold: float,
+) -> FaceMatch | tuple[list[tuple[str, np.ndarray]], np.ndarray]:
     """
-    Compare an image against all reference images for a user.
-    Returns True if any reference matches.
+    Load a user's reference embeddings and detect the face in their selfie.
+    Returns (references, aligned crop), or a failed FaceMatch if there is
+    nothing to compare.
     """
-    _ensure_model()
-    log.info("Verifying face for user %s", phone)
-
     user_dir = os.path.join(FACES_DIR, str(phone))
     if not os.path.exists(user_dir):
         sec_log.warning("action=face_verify_no_folder | phone=%s", phone)
-        return False
+        return FaceMatch(verified=False, threshold=threshold, reason="no_folder")
 
     reference_images = sorted([
         os.path.join(user_dir, f)
@@ -144,33 +479,299 @@ def verify_face(phone: str, image_path: str) -> bool:
 
     if not reference_images:
         sec_log.warning("action=face_verify_no_refs | phone=%s", phone)
-        return False
+        return FaceMatch(verified=False, threshold=threshold, reason="no_refs")
 
-    # Downscale the selfie before comparing
-    downscale_image(image_path)
+    with FACE_STAGE.time("references"):
+        references = _reference_embeddings(phone, reference_images)
+    if not references:
+        sec_log.warning("action=face_verify_no_refs | phone=%s", phone)
+        return FaceMatch(verified=False, threshold=threshold, reason="no_refs")
 
-    for ref in reference_images:
+    # One detector pass over the selfie; embedding is batched by the caller
+    try:
+        crop = analyze_face(image, embed=False).crop
+    except Exception as e:
+        log.warning("Could not analyse selfie for %s: %s", phone, e)
+        crop = None
+    if crop is None:
+        sec_log.warning("action=face_verify_no_match | phone=%s | reason=no_face", phone)
+        return FaceMatch(verified=False, threshold=threshold, reason="no_face")
+
+    return references, crop
+
+
+def _finish_verification(
+    phone: str, references: list[tuple[str, np.ndarray]], selfie: np.ndarray, threshold: float,
+) -> FaceMatch:
+    with FACE_STAGE.time("match"):
+        match = match_embeddings(
+            selfie,
+            np.stack([vector for _, vector in references]),
+            [_reference_index(ref) for ref, _ in references],
+            threshold,
+        )
+
+    if match.verified:
+        log.info(
+            "Face match found for %s | ref=%d | distance=%.4f | threshold=%.4f",
+            phone, match.reference, match.distance, threshold,
+        )
+    else:
+        sec_log.warning(
+            "action=face_verify_no_match | phone=%s | distance=%.4f | threshold=%.4f",
+            phone, match.distance, threshold,
+        )
+    return match
+
+
+def verify_faces(jobs: list[tuple[str, ImageInput]]) -> list[FaceMatch | Exception]:
+    """
+    Verify several (phone, selfie) pairs at once.
+    Detection runs per image, then every selfie crop goes through the
+    recognition model in a single batched call. Each slot of the result
+    holds a FaceMatch, or the exception raised while processing that job.
+    """
+    _ensure_model()
+    threshold = find_threshold(MODEL_NAME, DISTANCE_METRIC)
+    results: list[FaceMatch | Exception | None] = [None] * len(jobs)
+    pending = []  # (slot, phone, references, crop)
+
+    for slot, (phone, image) in enumerate(jobs):
+        log.info("Verifying face for user %s", phone)
         try:
-            log.debug("Comparing with %s", os.path.basename(ref))
-            result = DeepFace.verify(
-                img1_path=ref,
-                img2_path=image_path,
-                model_name=MODEL_NAME,
-                detector_backend=DETECTOR,
-                distance_metric="cosine",
-                enforce_detection=True,
-                align=True,
-                silent=True,
-            )
-            if result.get("verified", False):
-                log.info("Face match found for %s", phone)
-                return True
+            prepared = _prepare_verification(phone, image, threshold)
         except Exception as e:
-            log.warning(
-                "Skipping bad reference %s for %s: %s",
-                os.path.basename(ref), phone, e,
-            )
+            results[slot] = e
             continue
+        if isinstance(prepared, FaceMatch):
+            results[slot] = prepared
+        else:
+            pending.append((slot, phone, *prepared))
+
+    if pending:
+        try:
+            selfies = _embed_batch([crop for *_, crop in pending])
+        except Exception as e:
+            for slot, *_ in pending:
+                results[slot] = e
+        else:
+            for (slot, phone, references, _), selfie in zip(pending, selfies):
+                results[slot] = _finish_verification(phone, references, selfie, threshold)
+
+    return results
+
+
+def _verify_in_worker(jobs: list[tuple[str, ImageInput]]) -> tuple[list, list]:
+    """Pool entry point: verify_faces() plus this worker's metric deltas for the parent."""
+    results = verify_faces(jobs)
+    return results, registry.take_deltas()
+
+
+def verify_face(phone: str, image: ImageInput) -> FaceMatch:
+    """
+    Compare an image against all reference images for a user.
+    Returns a FaceMatch; it is truthy when the configured policy is met.
+    """
+    result = verify_faces([(phone, image)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+# ── Inference service ──────────────────────────────────────────
+
+class InferenceBusy(Exception):
+    """Raised when the inference queue is full; the caller should retry later."""
+
+
+class InferenceService:
+    """
+    Runs face verification on a pool of warmed worker processes behind a bounded queue.
+
+    One dispatcher thread per worker feeds the pool, so at most `workers` batches
+    are in flight and everything else waits in the queue. Each dispatcher groups
+    queued jobs into micro-batches (see BATCH_MAX_SIZE / BATCH_MAX_WAIT_MS) that
+    a worker embeds in one model call. submit() never blocks: when the queue is
+    full it raises InferenceBusy instead of growing latency.
+    """
+
+    def __init__(
+        self,
+        workers: int = INFERENCE_WORKERS,
+        queue_size: int = INFERENCE_QUEUE_SIZE,
+        batch_size: int = BATCH_MAX_SIZE,
+        batch_wait_ms: float = BATCH_MAX_WAIT_MS,
+    ):
+        self.workers = workers
+        self.batch_size = max(batch_size, 1)
+        self.batch_wait = batch_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._pool: ProcessPoolExecutor | None = None
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_times: deque[float] = deque(maxlen=256)
+        self._run_times: deque[float] = deque(maxlen=256)
+        self._batch_sizes: deque[int] = deque(maxlen=256)
+
+    def start(self) -> None:
+        """Spawn the worker processes and dispatcher threads (idempotent)."""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            if self.workers > 0:
+                self._pool = self._new_pool()
+            for i in range(max(self.workers, 1)):
+                threading.Thread(target=self._dispatch, name=f"face-dispatch-{i}", daemon=True).start()
+            self._started = True
+            log.info("Face inference service started (workers=%d, queue=%d, batch=%d/%.0fms)",
+                     self.workers, self._queue.maxsize, self.batch_size, self.batch_wait * 1000)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: workers must not inherit TensorFlow or DB state from the parent
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_ensure_model,
+        )
+        # The executor only spawns a process per submit(), so nothing is loaded
+        # yet: start every worker now and wait until each has its model.
+        started = time.monotonic()
+        warmups = [pool.submit(_ensure_model) for _ in range(self.workers)]
+        try:
+            for future in warmups:
+                future.result()
+        except Exception as e:
+            log.error("Face worker warm-up failed: %s", e)
+        else:
+            log.info("Face workers warmed in %.1fs", time.monotonic() - started)
+        return pool
+
+    def submit(self, phone: str, image: ImageInput) -> Future:
+        """Queue a verification. Raises InferenceBusy if the queue is full."""
+        self.start()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((future, time.monotonic(), phone, image))
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            FACE_REJECTED.inc()
+            raise InferenceBusy()
+        return future
+
+    def verify(self, phone: str, image: ImageInput, timeout: float = INFERENCE_TIMEOUT_SECONDS) -> FaceMatch:
+        """
+        Submit and wait. Raises InferenceBusy or concurrent.futures.TimeoutError;
+        a timed-out job that has not started yet is cancelled, so the workers
+        never spend time on an answer nobody is waiting for.
+        """
+        future = self.submit(phone, image)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def _next_batch(self) -> list[tuple]:
+        """Block for one job, then keep collecting until the batch is full or the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [job for job in batch if job[0].set_running_or_notify_cancel()]
+
+    def _dispatch(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            started = time.monotonic()
+            with self._stats_lock:
+                self._in_flight += len(batch)
+            try:
+                results = self._run([(phone, image) for _, _, phone, image in batch])
+            except BaseException as e:
+                results = [e] * len(batch)
+            finished = time.monotonic()
+
+            FACE_BATCH_RUN.observe(finished - started)
+            FACE_BATCH_SIZE.observe(len(batch))
+            failed = 0
+            for (future, enqueued_at, phone, _), result in zip(batch, results):
+                FACE_QUEUE_WAIT.observe(started - enqueued_at)
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                    failed += 1
+                    FACE_VERIFICATIONS.labels("error").inc()
+                else:
+                    future.set_result(result)
+                    FACE_VERIFICATIONS.labels("verified" if result.verified else "rejected").inc()
+                log.debug(
+                    "action=face_job | phone=%s | wait_ms=%.0f | run_ms=%.0f | batch=%d | queued=%d",
+                    phone, (started - enqueued_at) * 1000, (finished - started) * 1000,
+                    len(batch), self._queue.qsize(),
+                )
+
+            with self._stats_lock:
+                self._in_flight -= len(batch)
+                self._completed += len(batch) - failed
+                self._failed += failed
+                self._wait_times.extend(started - enqueued_at for _, enqueued_at, _, _ in batch)
+                self._run_times.append(finished - started)
+                self._batch_sizes.append(len(batch))
+
+    def _run(self, jobs: list[tuple[str, ImageInput]]) -> list[FaceMatch | Exception]:
+        pool = self._pool
+        if pool is None:
+            return verify_faces(jobs)
+        try:
+            results, deltas = pool.submit(_verify_in_worker, jobs).result()
+            registry.merge_deltas(deltas)
+            return results
+        except BrokenProcessPool:
+            with self._start_lock:
+                if self._pool is pool:
+                    log.error("Face worker pool died; restarting it")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = self._new_pool()
+            raise
+
+    def stats(self) -> dict:
+        """Queue depth, counters and recent wait/run times (seconds) for monitoring."""
+        with self._stats_lock:
+            waits, runs = list(self._wait_times), list(self._run_times)
+            sizes = list(self._batch_sizes)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_seconds": sum(waits) / len(waits) if waits else 0.0,
+                "max_wait_seconds": max(waits, default=0.0),
+                "avg_run_seconds": sum(runs) / len(runs) if runs else 0.0,
+                "max_run_seconds": max(runs, default=0.0),
+                "avg_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+            }
+
+
+inference = InferenceService()
 
-    sec_log.warning("action=face_verify_no_match | phone=%s", phone)
-    return False
+registry.callback("face_queue_depth", "Verifications waiting for a worker",
+                  lambda: inference.stats()["queue_depth"])
+registry.callback("face_in_flight", "Verifications being processed",
+                  lambda: inference.stats()["in_flight"])
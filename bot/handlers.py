@@ -1,15 +1,23 @@
 import telebot
+import telebot.apihelper
+import functools
 import os
 from telebot.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from sqlalchemy.exc import IntegrityError
 from bot.database import SessionLocal
 from bot.models import User, Attendance, UsedPhoto
-from bot.config import BOT_TOKEN
-from bot.face import verify_face, register_face
+from bot.config import BOT_TOKEN, BOT_MODE, TELEGRAM_API_URL
+from bot.face import register_face, inference, InferenceBusy
 from bot.location import is_valid_location
 from bot.logging_config import get_app_logger, get_security_logger
+from bot.rollup import record_checkin, record_checkout, remove_user as remove_user_from_rollup
+from bot.writer import writer
+from bot.user_cache import user_cache, bump_users_version
 from bot.rate_limiter import face_verify_limiter, checkin_limiter
+from bot.state import make_store, WaitPhone, WaitLocation, WaitPhoto, AdminFaceRegistration
+from bot.metrics import registry
 from datetime import datetime, timezone
+from concurrent.futures import TimeoutError as InferenceTimeout
 
 log = get_app_logger("bot")
 sec_log = get_security_logger()
@@ -17,10 +25,16 @@ sec_log = get_security_logger()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FACES_DIR = os.path.join(BASE_DIR, "registered_faces")
 
-bot = telebot.TeleBot(BOT_TOKEN)
+if TELEGRAM_API_URL:
+    telebot.apihelper.API_URL = TELEGRAM_API_URL.rstrip("/") + "/bot{0}/{1}"
+    telebot.apihelper.FILE_URL = TELEGRAM_API_URL.rstrip("/") + "/file/bot{0}/{1}"
+
+# In webhook mode bot.webhook's workers run the handlers themselves
+bot = telebot.TeleBot(BOT_TOKEN, threaded=BOT_MODE != "webhook")
+
+user_states = make_store("user")
+admin_states = make_store("admin")
 
-user_states = {}
-admin_states = {}
 ADMIN_IDS = list(map(int, os.getenv("ADMIN_IDS", "").split(",")))
 
 # Clean leftover temp files on startup
@@ -33,8 +47,35 @@ for _f in os.listdir():
 
 MAX_PHOTO_AGE_SECONDS = 60
 
+# State lifetimes: the selfie must follow the live location within
+# MAX_PHOTO_DELAY_SECONDS; other steps are abandoned after STATE_TTL_SECONDS.
+MAX_PHOTO_DELAY_SECONDS = 30
+STATE_TTL_SECONDS = 600
+ADMIN_STATE_TTL_SECONDS = 900
+
+
+STEP_SECONDS = registry.histogram(
+    "bot_step_seconds", "Handler latency per check-in step", ("step",))
+RATE_LIMITED = registry.counter(
+    "bot_rate_limited_total", "Requests rejected by a rate limiter", ("limiter",))
+CHECKIN_OUTCOMES = registry.counter(
+    "bot_checkin_outcomes_total", "Check-in photos by outcome", ("outcome",))
+
+
+def _timed(step: str):
+    """Observe the handler's latency under bot_step_seconds{step}."""
+    def decorator(fn):
+        series = STEP_SECONDS.labels(step)
+
+        @functools.wraps(fn)
+        def wrapper(message):
+            with series.time():
+                return fn(message)
+        return wrapper
+    return decorator
 
-def is_live_camera_photo(message, file_path):
+
+def is_live_camera_photo(message):
     """Returns (True, None) if valid or (False, reason) if invalid."""
     if message.forward_date is not None:
         return False, "Forwarded photos are not allowed. Take a live photo."
@@ -61,13 +102,9 @@ def normalize_phone(phone):
     return phone
 
 
-def _safe_cleanup(path: str) -> None:
-    """Delete a temp file if it exists, swallow errors."""
-    try:
-        if path and os.path.exists(path):
-            os.remove(path)
-    except OSError:
-        pass
+def purge_states() -> int:
+    """Drop expired conversation states (run by the maintenance scheduler)."""
+    return user_states.purge() + admin_states.purge()
 
 
 # ── /start ──────────────────────────────────────────────────────
@@ -80,10 +117,12 @@ def start(message):
 # ── /checkin ────────────────────────────────────────────────────
 
 @bot.message_handler(commands=["checkin"])
+@_timed("checkin")
 def checkin(message):
     uid = message.from_user.id
 
     if not checkin_limiter.hit(str(uid)):
+        RATE_LIMITED.labels("checkin").inc()
         sec_log.warning("action=checkin_rate_limit | telegram_id=%s", uid)
         bot.reply_to(message, "Too many check-in attempts. Please wait a few minutes.")
         return
@@ -91,17 +130,18 @@ def checkin(message):
     markup = ReplyKeyboardMarkup(resize_keyboard=True)
     markup.add(KeyboardButton("Share Phone Number", request_contact=True))
     bot.send_message(message.chat.id, "Share your phone number", reply_markup=markup)
-    user_states[uid] = "WAIT_PHONE"
+    user_states.set(uid, WaitPhone(), STATE_TTL_SECONDS)
     log.info("action=checkin_started | telegram_id=%s", uid)
 
 
 # ── Contact handler ─────────────────────────────────────────────
 
 @bot.message_handler(content_types=["contact"])
+@_timed("contact")
 def contact_handler(message):
     uid = message.from_user.id
 
-    if user_states.get(uid) != "WAIT_PHONE":
+    if not isinstance(user_states.get(uid), WaitPhone):
         bot.reply_to(message, "Please use /checkin before sharing phone number.")
         return
 
@@ -115,34 +155,51 @@ def contact_handler(message):
         telegram_id = str(uid)
         phone = normalize_phone(message.contact.phone_number)
 
-        user = db.query(User).filter_by(phone=phone).first()
-        if not user:
+        # Reads go through the cache; the row is only loaded when it has to change
+        cached = user_cache.by_phone(phone)
+        user = None
+        if cached is not None and (
+            cached.telegram_id != telegram_id or cached.name != message.from_user.first_name
+        ):
+            user = db.get(User, cached.id)
+            if user is None:
+                cached = None   # deleted since it was cached
+
+        if cached is None:
             bot.send_message(
                 message.chat.id,
                 "You are not registered. Contact admin.",
                 reply_markup=ReplyKeyboardRemove(),
             )
-            user_states.pop(uid, None)
+            user_states.pop(uid)
             return
 
-        if user.telegram_id and user.telegram_id != telegram_id:
+        linked_to = user.telegram_id if user is not None else cached.telegram_id
+        if linked_to and linked_to != telegram_id:
             sec_log.warning(
                 "action=phone_hijack_attempt | phone=%s | existing_tid=%s | attacker_tid=%s",
-                phone, user.telegram_id, telegram_id,
+                phone, linked_to, telegram_id,
             )
             bot.reply_to(message, "This phone is already linked to another Telegram account.")
             return
 
-        existing_user = db.query(User).filter_by(telegram_id=telegram_id).first()
-        if existing_user and existing_user.id != user.id:
-            db.delete(existing_user)
-            db.commit()
-
-        user.telegram_id = telegram_id
-        user.name = message.from_user.first_name
-        db.commit()
-
-        user_states[uid] = "WAIT_LOCATION"
+        # Relink in one transaction; nothing is written when already linked
+        if user is not None:
+            existing_user = db.query(User).filter_by(telegram_id=telegram_id).first()
+            if existing_user and existing_user.id != user.id:
+                # Its attendance goes with it (ON DELETE CASCADE): take it out of the rollup too
+                remove_user_from_rollup(db, existing_user.id)
+                db.delete(existing_user)
+                db.flush()
+
+            user.telegram_id = telegram_id
+            user.name = message.from_user.first_name
+            if db.deleted or db.is_modified(user):
+                bump_users_version(db)
+                db.commit()
+                user_cache.invalidate()
+
+        user_states.set(uid, WaitLocation(), STATE_TTL_SECONDS)
         bot.send_message(
             message.chat.id,
             "Phone verified. Send live location.",
@@ -159,6 +216,7 @@ def contact_handler(message):
 # ── Location handler ─────────────────────────────────────────────
 
 @bot.message_handler(content_types=["location"])
+@_timed("location")
 def location_handler(message):
     uid = message.from_user.id
 
@@ -166,7 +224,7 @@ def location_handler(message):
         bot.reply_to(message, "Please send LIVE location, not static location")
         return
 
-    if user_states.get(uid) != "WAIT_LOCATION":
+    if not isinstance(user_states.get(uid), WaitLocation):
         bot.reply_to(message, "Please use /checkin before sending location.")
         return
 
@@ -178,73 +236,113 @@ def location_handler(message):
         bot.reply_to(message, "Not in office location")
         return
 
-    user_states[uid] = ("WAIT_PHOTO", lat, lon, datetime.now(timezone.utc).timestamp())
+    user_states.set(
+        uid,
+        WaitPhoto(lat, lon, datetime.now(timezone.utc).timestamp()),
+        MAX_PHOTO_DELAY_SECONDS,
+    )
     log.info("action=location_accepted | telegram_id=%s", uid)
     bot.reply_to(message, "Send your photo")
 
 
+# ── Check-in / checkout writes ──────────────────────────────────
+
+class PhotoReplay(Exception):
+    """The photo's file_unique_id is already in used_photos."""
+
+
+class AlreadyCheckedIn(Exception):
+    """uq_user_date: the user has an attendance row for today."""
+
+
+def _record_checkin(db, user_id: int, photo_unique_id: str, lat: float, lon: float) -> None:
+    """Write unit (see bot.writer). Each flush surfaces its own constraint violation."""
+    now = datetime.now(timezone.utc)
+    db.add(UsedPhoto(file_unique_id=photo_unique_id, user_id=user_id, used_at=now))
+    try:
+        db.flush()
+    except IntegrityError:
+        raise PhotoReplay()
+
+    db.add(Attendance(user_id=user_id, check_in=now, lat=lat, lon=lon, date=now.date()))
+    try:
+        db.flush()
+    except IntegrityError:
+        raise AlreadyCheckedIn()
+
+    record_checkin(db, now.date())
+
+
+def _record_checkout(db, user_id: int) -> bool:
+    """Write unit: close today's open attendance row. Returns False if there is none."""
+    now = datetime.now(timezone.utc)
+    attendance = db.query(Attendance).filter_by(
+        user_id=user_id, check_out=None
+    ).filter(
+        Attendance.date == now.date()
+    ).first()
+    if attendance is None:
+        return False
+
+    # Conditional update so a repeated /checkout can't be counted twice
+    closed = db.query(Attendance).filter_by(
+        id=attendance.id, check_out=None
+    ).update({Attendance.check_out: now}, synchronize_session="fetch")
+    if not closed:
+        return False
+    record_checkout(db, attendance)
+    return True
+
+
 # ── Photo handler ────────────────────────────────────────────────
 
 @bot.message_handler(content_types=["photo"])
+@_timed("photo")
 def photo_handler(message):
     uid = message.from_user.id
 
     # ── Admin face registration ──
-    if uid in admin_states:
-        _handle_admin_face(message)
+    admin_state = admin_states.get(uid)
+    if admin_state is not None:
+        _handle_admin_face(message, admin_state)
         return
 
     # ── User check-in photo ──
+    # WaitPhoto expires MAX_PHOTO_DELAY_SECONDS after the location was accepted
     state = user_states.get(uid)
-    if not state or not isinstance(state, tuple) or state[0] != "WAIT_PHOTO":
-        bot.reply_to(message, "Please use /checkin before sending photo.")
-        return
-
-    lat, lon, location_time = state[1], state[2], state[3]
-    MAX_DELAY = 30
-
-    if datetime.now(timezone.utc).timestamp() - location_time > MAX_DELAY:
+    if not isinstance(state, WaitPhoto):
         bot.reply_to(
             message,
-            "Photo must be taken immediately after sending live location. Please check in again.",
+            "No active check-in. Use /checkin and send the photo immediately after your live location.",
         )
-        user_states.pop(uid, None)
         return
 
-    file_info = bot.get_file(message.photo[-1].file_id)
-    downloaded = bot.download_file(file_info.file_path)
-    path = os.path.join(BASE_DIR, f"temp_{uid}.jpg")
-
-    with open(path, "wb") as f:
-        f.write(downloaded)
+    lat, lon = state.lat, state.lon
 
-    valid, reason = is_live_camera_photo(message, path)
+    valid, reason = is_live_camera_photo(message)
     if not valid:
         sec_log.warning("action=non_live_photo | telegram_id=%s | reason=%s", uid, reason)
         bot.reply_to(message, reason)
-        _safe_cleanup(path)
-        user_states.pop(uid, None)
+        user_states.pop(uid)
         return
 
+    # Kept in memory end to end; no temp file per user
+    with STEP_SECONDS.time("photo.download"):
+        file_info = bot.get_file(message.photo[-1].file_id)
+        downloaded = bot.download_file(file_info.file_path)
+
+    keep_state = False
     db = get_db()
     try:
-        user = db.query(User).filter_by(telegram_id=str(uid)).first()
+        user = user_cache.by_telegram_id(uid)
         if not user:
             bot.reply_to(message, "User not registered")
             return
 
-        # Anti-replay
+        # Anti-replay: cheap early reject before spending inference on the photo;
+        # the unique constraint enforces it when the check-in is written.
         photo_unique_id = message.photo[-1].file_unique_id
-        used = UsedPhoto(
-            file_unique_id=photo_unique_id,
-            user_id=user.id,
-            used_at=datetime.now(timezone.utc),
-        )
-        db.add(used)
-        try:
-            db.commit()
-        except IntegrityError:
-            db.rollback()
+        if db.query(UsedPhoto.id).filter_by(file_unique_id=photo_unique_id).first():
             sec_log.warning("action=photo_replay | telegram_id=%s | file_uid=%s", uid, photo_unique_id)
             bot.reply_to(message, "This photo was already used. Please take a new live photo.")
             return
@@ -258,40 +356,60 @@ def photo_handler(message):
             bot.reply_to(message, "Face not registered. Contact admin.")
             return
 
-        # Rate-limited face verification
-        if not face_verify_limiter.is_allowed(str(uid)):
+        # Rate-limited face verification; the attempt is taken atomically up
+        # front and given back if inference never got to run
+        if not face_verify_limiter.hit(str(uid)):
+            RATE_LIMITED.labels("face_verify").inc()
             sec_log.warning("action=face_verify_rate_limit | telegram_id=%s", uid)
             bot.reply_to(message, "Too many verification attempts. Please wait.")
             return
-        face_verify_limiter.record(str(uid))
 
-        verified = verify_face(phone, path)
-        if not verified:
-            sec_log.warning("action=face_mismatch | telegram_id=%s | phone=%s", uid, phone)
-            bot.reply_to(message, "Face not recognized")
+        try:
+            with STEP_SECONDS.time("photo.verify"):
+                match = inference.verify(phone, downloaded)
+        except (InferenceBusy, InferenceTimeout) as e:
+            face_verify_limiter.refund(str(uid))
+            CHECKIN_OUTCOMES.labels("busy").inc()
+            log.warning(
+                "action=face_verify_busy | telegram_id=%s | reason=%s | stats=%s",
+                uid, type(e).__name__, inference.stats(),
+            )
+            # Let the user send a fresh photo without restarting /checkin: the
+            # wait may have used up most of the state's lifetime, so renew it
+            user_states.set(uid, state, MAX_PHOTO_DELAY_SECONDS)
+            keep_state = True
+            bot.reply_to(message, "Face verification is busy. Please send a new photo in a few seconds.")
             return
 
-        # Prevent duplicate check-in (use date column)
-        today = datetime.now(timezone.utc).date()
-        existing = db.query(Attendance).filter_by(
-            user_id=user.id, date=today
-        ).first()
+        if not match.verified:
+            sec_log.warning(
+                "action=face_mismatch | telegram_id=%s | phone=%s | distance=%s | reason=%s",
+                uid, phone, match.distance, match.reason or "below_threshold",
+            )
+            CHECKIN_OUTCOMES.labels("face_mismatch").inc()
+            bot.reply_to(message, "Face not recognized")
+            return
 
-        if existing:
+        # One transaction: anti-replay row, attendance row and rollup counters
+        try:
+            with STEP_SECONDS.time("photo.record"):
+                writer.run(_record_checkin, user.id, photo_unique_id, lat, lon)
+        except PhotoReplay:
+            CHECKIN_OUTCOMES.labels("replay").inc()
+            sec_log.warning("action=photo_replay | telegram_id=%s | file_uid=%s", uid, photo_unique_id)
+            bot.reply_to(message, "This photo was already used. Please take a new live photo.")
+            return
+        except AlreadyCheckedIn:
+            CHECKIN_OUTCOMES.labels("already_checked_in").inc()
             bot.reply_to(message, "Already checked in today")
             return
 
-        attendance = Attendance(
-            user_id=user.id,
-            check_in=datetime.now(timezone.utc),
-            lat=lat,
-            lon=lon,
-            date=today,
-        )
-        db.add(attendance)
-        db.commit()
+        CHECKIN_OUTCOMES.labels("success").inc()
 
-        log.info("action=checkin_success | telegram_id=%s | user_id=%d", uid, user.id)
+        log.info(
+            "action=checkin_success | telegram_id=%s | user_id=%d | ref=%d | distance=%.4f",
+            uid, user.id, match.reference, match.distance,
+        )
         bot.reply_to(message, "Check-in successful")
 
     except Exception:
@@ -299,15 +417,15 @@ def photo_handler(message):
         bot.reply_to(message, "An error occurred. Please try again.")
     finally:
         db.close()
-        _safe_cleanup(path)
-        user_states.pop(uid, None)
+        if not keep_state:
+            user_states.pop(uid)
 
 
 # ── Admin face registration helper ──────────────────────────────
 
-def _handle_admin_face(message):
+def _handle_admin_face(message, state: AdminFaceRegistration):
     uid = message.from_user.id
-    phone = normalize_phone(admin_states[uid])
+    phone = normalize_phone(state.phone)
 
     file_info = bot.get_file(message.photo[-1].file_id)
     downloaded = bot.download_file(file_info.file_path)
@@ -315,12 +433,7 @@ def _handle_admin_face(message):
     user_dir = os.path.join(FACES_DIR, phone)
     os.makedirs(user_dir, exist_ok=True)
 
-    temp_path = os.path.join(BASE_DIR, f"temp_admin_{phone}.jpg")
-    with open(temp_path, "wb") as f:
-        f.write(downloaded)
-
-    success = register_face(phone, temp_path)
-    _safe_cleanup(temp_path)
+    success = register_face(phone, downloaded)
 
     if success:
         face_count = len([
@@ -328,17 +441,21 @@ def _handle_admin_face(message):
             if f.startswith("reference_") and f.endswith(".jpg")
         ])
 
-        db = get_db()
-        try:
-            user = db.query(User).filter_by(phone=phone).first()
-            if not user:
-                user = User(phone=phone, telegram_id=None, name="Employee", face_registered=face_count)
-                db.add(user)
-            else:
-                user.face_registered = face_count
-            db.commit()
-        finally:
-            db.close()
+        cached = user_cache.by_phone(phone)
+        if cached is None or cached.face_registered != face_count:
+            db = get_db()
+            try:
+                user = db.get(User, cached.id) if cached is not None else None
+                if not user:
+                    user = User(phone=phone, telegram_id=None, name="Employee", face_registered=face_count)
+                    db.add(user)
+                else:
+                    user.face_registered = face_count
+                bump_users_version(db)
+                db.commit()
+            finally:
+                db.close()
+            user_cache.invalidate()
 
         log.info("action=admin_face_registered | admin=%s | phone=%s | count=%d", uid, phone, face_count)
 
@@ -346,7 +463,7 @@ def _handle_admin_face(message):
             bot.reply_to(message, f"Face {face_count}/3 registered for {phone}. Send another photo or wait.")
         else:
             bot.reply_to(message, f"All 3 faces registered for {phone}.")
-            del admin_states[uid]
+            admin_states.pop(uid)
     else:
         bot.reply_to(message, "No face detected or max 3 faces reached")
 
@@ -354,25 +471,16 @@ def _handle_admin_face(message):
 # ── /checkout ───────────────────────────────────────────────────
 
 @bot.message_handler(commands=["checkout"])
+@_timed("checkout")
 def checkout(message):
     uid = message.from_user.id
-    db = get_db()
     try:
-        user = db.query(User).filter_by(telegram_id=str(uid)).first()
+        user = user_cache.by_telegram_id(uid)
         if not user:
             bot.reply_to(message, "User not registered")
             return
 
-        # Safe checkout: find today's record with no check_out
-        attendance = db.query(Attendance).filter_by(
-            user_id=user.id, check_out=None
-        ).filter(
-            Attendance.date == datetime.now(timezone.utc).date()
-        ).first()
-
-        if attendance:
-            attendance.check_out = datetime.now(timezone.utc)
-            db.commit()
+        if writer.run(_record_checkout, user.id):
             log.info("action=checkout_success | telegram_id=%s | user_id=%d", uid, user.id)
             bot.reply_to(message, "Checkout successful")
         else:
@@ -380,8 +488,6 @@ def checkout(message):
     except Exception:
         log.error("Unexpected error in checkout", exc_info=True)
         bot.reply_to(message, "An error occurred. Please try again.")
-    finally:
-        db.close()
 
 
 # ── /register_face (admin) ──────────────────────────────────────
@@ -400,7 +506,7 @@ def register_face_command(message):
         return
 
     phone = normalize_phone(parts[1])
-    admin_states[uid] = phone
+    admin_states.set(uid, AdminFaceRegistration(phone), ADMIN_STATE_TTL_SECONDS)
     log.info("action=admin_register_face_start | admin=%s | phone=%s", uid, phone)
     bot.reply_to(message, f"Send face photo for phone {phone}")
 
@@ -412,13 +518,13 @@ def fallback_handler(message):
     uid = message.from_user.id
     state = user_states.get(uid)
 
-    if state == "WAIT_PHONE":
+    if isinstance(state, WaitPhone):
         bot.reply_to(message, "Please share your phone number using the button.")
         return
-    elif state == "WAIT_LOCATION":
+    elif isinstance(state, WaitLocation):
         bot.reply_to(message, "Please send LIVE location using Telegram location sharing.")
         return
-    elif isinstance(state, tuple) and state[0] == "WAIT_PHOTO":
+    elif isinstance(state, WaitPhoto):
         bot.reply_to(message, "Please take and send a live photo using your camera.")
         return
 
@@ -3,49 +3,242 @@ Centralized logging configuration.
 - app.log   : general application events
 - security.log : security-related events (login, auth, replay, brute-force)
 Both use RotatingFileHandler (5 MB, 5 backups) with UTC timestamps.
+
+Loggers never touch files on the caller's thread: every logger publishes to
+one bounded queue that a single listener thread drains in batches, writing a
+whole batch before flushing and rotating files in the background. When the
+queue is full LOG_OVERFLOW decides what happens to a new record:
+- drop_info : drop DEBUG/INFO, wait for room for WARNING and above (default)
+- drop      : drop everything
+- block     : always wait
+Security events are never dropped: they always wait for room. Dropped
+records are counted and reported by the listener. Security events are also
+parsed into structured rows by bot.audit, which writes them from its own
+thread.
 """
 
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from datetime import datetime, timezone
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from bot.config import LOG_DIR, LOG_QUEUE_SIZE, LOG_BATCH_SIZE, LOG_OVERFLOW
+from bot.audit import make_audit_handler
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-LOG_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
+_SECURITY = "attendance.security"
+
 
 class UTCFormatter(logging.Formatter):
-    """Force all timestamps to UTC."""
-    converter = lambda *args: datetime.now(timezone.utc).timetuple()
+    """
+    Force all timestamps to UTC. The timestamp string is rendered once per
+    second, and a record's text is reused by every handler sharing this formatter.
+    """
+    converter = time.gmtime
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._second = None
+        self._stamp = ""
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        if second != self._second:
+            self._stamp = time.strftime(datefmt or self.default_time_format, time.gmtime(second))
+            self._second = second
+        return self._stamp
+
+    def format(self, record):
+        cached = record.__dict__.get("_formatted")
+        if cached is not None and cached[0] is self:
+            return cached[1]
+        text = super().format(record)
+        record._formatted = (self, text)
+        return text
 
 
 _LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
 _DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+_formatter = UTCFormatter(_LOG_FORMAT, datefmt=_DATE_FORMAT)
+
+
+# ── Handlers (run on the listener thread) ───────────────────────
+
+class _BatchedRotatingFileHandler(RotatingFileHandler):
+    """Writes without flushing (the listener flushes once per batch) and tracks the file size itself."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, delay=True, **kwargs)
+        self._size = 0
+
+    def _open(self):
+        stream = super()._open()
+        self._size = stream.seek(0, os.SEEK_END)
+        return stream
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self._size and self._size + len(msg) >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(msg)
+            self._size += len(msg)
+        except Exception:
+            self.handleError(record)
+
+
+class _BatchedStreamHandler(logging.StreamHandler):
+    """Console counterpart of _BatchedRotatingFileHandler."""
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
 
 
 def _make_handler(filename: str, level: int = logging.DEBUG) -> RotatingFileHandler:
     path = os.path.join(LOG_DIR, filename)
-    handler = RotatingFileHandler(
+    handler = _BatchedRotatingFileHandler(
         path,
         maxBytes=3 * 1024 * 1024,   # 5 MB
         backupCount=3,
         encoding="utf-8",
     )
     handler.setLevel(level)
-    fmt = UTCFormatter(_LOG_FORMAT, datefmt=_DATE_FORMAT)
-    handler.setFormatter(fmt)
+    handler.setFormatter(_formatter)
     return handler
 
 
 def _make_console_handler(level: int = logging.INFO) -> logging.StreamHandler:
-    handler = logging.StreamHandler()
+    handler = _BatchedStreamHandler()
     handler.setLevel(level)
-    fmt = UTCFormatter(_LOG_FORMAT, datefmt=_DATE_FORMAT)
-    handler.setFormatter(fmt)
+    handler.setFormatter(_formatter)
     return handler
 
 
+# ── Queue ───────────────────────────────────────────────────────
+
+class _BoundedQueueHandler(QueueHandler):
+    """
+    Enqueues without blocking the caller, applying LOG_OVERFLOW when the queue
+    is full; security records always wait for room.
+    """
+
+    def __init__(self, q: queue.Queue, overflow: str):
+        super().__init__(q)
+        self.overflow = overflow
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == "block" or record.name == _SECURITY or (
+                self.overflow == "drop_info" and record.levelno >= logging.WARNING
+            ):
+                self.queue.put(record)
+                return
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def take_dropped(self) -> int:
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+
+class _BatchingQueueListener(QueueListener):
+    """Drains up to LOG_BATCH_SIZE records per wakeup and flushes handlers once per batch."""
+
+    def __init__(self, q: queue.Queue, source: _BoundedQueueHandler, *handlers):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self.source = source
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    self.handle(record)
+            dropped = self.source.take_dropped()
+            if dropped:
+                self.handle(logging.makeLogRecord({
+                    "name": "attendance.logging", "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": "Log queue full: dropped %d record(s)", "args": (dropped,),
+                }))
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except Exception:
+                    pass
+            for _ in batch:
+                q.task_done()
+            if stop:
+                return
+
+
+def _is_security(record) -> bool:
+    return record.name == _SECURITY
+
+
+def _not_security(record) -> bool:
+    return record.name != _SECURITY
+
+
+def _console_filter(record) -> bool:
+    # Security events reach the console from WARNING up, like before
+    return record.name != _SECURITY or record.levelno >= logging.WARNING
+
+
+_queue_handler: _BoundedQueueHandler | None = None
+_setup_lock = threading.Lock()
+
+
+def _shared_queue_handler() -> QueueHandler:
+    """Create the queue, file/console handlers and listener thread once per process."""
+    global _queue_handler
+    with _setup_lock:
+        if _queue_handler is None:
+            app_file = _make_handler("app.log")
+            app_file.addFilter(_not_security)
+            security_file = _make_handler("security.log")
+            security_file.addFilter(_is_security)
+            console = _make_console_handler()
+            console.addFilter(_console_filter)
+            handlers = [app_file, security_file, console]
+            audit = make_audit_handler(LOG_DIR, LOG_BATCH_SIZE)
+            if audit is not None:
+                audit.addFilter(_is_security)
+                handlers.append(audit)
+
+            handler = _BoundedQueueHandler(queue.Queue(LOG_QUEUE_SIZE), LOG_OVERFLOW)
+            listener = _BatchingQueueListener(handler.queue, handler, *handlers)
+            listener.start()
+            atexit.register(listener.stop)   # drain what is queued before exit
+            _queue_handler = handler
+        return _queue_handler
+
+
 # ── Public loggers ──────────────────────────────────────────────
 
 def get_app_logger(name: str = "app") -> logging.Logger:
@@ -53,18 +246,16 @@ def get_app_logger(name: str = "app") -> logging.Logger:
     logger = logging.getLogger(f"attendance.{name}")
     if not logger.handlers:
         logger.setLevel(logging.DEBUG)
-        logger.addHandler(_make_handler("app.log"))
-        logger.addHandler(_make_console_handler())
+        logger.addHandler(_shared_queue_handler())
         logger.propagate = False
     return logger
 
 
 def get_security_logger() -> logging.Logger:
     """Logger for security / audit events."""
-    logger = logging.getLogger("attendance.security")
+    logger = logging.getLogger(_SECURITY)
     if not logger.handlers:
         logger.setLevel(logging.DEBUG)
-        logger.addHandler(_make_handler("security.log"))
-        logger.addHandler(_make_console_handler(logging.WARNING))
+        logger.addHandler(_shared_queue_handler())
         logger.propagate = False
     return logger
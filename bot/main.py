@@ -1,7 +1,10 @@
-from bot.database import engine, Base, SessionLocal
-from bot.models import UsedPhoto
+from bot.migrations import upgrade as migrate
+from bot.config import BOT_MODE, WEBHOOK_IN_API, STATE_PURGE_MINUTES, BOT_METRICS_HOST, BOT_METRICS_PORT
 from bot.logging_config import get_app_logger
-from datetime import datetime, timezone, timedelta
+from bot.face import inference
+from bot import metrics
+from bot.rollup import ensure_backfilled
+from bot.scheduler import scheduler, add_default_jobs
 import bot.handlers as handlers
 import time
 import telebot.apihelper
@@ -12,38 +15,55 @@ log = get_app_logger("main")
 telebot.apihelper.READ_TIMEOUT = 60
 telebot.apihelper.CONNECT_TIMEOUT = 60
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-log.info("Database tables created / verified.")
-
-
-def cleanup_used_photos():
-    """Remove UsedPhoto records older than 30 days."""
-    db = SessionLocal()
-    try:
-        cutoff = datetime.now(timezone.utc) - timedelta(days=30)
-        deleted = db.query(UsedPhoto).filter(UsedPhoto.used_at < cutoff).delete()
-        db.commit()
-        log.info("Cleaned %d old used-photo records.", deleted)
-    except Exception:
-        db.rollback()
-        log.error("Failed to clean used photos", exc_info=True)
-    finally:
-        db.close()
-
-
-cleanup_used_photos()
-
-log.info("Bot starting…")
-
-while True:
-    try:
-        handlers.bot.infinity_polling(
-            timeout=60,
-            long_polling_timeout=60,
-            skip_pending=True,
-        )
-    except Exception as e:
-        log.error("Polling error: %s", e, exc_info=True)
-        log.info("Reconnecting in 5 seconds…")
-        time.sleep(5)
+
+def main():
+    # Create / upgrade the database schema
+    migrate()
+
+    ensure_backfilled()
+
+    if BOT_MODE == "webhook" and WEBHOOK_IN_API:
+        # The admin API process serves updates and runs the maintenance jobs;
+        # this process only points Telegram at it.
+        from bot import webhook
+        webhook.register_webhook()
+        log.info("Webhook updates are served by the admin API process.")
+        return
+
+    # Periodic maintenance; the used-photo purge runs on its own schedule after startup
+    add_default_jobs()
+    scheduler.every("state_purge", STATE_PURGE_MINUTES * 60, handlers.purge_states)
+    scheduler.start()
+
+    # Warm the face workers before the first check-in arrives
+    inference.start()
+
+    if BOT_METRICS_PORT:
+        metrics.serve(BOT_METRICS_HOST, BOT_METRICS_PORT)
+        log.info("Metrics served on http://%s:%d/metrics", BOT_METRICS_HOST, BOT_METRICS_PORT)
+
+    if BOT_MODE == "webhook":
+        from bot import webhook
+        log.info("Bot starting in webhook mode…")
+        webhook.serve()
+        return
+
+    log.info("Bot starting…")
+    handlers.bot.remove_webhook()
+
+    while True:
+        try:
+            handlers.bot.infinity_polling(
+                timeout=60,
+                long_polling_timeout=60,
+                skip_pending=True,
+            )
+        except Exception as e:
+            log.error("Polling error: %s", e, exc_info=True)
+            log.info("Reconnecting in 5 seconds…")
+            time.sleep(5)
+
+
+# Guarded: face worker processes are spawned and re-import this module
+if __name__ == "__main__":
+    main()
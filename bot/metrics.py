@@ -0,0 +1,360 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and fixed-bucket histograms live in one registry. Each
+labelled series is a small object with its own lock, created once and then
+updated with a few additions, so recording on hot paths costs little more
+than an attribute write. Values that already exist elsewhere (queue depths,
+cache counters) are registered as callbacks and read at scrape time.
+
+Face worker processes have their own registry: InferenceService ships the
+worker's counts back with each batch (take_deltas / merge_deltas), so stage
+timings measured there show up in the parent's /metrics.
+
+Served as GET /metrics by the admin API and, in the bot process, by a small
+HTTP listener on BOT_METRICS_HOST:BOT_METRICS_PORT (see serve()).
+
+DB statements are counted per request: the API middleware opens a scope with
+query_scope() and the engine's before_cursor_execute hook calls count_query().
+"""
+
+import bisect
+import contextvars
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond DB work up to slow face verification
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# ── Series ─────────────────────────────────────────────────────
+
+class _CounterSeries:
+    __slots__ = ("lock", "value")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeSeries(_CounterSeries):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+
+class _HistogramSeries:
+    __slots__ = ("lock", "bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple):
+        self.lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last slot: above every bound
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+# ── Metrics ────────────────────────────────────────────────────
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    @abstractmethod
+    def _new_series(self):
+        ...
+
+    def labels(self, *values):
+        """The series for these label values (created on first use)."""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            values = tuple(str(v) for v in values)
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def _items(self):
+        return list(self._series.items())
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, series in self._items():
+            lines.extend(self._render_series(values, series))
+        return lines
+
+    def _render_series(self, values, series) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(series.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_series(self):
+        return _GaugeSeries()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self, *values):
+        """Context manager observing the elapsed seconds for these label values."""
+        return self.labels(*values).time()
+
+    def _render_series(self, values, series) -> list[str]:
+        with series.lock:
+            counts, total = list(series.counts), series.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Callback(_Metric):
+    """A metric whose value is read from `fn()` at scrape time."""
+
+    def __init__(self, name: str, help: str, kind: str, fn: Callable[[], float]):
+        self.kind = kind
+        self.fn = fn
+        super().__init__(name, help)
+
+    def _new_series(self):
+        return None
+
+    def render(self) -> list[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {_format_value(value)}"]
+
+
+# ── Registry ───────────────────────────────────────────────────
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable[[], float], kind: str = "gauge") -> None:
+        """Expose a value owned elsewhere (queue depth, cache counters, …)."""
+        self._register(_Callback(name, help, kind, fn))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def take_deltas(self) -> list[tuple]:
+        """
+        Counter and histogram values recorded since the last call, reset to
+        zero. Used in worker processes; the parent applies them with merge_deltas().
+        """
+        deltas = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            if not isinstance(metric, (Counter, Histogram)):
+                continue
+            for values, series in metric._items():
+                with series.lock:
+                    if isinstance(metric, Counter):
+                        if not series.value:
+                            continue
+                        data, series.value = series.value, 0.0
+                    else:
+                        if not any(series.counts):
+                            continue
+                        data = (series.counts, series.sum)
+                        series.counts, series.sum = [0] * len(series.counts), 0.0
+                deltas.append((metric.name, values, data))
+        return deltas
+
+    def merge_deltas(self, deltas: list[tuple]) -> None:
+        for name, values, data in deltas:
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            series = metric.labels(*values)
+            with series.lock:
+                if isinstance(metric, Counter):
+                    series.value += data
+                else:
+                    counts, total = data
+                    series.counts = [a + b for a, b in zip(series.counts, counts)]
+                    series.sum += total
+
+
+registry = Registry()
+
+
+# ── DB statements per request ──────────────────────────────────
+
+class _QueryCount:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+_query_count: contextvars.ContextVar[_QueryCount | None] = contextvars.ContextVar("query_count", default=None)
+
+db_queries = registry.counter("db_queries_total", "SQL statements executed")
+
+
+@contextmanager
+def query_scope():
+    """Count statements executed in this context (and threads it hands work to)."""
+    scope = _QueryCount()
+    token = _query_count.set(scope)
+    try:
+        yield scope
+    finally:
+        _query_count.reset(token)
+
+
+def count_query(*_args) -> None:
+    """before_cursor_execute hook installed on the engines by bot.database."""
+    db_queries.inc()
+    scope = _query_count.get()
+    if scope is not None:
+        scope.value += 1
+
+
+# ── Bot-side listener ──────────────────────────────────────────
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass   # scrapes are not worth a log line each
+
+
+def serve(host: str, port: int) -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
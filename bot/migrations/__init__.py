@@ -0,0 +1,80 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module `vNNNN_<name>.py` in this package with an
+`upgrade(conn)` function receiving a SQLAlchemy Connection. Applied versions
+are recorded in the schema_version table; upgrade() runs the missing ones in
+order. It is called on startup by bot.main and the admin API, and from the
+command line:
+
+    python -m bot.migrations [upgrade|status]
+
+Migrations must be idempotent (CREATE ... IF NOT EXISTS and the like): two
+processes starting together may both run one before either records it.
+"""
+
+import importlib
+import pkgutil
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.exc import IntegrityError
+
+from bot.database import engine
+from bot.logging_config import get_app_logger
+
+log = get_app_logger("migrations")
+
+_MODULE_RE = re.compile(r"^v(\d{4})_(\w+)$")
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def available() -> list[tuple[int, str]]:
+    """(version, module name) of every migration in this package, in order."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        m = _MODULE_RE.match(info.name)
+        if m:
+            found.append((int(m.group(1)), info.name))
+    return sorted(found)
+
+
+def applied() -> set[int]:
+    _metadata.create_all(engine)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def upgrade() -> int:
+    """Apply pending migrations; returns how many were applied."""
+    done = applied()
+    count = 0
+    for version, name in available():
+        if version in done:
+            continue
+        module = importlib.import_module(f"{__name__}.{name}")
+        log.info("Applying migration %04d (%s)", version, name)
+        with engine.begin() as conn:
+            module.upgrade(conn)
+        try:
+            with engine.begin() as conn:
+                conn.execute(schema_version.insert().values(
+                    version=version, name=name, applied_at=datetime.now(timezone.utc),
+                ))
+        except IntegrityError:
+            log.info("Migration %04d was recorded by another process", version)
+        count += 1
+    if count:
+        log.info("Applied %d migration(s).", count)
+    else:
+        log.info("Database schema is up to date.")
+    return count
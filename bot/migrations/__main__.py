@@ -0,0 +1,21 @@
+import argparse
+
+from bot.migrations import available, applied, upgrade
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bot.migrations", description="Database schema migrations.")
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        upgrade()
+        return
+
+    done = applied()
+    for version, name in available():
+        print(f"{version:04d}  {'applied' if version in done else 'pending'}  {name}")
+
+
+if __name__ == "__main__":
+    main()
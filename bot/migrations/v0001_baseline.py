@@ -0,0 +1,89 @@
+"""
+Baseline schema: the tables as they stood when versioned migrations were
+introduced. The DDL is spelled out here rather than taken from bot.models,
+so later model changes never alter what this step creates; they need a
+migration of their own. Existing tables are left untouched (checkfirst).
+"""
+
+from sqlalchemy import (
+    Column, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, MetaData,
+    String, Table, UniqueConstraint, text,
+)
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("telegram_id", String, unique=True, index=True),
+    Column("phone", String, unique=True, nullable=False, index=True),
+    Column("name", String),
+    Column("face_registered", Integer),
+)
+
+Table(
+    "used_photos", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("file_unique_id", String, unique=True, nullable=False, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True),
+    Column("used_at", DateTime(timezone=True), nullable=False, index=True),
+)
+
+Table(
+    "attendance", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("check_in", DateTime(timezone=True), nullable=False),
+    Column("check_out", DateTime(timezone=True), nullable=True),
+    Column("lat", Float),
+    Column("lon", Float),
+    Column("date", Date, nullable=False),
+    UniqueConstraint("user_id", "date", name="uq_user_date"),
+    Index("ix_attendance_date", "date"),
+    Index("ix_attendance_checkin", "check_in", "id"),
+    Index("ix_attendance_user_checkin", "user_id", "check_in", "id"),
+    Index(
+        "ix_attendance_open", "user_id", "date",
+        sqlite_where=text("check_out IS NULL"),
+        postgresql_where=text("check_out IS NULL"),
+    ),
+)
+
+Table(
+    "face_embeddings", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("phone", String, nullable=False, index=True),
+    Column("ref_index", Integer, nullable=False),
+    Column("file_hash", String(64), nullable=False),
+    Column("model_name", String, nullable=False),
+    Column("vector", LargeBinary, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    UniqueConstraint("phone", "ref_index", "model_name", name="uq_face_embedding_ref"),
+)
+
+Table(
+    "daily_attendance_stats", metadata,
+    Column("date", Date, primary_key=True),
+    Column("checked_in", Integer, nullable=False),
+    Column("checked_out", Integer, nullable=False),
+    Column("distinct_users", Integer, nullable=False),
+    Column("total_work_seconds", Float, nullable=False),
+)
+
+Table(
+    "face_jobs", metadata,
+    Column("id", String(32), primary_key=True),
+    Column("kind", String(20), nullable=False),
+    Column("status", String(20), nullable=False, index=True),
+    Column("phone", String, nullable=False),
+    Column("user_id", Integer, nullable=True),
+    Column("result", String, nullable=True),
+    Column("error", String, nullable=True),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("started_at", DateTime(timezone=True), nullable=True),
+    Column("finished_at", DateTime(timezone=True), nullable=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn)
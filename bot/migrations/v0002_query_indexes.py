@@ -0,0 +1,48 @@
+"""
+Indexes for the hot access paths, added to databases created before the
+models declared them (create_all never touches existing tables).
+
+- attendance (date): dashboard/report/export date ranges
+- attendance (check_in, id): the global attendance listing
+- attendance (user_id, check_in, id): a user's history in time order
+- attendance (user_id, date) WHERE check_out IS NULL: /checkout's open row
+- used_photos (used_at): the periodic used-photo cleanup
+
+Databases from before migrations already have an ix_attendance_checkin on
+(check_in) alone, which CREATE INDEX IF NOT EXISTS would silently keep, so
+indexes whose columns differ are dropped and rebuilt.
+"""
+
+from sqlalchemy import inspect, text
+
+# (table, name, columns, partial-index predicate)
+INDEXES = (
+    ("attendance", "ix_attendance_date", ("date",), None),
+    ("attendance", "ix_attendance_checkin", ("check_in", "id"), None),
+    ("attendance", "ix_attendance_user_checkin", ("user_id", "check_in", "id"), None),
+    ("attendance", "ix_attendance_open", ("user_id", "date"), "check_out IS NULL"),
+    ("used_photos", "ix_used_photos_used_at", ("used_at",), None),
+)
+
+
+def ensure_indexes(conn) -> None:
+    """Create each index, replacing a same-named one on other columns."""
+    inspector = inspect(conn)
+    existing = {
+        table: {ix["name"]: tuple(ix["column_names"]) for ix in inspector.get_indexes(table)}
+        for table in {table for table, *_ in INDEXES}
+    }
+    for table, name, columns, where in INDEXES:
+        current = existing[table].get(name)
+        if current == columns:
+            continue
+        if current is not None:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        statement = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+        if where:
+            statement += f" WHERE {where}"
+        conn.execute(text(statement))
+
+
+def upgrade(conn):
+    ensure_indexes(conn)
@@ -0,0 +1,11 @@
+"""Version counters for cross-process cache invalidation (bot.user_cache)."""
+
+from sqlalchemy import text
+
+from bot.models import CacheVersion
+
+
+def upgrade(conn):
+    CacheVersion.__table__.create(conn, checkfirst=True)
+    if conn.execute(text("SELECT 1 FROM cache_versions WHERE name = 'users'")).first() is None:
+        conn.execute(text("INSERT INTO cache_versions (name, version) VALUES ('users', 0)"))
@@ -0,0 +1,9 @@
+"""Structured security events (bot.audit) and their query indexes."""
+
+from bot.models import AuditEvent
+
+
+def upgrade(conn):
+    AuditEvent.__table__.create(conn, checkfirst=True)
+    for index in AuditEvent.__table__.indexes:
+        index.create(conn, checkfirst=True)
@@ -0,0 +1,12 @@
+"""
+face_jobs.owner: the API process that queued a job, so a restarting worker
+fails only its own interrupted jobs (backend.jobs.fail_interrupted_jobs).
+"""
+
+from sqlalchemy import inspect, text
+
+
+def upgrade(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("face_jobs")}
+    if "owner" not in columns:
+        conn.execute(text("ALTER TABLE face_jobs ADD COLUMN owner VARCHAR(64)"))
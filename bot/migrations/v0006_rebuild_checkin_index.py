@@ -0,0 +1,11 @@
+"""
+Rebuild ix_attendance_checkin on (check_in, id) for databases that ran the
+first version of 0002, whose CREATE INDEX IF NOT EXISTS kept the old
+(check_in) index of the same name.
+"""
+
+from bot.migrations.v0002_query_indexes import ensure_indexes
+
+
+def upgrade(conn):
+    ensure_indexes(conn)
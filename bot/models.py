@@ -1,6 +1,6 @@
 from sqlalchemy import (
-    Column, Integer, String, DateTime, Date, Float,
-    ForeignKey, UniqueConstraint, Index
+    Column, Integer, String, DateTime, Date, Float, LargeBinary,
+    ForeignKey, UniqueConstraint, Index, text
 )
 from bot.database import Base
 from datetime import datetime, timezone
@@ -29,7 +29,8 @@ class UsedPhoto(Base):
     used_at = Column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
 
@@ -64,7 +65,15 @@ class Attendance(Base):
     __table_args__ = (
         UniqueConstraint("user_id", "date", name="uq_user_date"),
         Index("ix_attendance_date", "date"),
-        Index("ix_attendance_checkin", "check_in"),
+        Index("ix_attendance_checkin", "check_in", "id"),
+        # Keyset pagination of one user's history on (check_in, id)
+        Index("ix_attendance_user_checkin", "user_id", "check_in", "id"),
+        # /checkout: the user's open row for today
+        Index(
+            "ix_attendance_open", "user_id", "date",
+            sqlite_where=text("check_out IS NULL"),
+            postgresql_where=text("check_out IS NULL"),
+        ),
     )
 
     id = Column(Integer, primary_key=True)
@@ -95,3 +104,127 @@ class Attendance(Base):
         default=lambda: datetime.now(timezone.utc).date(),
         nullable=False
     )
+
+
+class FaceEmbedding(Base):
+    """Cached embedding of one reference image, keyed by its content hash."""
+
+    __tablename__ = "face_embeddings"
+
+    __table_args__ = (
+        UniqueConstraint("phone", "ref_index", "model_name", name="uq_face_embedding_ref"),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    phone = Column(
+        String,
+        nullable=False,
+        index=True
+    )
+
+    ref_index = Column(Integer, nullable=False)
+
+    file_hash = Column(String(64), nullable=False)
+
+    model_name = Column(String, nullable=False)
+
+    vector = Column(LargeBinary, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+
+class DailyAttendanceStats(Base):
+    """Per-day attendance rollup, maintained by bot.rollup on every write."""
+
+    __tablename__ = "daily_attendance_stats"
+
+    date = Column(Date, primary_key=True)
+
+    checked_in = Column(Integer, nullable=False, default=0)
+
+    checked_out = Column(Integer, nullable=False, default=0)
+
+    # uq_user_date allows one row per user per day, so this tracks checked_in
+    distinct_users = Column(Integer, nullable=False, default=0)
+
+    # Sum of (check_out - check_in) over checked-out rows
+    total_work_seconds = Column(Float, nullable=False, default=0.0)
+
+
+class FaceJob(Base):
+    """Background face-upload job run by backend.jobs; polled via GET /jobs/{id}."""
+
+    __tablename__ = "face_jobs"
+
+    id = Column(String(32), primary_key=True)
+
+    # create_user | add_face | update_face
+    kind = Column(String(20), nullable=False)
+
+    # pending | running | succeeded | failed
+    status = Column(String(20), nullable=False, default="pending", index=True)
+
+    phone = Column(String, nullable=False)
+
+    user_id = Column(Integer, nullable=True)
+
+    # "<host>:<pid>:<boot id>" of the API process running the job (backend.jobs.OWNER)
+    owner = Column(String(64), nullable=True)
+
+    # JSON-encoded endpoint response on success, error detail on failure
+    result = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class CacheVersion(Base):
+    """Counters bumped on writes so other processes can drop cached rows (bot.user_cache)."""
+
+    __tablename__ = "cache_versions"
+
+    name = Column(String(32), primary_key=True)
+
+    version = Column(Integer, nullable=False, default=0)
+
+
+class AuditEvent(Base):
+    """
+    Security event from the security logger, parsed into columns by bot.audit.
+    Queried newest first by GET /audit, optionally filtered by action, phone or
+    Telegram id, hence one (filter, created_at, id) index per filter.
+    """
+
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        Index("ix_audit_created", "created_at", "id"),
+        Index("ix_audit_action_created", "action", "created_at", "id"),
+        Index("ix_audit_phone_created", "phone", "created_at", "id"),
+        Index("ix_audit_telegram_created", "telegram_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    level = Column(String(10), nullable=False)
+
+    action = Column(String(64), nullable=False)
+
+    telegram_id = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+    ip = Column(String, nullable=True)
+
+    # JSON object with the event's remaining key=value fields
+    details = Column(String, nullable=True)
@@ -1,11 +1,28 @@
 """
-Simple in-memory rate limiter using a sliding-window approach.
-Thread-safe via threading.Lock.
+Rate limiters, selected with RATE_LIMIT_ENGINE:
+
+- exact   : RateLimiter, a timestamp log per key under one lock (default).
+            Never admits more than the limit in any window, but memory grows
+            with attempts per key and keys live until compacted.
+- sliding : SlidingWindowLimiter, a two-window sliding counter. Each key is a
+            fixed-size record, keys are spread over lock-striped shards and
+            idle keys are evicted as a side effect of normal traffic. The
+            estimate can admit a burst slightly over the limit right after
+            a window boundary, so it is opt-in.
+- sqlite  : SqliteRateLimiter, the same sliding counter kept in a SQLite file
+            shared by every API worker and bot process on the host, so each
+            limit holds globally instead of once per process.
+
+All expose is_allowed / record / hit / refund / remaining / compact.
 """
 
+import math
+import os
+import sqlite3
 import time
 import threading
 from collections import defaultdict
+from bot.config import RATE_LIMIT_ENGINE, RATE_LIMIT_SHARDS, RATE_LIMIT_DB_PATH
 from bot.logging_config import get_security_logger
 
 sec_log = get_security_logger()
@@ -52,17 +69,299 @@ class RateLimiter:
             self._store[key].append(time.monotonic())
             return True
 
+    def refund(self, key: str) -> None:
+        """Give back the most recent event for the key (a hit that should not count)."""
+        with self._lock:
+            events = self._store.get(key)
+            if events:
+                events.pop()
+
     def remaining(self, key: str) -> int:
         with self._lock:
             self._cleanup(key)
             return max(0, self.max_attempts - len(self._store[key]))
 
+    def compact(self) -> int:
+        """Drop keys with no events left in the window; returns how many were removed."""
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            stale = [k for k, events in self._store.items() if not events or events[-1] <= cutoff]
+            for k in stale:
+                del self._store[k]
+            return len(stale)
+
+
+
+class _Counter:
+    __slots__ = ("window", "current", "previous", "last_seen")
+
+    def __init__(self, window: int):
+        self.window = window      # index of the fixed window `current` counts
+        self.current = 0
+        self.previous = 0
+        self.last_seen = 0.0
+
+
+class _Shard:
+    __slots__ = ("lock", "keys")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys: dict[str, _Counter] = {}   # least recently used first
+
+
+class SlidingWindowLimiter:
+    """
+    Approximate sliding window: events are counted per fixed window, and the
+    previous window's count is weighted by how much of it still overlaps the
+    sliding one. Same limits as RateLimiter, O(1) memory and time per key.
+
+    Keys are kept in (roughly) least-recently-used order per shard: a key is
+    moved to the back when first seen or when its position is more than 1/8
+    window stale. Each move evicts up to EVICT_PER_CALL keys idle for two full
+    windows from the front, so the key set tracks active callers without a
+    separate sweep.
+    """
+
+    EVICT_PER_CALL = 4
+
+    def __init__(self, max_attempts: int, window_seconds: int, shards: int = 16):
+        self.max_attempts = max_attempts
+        self.window = window_seconds
+        self._touch_every = window_seconds / 8
+        self._shards = tuple(_Shard() for _ in range(shards))
+
+    def _estimate(self, counter: _Counter, now: float) -> float:
+        index = int(now // self.window)
+        if index != counter.window:
+            counter.previous = counter.current if index == counter.window + 1 else 0
+            counter.current = 0
+            counter.window = index
+        overlap = 1 - (now % self.window) / self.window
+        return counter.previous * overlap + counter.current
+
+    def _counter(self, shard: _Shard, key: str, now: float) -> _Counter:
+        keys = shard.keys
+        counter = keys.get(key)
+        if counter is not None and now - counter.last_seen < self._touch_every:
+            counter.last_seen = now
+            return counter
+
+        if counter is None:
+            counter = _Counter(int(now // self.window))
+        else:
+            del keys[key]
+        counter.last_seen = now
+        keys[key] = counter   # most recently used end
+
+        idle_before = now - 2 * self.window
+        for _ in range(self.EVICT_PER_CALL):
+            oldest = next(iter(keys))
+            if oldest == key or keys[oldest].last_seen > idle_before:
+                break
+            del keys[oldest]
+        return counter
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def is_allowed(self, key: str) -> bool:
+        """Return True if the action is still within rate limits."""
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            return self._estimate(self._counter(shard, key, now), now) < self.max_attempts
+
+    def record(self, key: str) -> None:
+        """Record an event for the given key."""
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            counter = self._counter(shard, key, now)
+            self._estimate(counter, now)
+            counter.current += 1
+
+    def hit(self, key: str) -> bool:
+        """
+        Record an event and return True if still within limits,
+        False if the limit has been exceeded.
+        """
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            counter = self._counter(shard, key, now)
+            if self._estimate(counter, now) >= self.max_attempts:
+                return False
+            counter.current += 1
+            return True
+
+    def refund(self, key: str) -> None:
+        """Give back the most recent event for the key (a hit that should not count)."""
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            counter = shard.keys.get(key)
+            if counter is None:
+                return
+            self._estimate(counter, now)
+            if counter.current:
+                counter.current -= 1
+            elif counter.previous:
+                counter.previous -= 1   # the hit was just before the window rolled over
+
+    def remaining(self, key: str) -> int:
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            estimate = self._estimate(self._counter(shard, key, now), now)
+            return max(0, self.max_attempts - math.ceil(estimate))
+
+    def compact(self) -> int:
+        """Evict every key idle for two windows; returns how many were removed."""
+        idle_before = time.monotonic() - 2 * self.window
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                keys = shard.keys
+                while keys:
+                    oldest = next(iter(keys))
+                    if keys[oldest].last_seen > idle_before:
+                        break
+                    del keys[oldest]
+                    removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(shard.keys) for shard in self._shards)
+
+
+class SqliteRateLimiter:
+    """
+    Sliding counter (see SlidingWindowLimiter) stored as one row per key in a
+    SQLite file. Counters roll over to a new window inside the same statement
+    that reads or bumps them, so record() and hit() are a single atomic
+    upsert and is_allowed() / remaining() are a single indexed read. Uses wall
+    clock time, which every process on the host shares.
+    """
+
+    # Old row values -> counts as seen from window :w
+    _PREVIOUS = "CASE WHEN window = :w THEN previous WHEN window = :w - 1 THEN current ELSE 0 END"
+    _CURRENT = "CASE WHEN window = :w THEN current ELSE 0 END"
+
+    _UPSERT = (
+        "INSERT INTO rate_limits (name, key, window, current, previous, updated_at)"
+        " VALUES (:name, :key, :w, 1, 0, :now)"
+        " ON CONFLICT (name, key) DO UPDATE SET"
+        f" previous = {_PREVIOUS}, current = {_CURRENT} + 1, window = :w, updated_at = :now"
+    )
+
+    def __init__(self, path: str, name: str, max_attempts: int, window_seconds: int):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.window = window_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                " name TEXT NOT NULL, key TEXT NOT NULL,"
+                " window INTEGER NOT NULL, current INTEGER NOT NULL, previous INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (name, key))"
+            )
+
+    def _params(self, key: str) -> dict:
+        now = time.time()
+        return {
+            "name": self.name,
+            "key": str(key),
+            "w": int(now // self.window),
+            "overlap": 1 - (now % self.window) / self.window,
+            "now": now,
+        }
+
+    def _estimate(self, key: str) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._PREVIOUS} * :overlap + {self._CURRENT} FROM rate_limits"
+                " WHERE name = :name AND key = :key",
+                self._params(key),
+            ).fetchone()
+        return row[0] if row else 0.0
+
+    def is_allowed(self, key: str) -> bool:
+        """Return True if the action is still within rate limits."""
+        return self._estimate(key) < self.max_attempts
+
+    def record(self, key: str) -> None:
+        """Record an event for the given key."""
+        with self._lock:
+            self._conn.execute(self._UPSERT, self._params(key))
+
+    def hit(self, key: str) -> bool:
+        """
+        Record an event and return True if still within limits,
+        False if the limit has been exceeded.
+        """
+        if self.max_attempts < 1:
+            return False
+        params = self._params(key)
+        params["max"] = self.max_attempts
+        with self._lock:
+            row = self._conn.execute(
+                f"{self._UPSERT} WHERE {self._PREVIOUS} * :overlap + {self._CURRENT} < :max"
+                " RETURNING 1",
+                params,
+            ).fetchone()
+        return row is not None
+
+    def refund(self, key: str) -> None:
+        """Give back the most recent event for the key (a hit that should not count)."""
+        # One statement: roll the counters over to the current window, then take one off
+        current, previous = self._CURRENT, self._PREVIOUS
+        with self._lock:
+            self._conn.execute(
+                "UPDATE rate_limits SET"
+                f" current = CASE WHEN {current} > 0 THEN {current} - 1 ELSE 0 END,"
+                f" previous = CASE WHEN {current} = 0 AND {previous} > 0 THEN {previous} - 1"
+                f" ELSE {previous} END,"
+                " window = :w"
+                " WHERE name = :name AND key = :key",
+                self._params(key),
+            )
+
+    def remaining(self, key: str) -> int:
+        return max(0, self.max_attempts - math.ceil(self._estimate(key)))
+
+    def compact(self) -> int:
+        """Delete this limit's keys idle for two windows; returns how many were removed."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM rate_limits WHERE name = ? AND updated_at <= ?",
+                (self.name, time.time() - 2 * self.window),
+            )
+            return cur.rowcount
+
+
+def make_limiter(name: str, max_attempts: int, window_seconds: int):
+    """Build the configured engine for one limit; `name` keeps shared counters apart."""
+    if RATE_LIMIT_ENGINE == "exact":
+        return RateLimiter(max_attempts, window_seconds)
+    if RATE_LIMIT_ENGINE == "sliding":
+        return SlidingWindowLimiter(max_attempts, window_seconds, RATE_LIMIT_SHARDS)
+    if RATE_LIMIT_ENGINE == "sqlite":
+        return SqliteRateLimiter(RATE_LIMIT_DB_PATH, name, max_attempts, window_seconds)
+    raise RuntimeError(f"Unknown RATE_LIMIT_ENGINE {RATE_LIMIT_ENGINE!r}; use exact, sliding or sqlite")
+
 
 # Login: 5 attempts per IP per 5 minutes
-login_limiter = RateLimiter(max_attempts=5, window_seconds=300)
+login_limiter = make_limiter("login", max_attempts=5, window_seconds=300)
 
 # Face verification: 5 attempts per user per 10 minutes
-face_verify_limiter = RateLimiter(max_attempts=5, window_seconds=600)
+face_verify_limiter = make_limiter("face_verify", max_attempts=5, window_seconds=600)
 
 # Check-in: 3 attempts per user per 5 minutes
-checkin_limiter = RateLimiter(max_attempts=3, window_seconds=300)
+checkin_limiter = make_limiter("checkin", max_attempts=3, window_seconds=300)
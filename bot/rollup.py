@@ -0,0 +1,153 @@
+"""
+Materialized per-day attendance rollup (daily_attendance_stats).
+
+The bot and admin API call record_checkin / record_checkout / remove_user
+inside the same transaction as their own attendance writes, so the rollup is
+always consistent with the raw table. rebuild() recomputes it from scratch
+for a date range:
+
+    python -m bot.rollup rebuild [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import sqlite, postgresql
+
+from bot.database import SessionLocal
+from bot.models import Attendance, DailyAttendanceStats
+from bot.logging_config import get_app_logger
+
+log = get_app_logger("rollup")
+
+_COUNTERS = ("checked_in", "checked_out", "distinct_users", "total_work_seconds")
+
+
+def work_seconds(check_in: datetime, check_out: datetime) -> float:
+    """Duration between two timestamps; naive values (SQLite) are taken as UTC."""
+    if check_in.tzinfo is None:
+        check_in = check_in.replace(tzinfo=timezone.utc)
+    if check_out.tzinfo is None:
+        check_out = check_out.replace(tzinfo=timezone.utc)
+    return max((check_out - check_in).total_seconds(), 0.0)
+
+
+def _apply(db: Session, day: date, **deltas) -> None:
+    """Add deltas to a day's counters, creating the row if needed (one statement)."""
+    values = {name: deltas.get(name, 0) for name in _COUNTERS}
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(DailyAttendanceStats).values(date=day, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyAttendanceStats.date],
+            set_={
+                name: getattr(DailyAttendanceStats, name) + getattr(stmt.excluded, name)
+                for name in _COUNTERS
+            },
+        )
+        db.execute(stmt)
+        return
+
+    row = db.get(DailyAttendanceStats, day, with_for_update=True)
+    if row is None:
+        db.add(DailyAttendanceStats(date=day, **values))
+    else:
+        for name, delta in values.items():
+            setattr(row, name, getattr(row, name) + delta)
+
+
+def record_checkin(db: Session, day: date) -> None:
+    _apply(db, day, checked_in=1, distinct_users=1)
+
+
+def record_checkout(db: Session, attendance: Attendance) -> None:
+    _apply(
+        db, attendance.date,
+        checked_out=1,
+        total_work_seconds=work_seconds(attendance.check_in, attendance.check_out),
+    )
+
+
+def remove_user(db: Session, user_id: int) -> None:
+    """Subtract a user's attendance from the rollup before it is deleted."""
+    rows = db.query(Attendance.date, Attendance.check_in, Attendance.check_out).filter(
+        Attendance.user_id == user_id
+    )
+    for day, check_in, check_out in rows:
+        if check_out is None:
+            _apply(db, day, checked_in=-1, distinct_users=-1)
+        else:
+            _apply(
+                db, day,
+                checked_in=-1, distinct_users=-1, checked_out=-1,
+                total_work_seconds=-work_seconds(check_in, check_out),
+            )
+
+
+def rebuild(db: Session, start: date | None = None, end: date | None = None) -> int:
+    """
+    Recompute the rollup from raw attendance for [start, end] (inclusive,
+    open-ended when omitted). Streams rows, so memory stays flat.
+    Returns the number of days written. The caller commits.
+    """
+    totals: dict[date, dict] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+    query = db.query(Attendance.date, Attendance.check_in, Attendance.check_out)
+    stale = db.query(DailyAttendanceStats)
+    if start is not None:
+        query = query.filter(Attendance.date >= start)
+        stale = stale.filter(DailyAttendanceStats.date >= start)
+    if end is not None:
+        query = query.filter(Attendance.date <= end)
+        stale = stale.filter(DailyAttendanceStats.date <= end)
+
+    for day, check_in, check_out in query.yield_per(5000):
+        t = totals[day]
+        t["checked_in"] += 1
+        t["distinct_users"] += 1
+        if check_out is not None:
+            t["checked_out"] += 1
+            t["total_work_seconds"] += work_seconds(check_in, check_out)
+
+    stale.delete(synchronize_session=False)
+    db.add_all(DailyAttendanceStats(date=day, **t) for day, t in totals.items())
+    return len(totals)
+
+
+def ensure_backfilled() -> None:
+    """Build the rollup once for databases that predate it."""
+    db = SessionLocal()
+    try:
+        if db.query(DailyAttendanceStats.date).first() is None and db.query(Attendance.id).first() is not None:
+            days = rebuild(db)
+            db.commit()
+            log.info("Backfilled attendance rollup for %d day(s).", days)
+    except Exception:
+        db.rollback()
+        log.error("Failed to backfill attendance rollup", exc_info=True)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the daily attendance rollup.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rb = sub.add_parser("rebuild", help="recompute the rollup from raw attendance")
+    rb.add_argument("--from", dest="start", type=date.fromisoformat)
+    rb.add_argument("--to", dest="end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        days = rebuild(db, args.start, args.end)
+        db.commit()
+        log.info("Rebuilt attendance rollup for %d day(s).", days)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
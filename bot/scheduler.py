@@ -0,0 +1,264 @@
+"""
+In-process scheduler for periodic maintenance.
+
+One daemon thread runs registered jobs at their interval, each start shifted
+by a random jitter so processes started together do not hit the database at
+the same moment. A job never overlaps itself: it holds an in-process lock and,
+where fcntl is available, an exclusive lock file under MAINTENANCE_LOCK_DIR,
+so the bot and the admin API sharing one database do not run the same
+maintenance concurrently. A run that finds its job locked is skipped. Every
+run is logged with its duration and the number of rows/files it touched.
+
+The bot (bot.main) and the admin API both start the scheduler with the
+database jobs from add_default_jobs() plus their own process-local ones.
+"""
+
+import heapq
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import delete, select, text
+
+from bot.config import (
+    MAINTENANCE_ENABLED,
+    MAINTENANCE_JITTER,
+    MAINTENANCE_LOCK_DIR,
+    USED_PHOTO_RETENTION_DAYS,
+    RETENTION_PURGE_MINUTES,
+    MAINTENANCE_DELETE_CHUNK,
+    ROLLUP_REFRESH_MINUTES,
+    ROLLUP_REFRESH_DAYS,
+    SQLITE_OPTIMIZE_MINUTES,
+    SQLITE_VACUUM_HOURS,
+    RATE_LIMIT_COMPACT_MINUTES,
+    AUDIT_RETENTION_DAYS,
+)
+from bot.database import SessionLocal, engine
+from bot.models import UsedPhoto, AuditEvent, DailyAttendanceStats
+from bot.logging_config import get_app_logger
+from bot.rate_limiter import login_limiter, face_verify_limiter, checkin_limiter
+from bot.rollup import rebuild
+
+try:
+    import fcntl
+except ImportError:     # Windows: in-process locking only
+    fcntl = None
+
+log = get_app_logger("scheduler")
+
+# Pause between delete chunks so check-in writers get the lock in between
+CHUNK_PAUSE_SECONDS = 0.05
+
+
+@dataclass(slots=True)
+class _Job:
+    name: str
+    interval: float
+    fn: Callable[[], int]
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class Scheduler:
+
+    def __init__(self, jitter: float):
+        self.jitter = jitter
+        self._jobs: dict[str, _Job] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def every(self, name: str, interval_seconds: float, fn: Callable[[], int],
+              first_in: float | None = None) -> None:
+        """
+        Run `fn()` every `interval_seconds` (<= 0 disables the job). `fn` returns
+        the number of rows/files it touched. Re-registering a name is a no-op.
+        """
+        if interval_seconds <= 0:
+            return
+        with self._cond:
+            if name in self._jobs:
+                return
+            self._jobs[name] = _Job(name, interval_seconds, fn)
+            delay = interval_seconds if first_in is None else first_in
+            heapq.heappush(self._heap, (time.monotonic() + self._jittered(delay), name))
+            self._cond.notify()
+
+    def start(self) -> None:
+        """Start the scheduler thread (idempotent; no-op when MAINTENANCE_ENABLED=false)."""
+        if not MAINTENANCE_ENABLED:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+            self._thread.start()
+        log.info("Maintenance scheduler started: %s", ", ".join(sorted(self._jobs)))
+
+    def run_now(self, name: str) -> int | None:
+        """Run one job synchronously; returns rows touched, or None if it was locked."""
+        return self._run(self._jobs[name])
+
+    def _jittered(self, delay: float) -> float:
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                _, name = heapq.heappop(self._heap)
+                job = self._jobs[name]
+            self._run(job)
+            with self._cond:
+                heapq.heappush(self._heap, (time.monotonic() + self._jittered(job.interval), name))
+
+    def _run(self, job: _Job) -> int | None:
+        if not job.lock.acquire(blocking=False):
+            log.info("action=maintenance_skipped | job=%s | reason=running", job.name)
+            return None
+        lock_file = None
+        try:
+            if fcntl is not None:
+                os.makedirs(MAINTENANCE_LOCK_DIR, exist_ok=True)
+                lock_file = open(os.path.join(MAINTENANCE_LOCK_DIR, f"{job.name}.lock"), "w")
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    log.info("action=maintenance_skipped | job=%s | reason=locked_elsewhere", job.name)
+                    return None
+
+            started = time.perf_counter()
+            try:
+                rows = job.fn() or 0
+            except Exception:
+                log.error("action=maintenance_failed | job=%s | duration_ms=%.1f",
+                          job.name, (time.perf_counter() - started) * 1000, exc_info=True)
+                return None
+            log.info("action=maintenance | job=%s | rows=%d | duration_ms=%.1f",
+                     job.name, rows, (time.perf_counter() - started) * 1000)
+            return rows
+        finally:
+            if lock_file is not None:
+                lock_file.close()    # releases the flock
+            job.lock.release()
+
+
+# ── Jobs ───────────────────────────────────────────────────────
+
+def _purge_older_than(model, column, days: int) -> int:
+    """
+    Delete rows whose `column` is older than `days`, at most
+    MAINTENANCE_DELETE_CHUNK per transaction so check-in writes are never
+    blocked behind one long delete.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    total = 0
+    while True:
+        db = SessionLocal()
+        try:
+            ids = db.execute(
+                select(model.id)
+                .where(column < cutoff)
+                .limit(MAINTENANCE_DELETE_CHUNK)
+            ).scalars().all()
+            if not ids:
+                return total
+            db.execute(delete(model).where(model.id.in_(ids)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        total += len(ids)
+        if len(ids) < MAINTENANCE_DELETE_CHUNK:
+            return total
+        time.sleep(CHUNK_PAUSE_SECONDS)
+
+
+def purge_used_photos() -> int:
+    """Delete anti-replay rows older than USED_PHOTO_RETENTION_DAYS."""
+    return _purge_older_than(UsedPhoto, UsedPhoto.used_at, USED_PHOTO_RETENTION_DAYS)
+
+
+def purge_audit_events() -> int:
+    """Delete audit rows older than AUDIT_RETENTION_DAYS."""
+    return _purge_older_than(AuditEvent, AuditEvent.created_at, AUDIT_RETENTION_DAYS)
+
+
+def refresh_rollup() -> int:
+    """
+    Recompute the last ROLLUP_REFRESH_DAYS of the daily rollup from raw attendance.
+
+    Writers update attendance and the rollup in one transaction, so the
+    recount locks the rollup against them before it reads: a check-in that
+    already touched the rollup is waited for, and one that has not blocks
+    until the rebuilt rows are committed, then adds to them.
+    """
+    start = datetime.now(timezone.utc).date() - timedelta(days=ROLLUP_REFRESH_DAYS - 1)
+    db = SessionLocal()
+    try:
+        if engine.dialect.name == "sqlite":
+            db.execute(text("BEGIN IMMEDIATE"))
+        elif engine.dialect.name == "postgresql":
+            # Conflicts with writers' ROW EXCLUSIVE and with another refresh; readers are not blocked
+            db.execute(text(
+                f"LOCK TABLE {DailyAttendanceStats.__tablename__} IN SHARE ROW EXCLUSIVE MODE"
+            ))
+        days = rebuild(db, start)
+        db.commit()
+        return days
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def optimize_sqlite() -> int:
+    """Refresh planner statistics and fold the WAL back into the database file."""
+    with engine.connect() as conn:
+        # ANALYZE only tables whose statistics are missing or stale, sampling
+        # at most ~1000 rows per index so large tables stay cheap
+        conn.exec_driver_sql("PRAGMA analysis_limit=1000")
+        conn.exec_driver_sql("PRAGMA optimize=0x10002")
+        busy, wal_pages, checkpointed = conn.exec_driver_sql(
+            "PRAGMA wal_checkpoint(TRUNCATE)"
+        ).one()
+    if busy:
+        log.info("WAL checkpoint was blocked by readers (%d/%d pages)", checkpointed, wal_pages)
+    return max(checkpointed, 0)
+
+
+def vacuum_sqlite() -> int:
+    """Rewrite the database file to release free pages; returns pages reclaimed."""
+    with engine.connect() as conn:
+        before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        conn.exec_driver_sql("VACUUM")
+        after = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return before - after
+
+
+def compact_rate_limiters() -> int:
+    return sum(limiter.compact() for limiter in (login_limiter, face_verify_limiter, checkin_limiter))
+
+
+scheduler = Scheduler(MAINTENANCE_JITTER)
+
+
+def add_default_jobs() -> None:
+    """Register the database and rate-limiter jobs shared by every process."""
+    scheduler.every("used_photos", RETENTION_PURGE_MINUTES * 60, purge_used_photos, first_in=60)
+    if AUDIT_RETENTION_DAYS > 0:
+        scheduler.every("audit_events", RETENTION_PURGE_MINUTES * 60, purge_audit_events, first_in=120)
+    scheduler.every("rollup_refresh", ROLLUP_REFRESH_MINUTES * 60, refresh_rollup)
+    scheduler.every("rate_limit_compact", RATE_LIMIT_COMPACT_MINUTES * 60, compact_rate_limiters)
+    if engine.dialect.name == "sqlite":
+        scheduler.every("sqlite_optimize", SQLITE_OPTIMIZE_MINUTES * 60, optimize_sqlite)
+        scheduler.every("sqlite_vacuum", SQLITE_VACUUM_HOURS * 3600, vacuum_sqlite)
@@ -0,0 +1,219 @@
+"""
+Conversation state for the Telegram bot.
+
+Each step of a flow is a small typed record (WaitPhone, WaitPhoto, …) stored
+under the user's Telegram id with a per-key TTL, so abandoned flows expire on
+their own instead of living forever in a module-level dict.
+
+Backends:
+- MemoryStateStore : process-local, O(1) amortized expiry
+- SqliteStateStore : a SQLite file shared by every bot worker process
+Selected with STATE_BACKEND=memory|sqlite.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+
+from bot.config import STATE_BACKEND, STATE_DB_PATH
+
+
+# ── State records ──────────────────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class WaitPhone:
+    """/checkin sent; waiting for the user's contact."""
+
+
+@dataclass(frozen=True, slots=True)
+class WaitLocation:
+    """Phone verified; waiting for a live location."""
+
+
+@dataclass(frozen=True, slots=True)
+class WaitPhoto:
+    """Location accepted; waiting for the check-in selfie."""
+    lat: float
+    lon: float
+    located_at: float  # UTC timestamp
+
+
+@dataclass(frozen=True, slots=True)
+class AdminFaceRegistration:
+    """Admin ran /register_face; waiting for face photos of `phone`."""
+    phone: str
+
+
+State = WaitPhone | WaitLocation | WaitPhoto | AdminFaceRegistration
+
+_STATE_TYPES = {cls.__name__: cls for cls in (WaitPhone, WaitLocation, WaitPhoto, AdminFaceRegistration)}
+
+
+# ── Backends ───────────────────────────────────────────────────
+
+class StateStore(ABC):
+    """Key → State mapping where every entry expires after its own TTL."""
+
+    @abstractmethod
+    def get(self, key) -> State | None:
+        ...
+
+    @abstractmethod
+    def set(self, key, state: State, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, key) -> State | None:
+        ...
+
+    @abstractmethod
+    def purge(self) -> int:
+        """Drop expired entries; returns how many were removed."""
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+
+class MemoryStateStore(StateStore):
+    """
+    In-process store. Entries sharing a TTL expire in insertion order, so each
+    distinct TTL gets its own FIFO and expiry only ever inspects FIFO heads.
+    """
+
+    def __init__(self):
+        self._data: dict = {}                          # key -> (expires_at, ttl, state)
+        self._fifos: dict[float, OrderedDict] = {}     # ttl -> key -> expires_at
+        self._lock = threading.Lock()
+
+    def get(self, key) -> State | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            return entry[2]
+
+    def set(self, key, state: State, ttl: float) -> None:
+        with self._lock:
+            self._remove(key)
+            expires_at = time.monotonic() + ttl
+            self._data[key] = (expires_at, ttl, state)
+            self._fifos.setdefault(ttl, OrderedDict())[key] = expires_at
+            self._expire(time.monotonic())
+
+    def pop(self, key) -> State | None:
+        with self._lock:
+            entry = self._remove(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[2]
+
+    def purge(self) -> int:
+        with self._lock:
+            return self._expire(time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._fifos[entry[1]].pop(key, None)
+        return entry
+
+    def _expire(self, now: float) -> int:
+        removed = 0
+        for fifo in self._fifos.values():
+            while fifo:
+                key, expires_at = next(iter(fifo.items()))
+                if expires_at > now:
+                    break
+                fifo.popitem(last=False)
+                del self._data[key]
+                removed += 1
+        return removed
+
+
+class SqliteStateStore(StateStore):
+    """
+    Store backed by a SQLite file, so several bot processes see the same state.
+    Expired rows are invisible immediately and deleted every `purge_every` writes.
+    """
+
+    def __init__(self, path: str, namespace: str, purge_every: int = 200):
+        self.namespace = namespace
+        self._purge_every = purge_every
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bot_state ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL,"
+                " kind TEXT NOT NULL, payload TEXT NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_bot_state_expires ON bot_state (expires_at)"
+            )
+
+    @staticmethod
+    def _decode(kind: str, payload: str) -> State:
+        return _STATE_TYPES[kind](**json.loads(payload))
+
+    def get(self, key) -> State | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, payload FROM bot_state"
+                " WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, str(key), time.time()),
+            ).fetchone()
+        return self._decode(*row) if row else None
+
+    def set(self, key, state: State, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO bot_state (namespace, key, kind, payload, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, str(key), type(state).__name__,
+                 json.dumps(asdict(state)), time.time() + ttl),
+            )
+            self._writes += 1
+            purge = self._writes % self._purge_every == 0
+        if purge:
+            self.purge()
+
+    def pop(self, key) -> State | None:
+        with self._lock:
+            row = self._conn.execute(
+                "DELETE FROM bot_state WHERE namespace = ? AND key = ?"
+                " RETURNING kind, payload, expires_at",
+                (self.namespace, str(key)),
+            ).fetchone()
+        if row is None or row[2] <= time.time():
+            return None
+        return self._decode(row[0], row[1])
+
+    def purge(self) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM bot_state WHERE expires_at <= ?", (time.time(),)
+            )
+            return cur.rowcount
+
+
+def make_store(namespace: str) -> StateStore:
+    """Build the configured backend for one family of states (e.g. "user", "admin")."""
+    if STATE_BACKEND == "sqlite":
+        return SqliteStateStore(STATE_DB_PATH, namespace)
+    return MemoryStateStore()
@@ -0,0 +1,173 @@
+"""
+Read-through cache of user records for the bot's hot lookups
+(telegram_id → user, phone → user).
+
+Entries are small __slots__ records, evicted LRU past USER_CACHE_SIZE and
+expired after USER_CACHE_TTL_SECONDS. Writers that change users (admin API,
+bulk import, bot relinks) call bump_users_version() inside their transaction;
+every process polls that counter at most every USER_CACHE_VERSION_CHECK_SECONDS
+and drops its whole cache when it moved, so changes made elsewhere are seen
+within that interval.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from bot.config import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS, USER_CACHE_VERSION_CHECK_SECONDS
+from bot.database import SessionLocal
+from bot.models import CacheVersion, User
+from bot.logging_config import get_app_logger
+from bot.metrics import registry
+
+log = get_app_logger("user_cache")
+
+USERS_VERSION = "users"
+
+# Log the hit rate every this many lookups
+STATS_LOG_EVERY = 1000
+
+
+class CachedUser:
+    __slots__ = ("id", "phone", "telegram_id", "name", "face_registered")
+
+    def __init__(self, id, phone, telegram_id, name, face_registered):
+        self.id = id
+        self.phone = phone
+        self.telegram_id = telegram_id
+        self.name = name
+        self.face_registered = face_registered
+
+    @classmethod
+    def from_row(cls, user: User) -> "CachedUser":
+        return cls(user.id, user.phone, user.telegram_id, user.name, user.face_registered or 0)
+
+
+def bump_users_version(db: Session) -> None:
+    """Signal every process to drop cached users; runs in the caller's transaction."""
+    db.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == USERS_VERSION)
+        .values(version=CacheVersion.version + 1)
+    )
+
+
+class UserCache:
+
+    def __init__(self, max_size: int, ttl: float, version_check: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version_check = version_check
+        self._entries: OrderedDict = OrderedDict()   # ("tg"|"phone", key) -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+
+    def by_telegram_id(self, telegram_id) -> CachedUser | None:
+        return self._lookup("tg", str(telegram_id), User.telegram_id)
+
+    def by_phone(self, phone: str) -> CachedUser | None:
+        return self._lookup("phone", phone, User.phone)
+
+    def invalidate(self) -> None:
+        """Drop everything cached in this process."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries) // 2,
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "flushes": self.flushes,
+            }
+
+    def _lookup(self, kind: str, key: str, column) -> CachedUser | None:
+        self._check_version()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end((kind, key))
+                self.hits += 1
+                self._maybe_log()
+                return entry[1]
+            self.misses += 1
+            self._maybe_log()
+
+        db = SessionLocal()
+        try:
+            user = db.execute(select(User).where(column == key)).scalar_one_or_none()
+            record = CachedUser.from_row(user) if user else None
+        finally:
+            db.close()
+
+        # Unknown users are not cached: they are about to be registered
+        if record is not None:
+            self._put(record, now + self.ttl)
+        return record
+
+    def _put(self, record: CachedUser, expires_at: float) -> None:
+        with self._lock:
+            keys = [("phone", record.phone)]
+            if record.telegram_id:
+                keys.append(("tg", record.telegram_id))
+            for k in keys:
+                self._entries[k] = (expires_at, record)
+                self._entries.move_to_end(k)
+            # Each user occupies up to two keys
+            while len(self._entries) > self.max_size * 2:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _check_version(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.version_check:
+            return
+        self._checked_at = now
+        db = SessionLocal()
+        try:
+            version = db.execute(
+                select(CacheVersion.version).where(CacheVersion.name == USERS_VERSION)
+            ).scalar_one_or_none()
+        except Exception:
+            log.warning("Could not read users cache version; flushing cache", exc_info=True)
+            version = None
+        finally:
+            db.close()
+
+        with self._lock:
+            if version is None or version != self._version:
+                if self._entries:
+                    self.flushes += 1
+                self._entries.clear()
+                self._version = version
+
+    def _maybe_log(self) -> None:
+        # Called with the lock held
+        lookups = self.hits + self.misses
+        if lookups % STATS_LOG_EVERY == 0:
+            log.info(
+                "User cache: %d lookups, hit rate %.1f%%, %d entries, %d evictions, %d flushes",
+                lookups, 100 * self.hits / lookups, len(self._entries) // 2,
+                self.evictions, self.flushes,
+            )
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS, USER_CACHE_VERSION_CHECK_SECONDS)
+
+registry.callback("user_cache_hits_total", "User cache hits", lambda: user_cache.hits, kind="counter")
+registry.callback("user_cache_misses_total", "User cache misses", lambda: user_cache.misses, kind="counter")
+registry.callback("user_cache_entries", "Users held in the cache", lambda: user_cache.stats()["size"])
@@ -0,0 +1,172 @@
+"""
+Webhook delivery for the Telegram bot.
+
+Telegram POSTs each update to /telegram/webhook. The endpoint only checks the
+secret token and puts the update on a bounded in-memory queue; WEBHOOK_WORKERS
+threads drain it through the regular message handlers. When the queue is full
+the endpoint answers 503 so Telegram redelivers the update later instead of it
+being dropped.
+
+The router can be mounted into the admin API (WEBHOOK_IN_API=true) or served
+standalone by bot.main via `serve()`. Pointing TELEGRAM_API_URL at a local fake
+Bot API server lets the whole flow run without Telegram.
+"""
+
+import hmac
+import json
+import queue
+import re
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+
+import telebot
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Request
+
+from bot.config import (
+    WEBHOOK_URL,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_WORKERS,
+    WEBHOOK_QUEUE_SIZE,
+)
+from bot.logging_config import get_app_logger, get_security_logger
+from bot.metrics import registry
+import bot.handlers as handlers
+
+log = get_app_logger("webhook")
+sec_log = get_security_logger()
+
+WEBHOOK_PATH = "/telegram/webhook"
+
+# Telegram accepts 1-256 characters of A-Z, a-z, 0-9, _ and -
+_SECRET_RE = re.compile(r"[A-Za-z0-9_-]{1,256}")
+
+
+def require_secret() -> None:
+    """
+    Refuse to serve the webhook without WEBHOOK_SECRET: the endpoint is public,
+    and without the secret anyone could post forged updates as any user.
+    """
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET must be set in webhook mode")
+    if not _SECRET_RE.fullmatch(WEBHOOK_SECRET):
+        raise RuntimeError("WEBHOOK_SECRET must be 1-256 characters of A-Z, a-z, 0-9, _ or -")
+
+
+class UpdateDispatcher:
+    """Bounded update queue drained by a fixed number of worker threads."""
+
+    def __init__(self, bot: telebot.TeleBot, workers: int, queue_size: int):
+        self.bot = bot
+        self.workers = workers
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._started = False
+        # Telegram may redeliver an update it already sent (e.g. after a timeout)
+        self._seen: deque[int] = deque(maxlen=4096)
+        self._seen_set: set[int] = set()
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)."""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f"tg-update-{i}", daemon=True).start()
+            self._started = True
+            log.info("Webhook dispatcher started (workers=%d, queue=%d)",
+                     self.workers, self._queue.maxsize)
+
+    def put(self, update: telebot.types.Update) -> bool:
+        """Queue an update. Returns False if the queue is full."""
+        self.start()
+        with self._lock:
+            if update.update_id in self._seen_set:
+                log.debug("Duplicate update %d ignored", update.update_id)
+                return True
+        try:
+            self._queue.put_nowait(update)
+        except queue.Full:
+            return False
+        with self._lock:
+            if len(self._seen) == self._seen.maxlen:
+                self._seen_set.discard(self._seen[0])
+            self._seen.append(update.update_id)
+            self._seen_set.add(update.update_id)
+        return True
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self) -> None:
+        while True:
+            update = self._queue.get()
+            try:
+                self.bot.process_new_updates([update])
+            except Exception:
+                log.error("Error processing update %d", update.update_id, exc_info=True)
+
+
+dispatcher = UpdateDispatcher(handlers.bot, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE)
+
+registry.callback("webhook_queue_depth", "Updates waiting for a webhook worker", dispatcher.depth)
+
+router = APIRouter()
+
+
+@router.post(WEBHOOK_PATH)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: str | None = Header(default=None),
+):
+    if not WEBHOOK_SECRET or not hmac.compare_digest(
+        (x_telegram_bot_api_secret_token or "").encode(), WEBHOOK_SECRET.encode()
+    ):
+        client_ip = request.client.host if request.client else "unknown"
+        sec_log.warning("action=webhook_bad_secret | ip=%s", client_ip)
+        raise HTTPException(403, "Forbidden")
+
+    try:
+        update = telebot.types.Update.de_json(json.loads(await request.body()))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(400, "Malformed update")
+
+    if not dispatcher.put(update):
+        log.warning("Webhook queue full (%d); asking Telegram to retry", dispatcher.depth())
+        raise HTTPException(503, "Bot busy")
+    return {"ok": True}
+
+
+def register_webhook() -> None:
+    """Point Telegram at this deployment's webhook URL."""
+    if not WEBHOOK_URL:
+        raise RuntimeError("WEBHOOK_URL not set")
+    require_secret()
+    handlers.bot.set_webhook(
+        url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        max_connections=WEBHOOK_WORKERS * 10,
+    )
+    log.info("Webhook registered at %s", WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    require_secret()
+    dispatcher.start()
+    register_webhook()
+    yield
+
+
+# Standalone ASGI app (bot.main in webhook mode)
+app = FastAPI(title="Attendance Bot Webhook", lifespan=_lifespan)
+app.include_router(router)
+
+
+def serve() -> None:
+    import uvicorn
+    uvicorn.run(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
@@ -0,0 +1,144 @@
+"""
+Write path for bot transactions.
+
+Every unit of work is a function `fn(session, *args)` that adds/updates rows
+and returns a result; `writer.run(fn, ...)` executes it in its own transaction
+and commits. With GROUP_COMMIT_WINDOW_MS > 0, units arriving within the window
+are executed by one writer thread in a single transaction, each inside its own
+SAVEPOINT, and committed together: one fsync is shared by the whole batch,
+while a unit that fails (e.g. a unique-constraint violation) only rolls back
+its own savepoint and raises in its caller.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from sqlalchemy import text
+
+from bot.config import GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH
+from bot.database import SessionLocal, engine
+from bot.logging_config import get_app_logger
+from bot.metrics import registry
+
+log = get_app_logger("writer")
+
+Unit = Callable[..., Any]
+
+
+class GroupCommitWriter:
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._batches = 0
+        self._units = 0
+
+    @property
+    def grouping(self) -> bool:
+        return self.window > 0
+
+    def run(self, fn: Unit, *args, timeout: float = 30) -> Any:
+        """Execute `fn(session, *args)` and commit; return its result or raise its error."""
+        if not self.grouping:
+            db = SessionLocal()
+            try:
+                result = fn(db, *args)
+                db.commit()
+                return result
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        self._start()
+        future: Future = Future()
+        self._queue.put((fn, args, future))
+        return future.result(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "units": self._units,
+                "avg_batch_size": round(self._units / self._batches, 2) if self._batches else 0,
+                "queue_depth": self._queue.qsize(),
+            }
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="group-commit", daemon=True)
+                self._thread.start()
+                log.info("Group commit writer started (window=%.1fms, max_batch=%d)",
+                         self.window * 1000, self.max_batch)
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._commit_batch(batch)
+            except Exception:
+                log.error("Group commit loop error", exc_info=True)
+
+    def _commit_batch(self, batch: list) -> None:
+        outcomes = []   # (future, result, error)
+        db = SessionLocal()
+        try:
+            if engine.dialect.name == "sqlite":
+                # pysqlite does not BEGIN before SAVEPOINT, and releasing an
+                # outermost savepoint would commit; open the transaction explicitly.
+                db.execute(text("BEGIN IMMEDIATE"))
+            for fn, args, future in batch:
+                try:
+                    with db.begin_nested():
+                        outcomes.append((future, fn(db, *args), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            log.error("Group commit of %d unit(s) failed", len(batch), exc_info=True)
+            # Nothing was persisted: every caller sees an error
+            done = {id(f) for f, _, _ in outcomes}
+            for future, _, err in outcomes:
+                future.set_exception(err or e)
+            for _, _, future in batch:
+                if id(future) not in done:
+                    future.set_exception(e)
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            self._batches += 1
+            self._units += len(batch)
+        for future, result, err in outcomes:
+            if err is None:
+                future.set_result(result)
+            else:
+                future.set_exception(err)
+
+
+writer = GroupCommitWriter(GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH)
+
+registry.callback("writer_queue_depth", "Write units waiting for the group-commit thread",
+                  lambda: writer.stats()["queue_depth"])
+registry.callback("writer_batches_total", "Group commits", lambda: writer.stats()["batches"], kind="counter")
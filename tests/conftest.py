@@ -0,0 +1,133 @@
+"""
+Test settings: every test session gets a throwaway SQLite database, state
+and log directory. The environment is set here, before any bot module reads
+bot.config.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+_TMP = tempfile.mkdtemp(prefix="attendance-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_TMP, 'attendance.db')}",
+    "RATE_LIMIT_DB_PATH": os.path.join(_TMP, "rate_limits.db"),
+    "STATE_DB_PATH": os.path.join(_TMP, "bot_state.db"),
+    "UPLOAD_STAGING_DIR": os.path.join(_TMP, "uploads"),
+    "MAINTENANCE_LOCK_DIR": os.path.join(_TMP, "locks"),
+    "MAINTENANCE_ENABLED": "false",
+    "LOG_DIR": os.path.join(_TMP, "logs"),
+    "AUDIT_SINK": "jsonl",
+    "BOT_TOKEN": "123456:test",
+    "SECRET_KEY": "test-secret",
+    "ADMIN_USERNAME": "admin",
+    "ADMIN_PASSWORD": "admin",
+    "ADMIN_IDS": "1",
+    "OFFICE_LAT": "12.9",
+    "OFFICE_LON": "77.6",
+})
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import pytest   # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def tmp_root() -> str:
+    return _TMP
+
+
+@pytest.fixture(scope="session")
+def schema():
+    """Run the migrations once; returns the sync engine."""
+    from bot.database import engine
+    from bot.migrations import upgrade
+
+    upgrade()
+    return engine
+
+
+@pytest.fixture(scope="session")
+def seed_attendance(schema):
+    """seed_attendance(users, start, days): users plus one closed check-in each per day."""
+    return lambda users, start, days: _seed_attendance(schema, users, start, days)
+
+
+@pytest.fixture(scope="session")
+def asgi():
+    """
+    asgi(method, path, query=..., json_body=..., token=..., client=...) -> (status, body bytes).
+
+    Drives backend.api.app directly. The body is counted, not kept, so a
+    large streamed response costs no memory here; the client never
+    disconnects. token=True sends an admin Bearer token.
+    """
+    from backend.api import app
+    from backend.auth import create_token
+
+    def call(method: str, path: str, *, query: str = "", json_body=None, token: bool = True,
+             client: tuple[str, int] = ("127.0.0.1", 1)) -> tuple[int, int]:
+        body = json.dumps(json_body).encode() if json_body is not None else b""
+        headers = [(b"host", b"test")]
+        if token:
+            headers.append((b"authorization", b"Bearer " + create_token("admin").encode()))
+        if body:
+            headers.append((b"content-type", b"application/json"))
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "root_path": "", "query_string": query.encode(), "headers": headers,
+            "client": client, "server": ("test", 80),
+        }
+        status = []
+        size = 0
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if requested:
+                await asyncio.Event().wait()
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            nonlocal size
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+
+        asyncio.run(app(scope, receive, send))
+        return status[0], size
+
+    return call
+
+
+def _seed_attendance(engine, users: range, start: date, days: int) -> int:
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO users (id, phone, telegram_id, name, face_registered) VALUES (?, ?, ?, ?, 0)",
+            [(u, f"8{u:09d}", f"tg{u}", f"User {u}") for u in users],
+        )
+        rows = 0
+        for d in range(days):
+            day = start + timedelta(days=d)
+            check_in = datetime(day.year, day.month, day.day, 9, tzinfo=timezone.utc)
+            batch = [
+                (u, check_in.strftime("%Y-%m-%d %H:%M:%S.%f"),
+                 (check_in + timedelta(hours=8)).strftime("%Y-%m-%d %H:%M:%S.%f"), day.isoformat())
+                for u in users
+            ]
+            cur.executemany(
+                "INSERT INTO attendance (user_id, check_in, check_out, lat, lon, date)"
+                " VALUES (?, ?, ?, 12.9, 77.6, ?)", batch,
+            )
+            rows += len(batch)
+        raw.commit()
+        return rows
+    finally:
+        raw.close()
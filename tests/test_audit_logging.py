@@ -0,0 +1,61 @@
+"""
+Security events survive a full log queue, and a slow audit sink does not
+hold up the logging listener.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+
+from bot.audit import AuditHandler
+from bot.logging_config import _BoundedQueueHandler
+
+
+def _record(name: str, level: int, message: str) -> logging.LogRecord:
+    return logging.makeLogRecord({
+        "name": name, "levelno": level, "levelname": logging.getLevelName(level), "msg": message,
+    })
+
+
+def test_full_queue_drops_info_but_waits_for_security_info():
+    handler = _BoundedQueueHandler(queue.Queue(1), "drop_info")
+    handler.enqueue(_record("attendance.app", logging.INFO, "fills the queue"))
+
+    handler.enqueue(_record("attendance.app", logging.INFO, "dropped"))
+    assert handler.take_dropped() == 1
+
+    login = _record("attendance.security", logging.INFO, "action=login_success | ip=203.0.113.7")
+    waiter = threading.Thread(target=handler.enqueue, args=(login,))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()   # waiting for room, not dropped
+
+    assert handler.queue.get().getMessage() == "fills the queue"
+    waiter.join(5)
+    assert handler.queue.get() is login
+    assert handler.take_dropped() == 0
+
+
+def test_slow_sink_writes_off_the_listener_thread(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    handler = AuditHandler("jsonl", capacity=256, jsonl_path=str(path))
+    write = handler._write_jsonl
+    batches = []
+
+    def slow_write(events):
+        time.sleep(0.3)
+        batches.append(len(events))
+        write(events)
+    handler._write_jsonl = slow_write
+
+    started = time.perf_counter()
+    for n in range(50):
+        handler.handle(_record("attendance.security", logging.INFO, f"action=login_failed | ip=10.0.0.{n}"))
+    assert time.perf_counter() - started < 0.2
+
+    handler.close()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["ip"] for line in lines] == [f"10.0.0.{n}" for n in range(50)]
+    assert len(batches) < 50   # events that arrive during a write share the next one
@@ -0,0 +1,73 @@
+"""
+contact_handler reads the user through user_cache: a user who is already
+linked costs no users query, and the row is only loaded to change it.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PHONE = "9000000001"
+
+
+@pytest.fixture
+def bot_handlers(schema, monkeypatch):
+    from bot import handlers
+    from bot.database import SessionLocal
+    from bot.models import User
+
+    db = SessionLocal()
+    db.add(User(phone=PHONE, telegram_id=None, name=None, face_registered=0))
+    db.commit()
+    db.close()
+
+    replies = []
+    monkeypatch.setattr(handlers.bot, "send_message", lambda chat_id, text, **kw: replies.append(text))
+    monkeypatch.setattr(handlers.bot, "reply_to", lambda message, text, **kw: replies.append(text))
+    yield SimpleNamespace(module=handlers, replies=replies)
+
+    db = SessionLocal()
+    db.query(User).filter_by(phone=PHONE).delete()
+    db.commit()
+    db.close()
+    handlers.user_cache.invalidate()
+
+
+def _share_contact(bot_handlers, uid: int) -> str:
+    from bot.state import WaitPhone
+
+    bot_handlers.module.user_states.set(uid, WaitPhone(), 60)
+    message = SimpleNamespace(
+        from_user=SimpleNamespace(id=uid, first_name="Asha"),
+        contact=SimpleNamespace(user_id=uid, phone_number="+91 " + PHONE),
+        chat=SimpleNamespace(id=uid),
+    )
+    bot_handlers.module.contact_handler(message)
+    return bot_handlers.replies[-1]
+
+
+def test_linked_user_is_served_from_the_cache(bot_handlers):
+    from bot.database import SessionLocal
+    from bot.models import User
+
+    assert _share_contact(bot_handlers, 7001) == "Phone verified. Send live location."
+    db = SessionLocal()
+    assert db.query(User.telegram_id, User.name).filter_by(phone=PHONE).one() == ("7001", "Asha")
+    db.close()
+
+    _share_contact(bot_handlers, 7001)   # refills the cache after the relink
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        assert _share_contact(bot_handlers, 7001) == "Phone verified. Send live location."
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+    assert not [s for s in statements if "FROM users" in s or "UPDATE users" in s]
+
+
+def test_phone_linked_elsewhere_is_refused(bot_handlers):
+    _share_contact(bot_handlers, 7001)
+    assert _share_contact(bot_handlers, 7002) == "This phone is already linked to another Telegram account."
@@ -0,0 +1,52 @@
+"""
+GET /attendance/export streams: peak memory while exporting must not grow
+with the number of rows.
+
+The request is driven through the ASGI app by the `asgi` fixture, which only
+counts body bytes (TestClient would buffer the whole response), and Python
+heap peaks are taken with tracemalloc.
+"""
+
+import tracemalloc
+from datetime import date
+
+import pytest
+
+SMALL = (date(2001, 1, 1), range(100_001, 100_011), 100)        # 1k rows
+LARGE = (date(2002, 1, 1), range(200_001, 202_001), 100)        # 200k rows
+
+# Python heap allowed for a streamed export, whatever its size
+PEAK_BOUND_BYTES = 5 * 1024 * 1024
+
+
+def _export(asgi, start: date, days: int, fmt: str) -> tuple[int, int]:
+    """Run one export; returns (body bytes, tracemalloc peak)."""
+    end = date.fromordinal(start.toordinal() + days - 1)
+    tracemalloc.start()
+    try:
+        status, size = asgi("GET", "/attendance/export", query=f"from={start}&to={end}&format={fmt}")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert status == 200
+    return size, peak
+
+
+@pytest.fixture(scope="module")
+def exports_seeded(seed_attendance):
+    for start, users, days in (SMALL, LARGE):
+        seed_attendance(users, start, days)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_export_memory_is_flat(exports_seeded, asgi, fmt):
+    _export(asgi, SMALL[0], SMALL[2], fmt)   # first call: imports, compiled statements
+    small_size, small_peak = _export(asgi, SMALL[0], SMALL[2], fmt)
+    large_size, large_peak = _export(asgi, LARGE[0], LARGE[2], fmt)
+
+    assert large_size > 100 * small_size
+    # The large body is 20-45 MB; the heap only ever holds a fetch batch and a chunk of it
+    assert large_size > 3 * PEAK_BOUND_BYTES
+    assert large_peak < PEAK_BOUND_BYTES
+    # 200x the rows, well under 4x the memory
+    assert large_peak < 4 * small_peak
@@ -0,0 +1,37 @@
+"""
+Deleting a reference image drops its cached embedding and shifts the ones
+above it down, without tripping the (phone, ref_index, model_name) constraint.
+"""
+
+import bot.face as face
+from bot.database import SessionLocal
+from bot.models import FaceEmbedding
+
+
+def _rows(phone):
+    db = SessionLocal()
+    try:
+        return [
+            (row.ref_index, row.file_hash)
+            for row in db.query(FaceEmbedding).filter_by(phone=phone).order_by(FaceEmbedding.ref_index)
+        ]
+    finally:
+        db.close()
+
+
+def test_drop_reference_renumbers_the_rest(schema):
+    phone = "+10000000001"
+    db = SessionLocal()
+    # Inserted highest index first, so the primary-key flush order is the
+    # worst case for an in-place renumbering.
+    for index in (4, 3, 2, 1):
+        db.add(FaceEmbedding(
+            phone=phone, ref_index=index, file_hash=f"h{index}",
+            model_name=face.MODEL_NAME, vector=b"\0",
+        ))
+    db.commit()
+    db.close()
+
+    face.drop_reference_embeddings(phone, 2)
+
+    assert _rows(phone) == [(1, "h1"), (2, "h3"), (3, "h4")]
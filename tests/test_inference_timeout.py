@@ -0,0 +1,22 @@
+"""
+A verification that times out is cancelled, so the worker pool skips it
+instead of running it for nobody.
+"""
+
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pytest
+
+from bot.face import InferenceService
+
+
+def test_timed_out_verification_is_cancelled():
+    service = InferenceService(workers=0, queue_size=4)
+    service._started = True   # no dispatchers: the job stays queued
+
+    with pytest.raises(FutureTimeout):
+        service.verify("+10000000000", b"not an image", timeout=0.05)
+
+    future, *_ = service._queue.get_nowait()
+    assert future.cancelled()
+    assert not future.set_running_or_notify_cancel()   # what a dispatcher checks before running it
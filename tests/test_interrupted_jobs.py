@@ -0,0 +1,51 @@
+"""
+fail_interrupted_jobs() on API start-up fails only jobs whose owner process
+is gone (or that are past TEMP_FILE_MAX_AGE_HOURS) and only drops their
+staged files; other live workers' jobs are untouched.
+"""
+
+import os
+import subprocess
+import sys
+from datetime import timedelta
+
+from bot.config import UPLOAD_STAGING_DIR
+
+
+def test_only_stale_jobs_are_failed(schema):
+    from backend import jobs
+    from bot.database import SessionLocal
+    from bot.models import FaceJob
+
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    running = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    owners = {
+        "this-process": jobs.OWNER,
+        "live-worker": f"{jobs.HOST}:{running.pid}:live",
+        "other-host": "elsewhere:1:boot",
+        "dead-worker": f"{jobs.HOST}:{exited.pid}:dead",
+        "reused-pid": f"{jobs.HOST}:{os.getpid()}:previous-boot",
+        "legacy": None,
+    }
+    db = SessionLocal()
+    try:
+        for job_id, owner in owners.items():
+            db.add(FaceJob(id=job_id, kind="add_face", status=jobs.RUNNING, phone="1", owner=owner))
+        db.add(FaceJob(id="expired", kind="add_face", status=jobs.PENDING, phone="1",
+                       owner="elsewhere:1:boot", created_at=jobs._now() - timedelta(days=30)))
+        db.commit()
+        for job_id in (*owners, "expired"):
+            os.makedirs(os.path.join(UPLOAD_STAGING_DIR, job_id))
+
+        jobs.fail_interrupted_jobs()
+
+        statuses = {job.id: job.status for job in db.query(FaceJob)}
+    finally:
+        db.close()
+        running.kill()
+        running.wait()
+
+    failed = {"dead-worker", "reused-pid", "legacy", "expired"}
+    assert statuses == {job_id: jobs.FAILED if job_id in failed else jobs.RUNNING for job_id in statuses}
+    assert sorted(os.listdir(UPLOAD_STAGING_DIR)) == ["live-worker", "other-host", "this-process"]
@@ -0,0 +1,45 @@
+"""
+/login allows 5 failed attempts per IP per 5 minutes. Successful logins give
+their slot back, so a correct password never locks anyone out.
+"""
+
+import pytest
+
+from bot.rate_limiter import RateLimiter, SlidingWindowLimiter, SqliteRateLimiter
+
+
+def _logins(asgi, ip: str, passwords: list[str]) -> list[int]:
+    return [
+        asgi("POST", "/login", json_body={"username": "admin", "password": p}, token=False, client=(ip, 1))[0]
+        for p in passwords
+    ]
+
+
+def test_successful_logins_do_not_use_up_the_limit(asgi):
+    assert _logins(asgi, "198.51.100.1", ["admin"] * 12) == [200] * 12
+
+
+def test_failed_logins_are_limited(asgi):
+    statuses = _logins(asgi, "198.51.100.2", ["wrong"] * 5 + ["wrong", "admin"])
+    assert statuses == [401] * 5 + [429, 429]
+
+
+def test_successes_between_failures_do_not_count(asgi):
+    statuses = _logins(asgi, "198.51.100.3", ["wrong", "admin"] * 4 + ["wrong", "wrong"])
+    assert statuses == [401, 200] * 4 + [401, 429]
+
+
+@pytest.mark.parametrize("build", [
+    lambda tmp: RateLimiter(3, 300),
+    lambda tmp: SlidingWindowLimiter(3, 300),
+    lambda tmp: SqliteRateLimiter(str(tmp / "limits.db"), "refund", 3, 300),
+], ids=["exact", "sliding", "sqlite"])
+def test_refund_gives_a_hit_back(tmp_path, build):
+    limiter = build(tmp_path)
+    assert all(limiter.hit("k") for _ in range(3))
+    assert not limiter.hit("k")
+    limiter.refund("k")
+    assert limiter.hit("k")
+    assert not limiter.hit("k")
+    limiter.refund("unknown")   # no-op
+    assert limiter.remaining("unknown") == 3
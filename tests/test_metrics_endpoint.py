@@ -0,0 +1,34 @@
+"""
+The admin API's /metrics is never public, and the per-request metrics
+reuse their series instead of creating one per request.
+"""
+
+import backend.api as api
+
+
+def test_metrics_requires_a_token(asgi, monkeypatch):
+    monkeypatch.setattr(api, "METRICS_TOKEN", "")
+    assert asgi("GET", "/metrics", token=False)[0] in (401, 403)
+    assert asgi("GET", "/metrics")[0] == 200   # admin token
+
+
+def test_metrics_accepts_the_scrape_token(monkeypatch):
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    monkeypatch.setattr(api, "METRICS_TOKEN", "scrape-secret")
+    response = api.metrics(HTTPAuthorizationCredentials(scheme="Bearer", credentials="scrape-secret"))
+    assert response.status_code == 200
+
+
+def test_request_series_are_reused(asgi, schema, monkeypatch):
+    created = []
+    new_series = api.REQUEST_SECONDS._new_series
+
+    def counting():
+        created.append(1)
+        return new_series()
+    monkeypatch.setattr(api.REQUEST_SECONDS, "_new_series", counting)
+
+    for _ in range(5):
+        assert asgi("GET", "/users", query="limit=1")[0] == 200
+    assert len(created) <= 1
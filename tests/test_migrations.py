@@ -0,0 +1,81 @@
+"""
+Migrations bring both a pre-migrations database and an empty one to the
+schema bot.models declares.
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, inspect
+
+# attendance as created by create_all before versioned migrations existed
+LEGACY_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL, telegram_id VARCHAR, phone VARCHAR NOT NULL, name VARCHAR,
+    face_registered INTEGER, PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_users_phone ON users (phone);
+CREATE UNIQUE INDEX ix_users_telegram_id ON users (telegram_id);
+CREATE TABLE used_photos (
+    id INTEGER NOT NULL, file_unique_id VARCHAR NOT NULL, user_id INTEGER, used_at DATETIME NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE SET NULL
+);
+CREATE UNIQUE INDEX ix_used_photos_file_unique_id ON used_photos (file_unique_id);
+CREATE INDEX ix_used_photos_id ON used_photos (id);
+CREATE INDEX ix_used_photos_user_id ON used_photos (user_id);
+CREATE TABLE attendance (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, check_in DATETIME NOT NULL, check_out DATETIME,
+    lat FLOAT, lon FLOAT, date DATE NOT NULL, PRIMARY KEY (id),
+    CONSTRAINT uq_user_date UNIQUE (user_id, date),
+    FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_attendance_date ON attendance (date);
+CREATE INDEX ix_attendance_user_id ON attendance (user_id);
+CREATE INDEX ix_attendance_checkin ON attendance (check_in);
+"""
+
+
+def _migrate(path) -> None:
+    subprocess.run(
+        [sys.executable, "-c", "from bot.migrations import upgrade; upgrade()"],
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+        check=True, capture_output=True,
+    )
+
+
+def _schema(url: str) -> dict:
+    """{table: (columns, {index name: columns})}, ignoring SQLite's own autoindexes."""
+    inspector = inspect(create_engine(url))
+    return {
+        table: (
+            sorted(c["name"] for c in inspector.get_columns(table)),
+            {ix["name"]: ix["column_names"] for ix in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names() if table != "schema_version"
+    }
+
+
+def test_legacy_checkin_index_is_rebuilt(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+
+    _migrate(path)
+
+    indexes = _schema(f"sqlite:///{path}")["attendance"][1]
+    assert indexes["ix_attendance_checkin"] == ["check_in", "id"]
+    assert indexes["ix_attendance_user_checkin"] == ["user_id", "check_in", "id"]
+
+
+def test_fresh_database_matches_models(tmp_path):
+    from bot.database import Base
+    import bot.models  # noqa: F401
+
+    _migrate(tmp_path / "migrated.db")
+    declared = create_engine(f"sqlite:///{tmp_path / 'declared.db'}")
+    Base.metadata.create_all(declared)
+
+    assert _schema(f"sqlite:///{tmp_path / 'migrated.db'}") == _schema(f"sqlite:///{tmp_path / 'declared.db'}")
@@ -0,0 +1,129 @@
+"""
+The hot attendance queries are served by the v0002 indexes.
+
+Each case runs the real code path, captures the SQL it sends, and checks
+SQLite's EXPLAIN QUERY PLAN for the statement on the given table names the
+expected index (rather than a full scan).
+"""
+
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PLAN_USERS = range(300_001, 300_051)
+PLAN_START = date(2003, 1, 1)
+
+
+@contextmanager
+def _captured():
+    """Collect (statement, parameters) sent by any engine, sync or async."""
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+
+
+def _plan(engine, statement: str, parameters) -> str:
+    raw = engine.raw_connection()
+    try:
+        rows = raw.cursor().execute("EXPLAIN QUERY PLAN " + statement, parameters or ()).fetchall()
+    finally:
+        raw.close()
+    return "\n".join(row[-1] for row in rows)
+
+
+def _plans_for(engine, statements, table: str) -> list[str]:
+    """Plans of the SELECTs in `statements` that read `table`."""
+    plans = [
+        _plan(engine, statement, parameters)
+        for statement, parameters in statements
+        if statement.lstrip().upper().startswith("SELECT") and f"FROM {table}" in statement
+    ]
+    assert plans, f"no SELECT on {table} was captured"
+    return plans
+
+
+def _get(asgi, path: str) -> None:
+    path, _, query = path.partition("?")
+    status, _ = asgi("GET", path, query=query)
+    assert status == 200, path
+
+
+@pytest.fixture(scope="module")
+def plan_db(schema, seed_attendance):
+    seed_attendance(PLAN_USERS, PLAN_START, 30)
+    return schema
+
+
+def _run_sync(fn):
+    from bot.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return fn(db)
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_attendance_listing_uses_checkin_index(plan_db, asgi):
+    with _captured() as statements:
+        _get(asgi, "/attendance?limit=50")
+        _get(asgi, "/attendance?limit=50&order=asc")
+    for plan in _plans_for(plan_db, statements, "attendance"):
+        assert "ix_attendance_checkin" in plan, plan
+
+
+def test_user_history_uses_user_checkin_index(plan_db, asgi):
+    with _captured() as statements:
+        _get(asgi, f"/users/{PLAN_USERS[0]}/attendance?limit=50")
+        _get(asgi, f"/users/{PLAN_USERS[0]}/attendance?limit=50&order=asc")
+    for plan in _plans_for(plan_db, statements, "attendance"):
+        assert "ix_attendance_user_checkin" in plan, plan
+
+
+def test_date_range_queries_use_date_index(plan_db, asgi):
+    """The rollup rebuild behind /dashboard and /reports/daily, and the export."""
+    from bot.rollup import rebuild
+
+    with _captured() as statements:
+        _run_sync(lambda db: rebuild(db, date(2003, 1, 10), date(2003, 1, 12)))
+        _get(asgi, "/attendance/export?from=2003-01-10&to=2003-01-12&format=csv")
+    for plan in _plans_for(plan_db, statements, "attendance"):
+        assert "ix_attendance_date" in plan, plan
+
+
+def test_checkout_searches_user_date(plan_db):
+    """
+    PostgreSQL reads the open row through the smaller partial ix_attendance_open;
+    SQLite prefers uq_user_date's index on the same (user_id, date) key. Either
+    way it is a single-row index search, never a scan.
+    """
+    from sqlalchemy import inspect
+
+    from bot.handlers import _record_checkout
+
+    assert "ix_attendance_open" in {ix["name"] for ix in inspect(plan_db).get_indexes("attendance")}
+    with _captured() as statements:
+        _run_sync(lambda db: _record_checkout(db, PLAN_USERS[0]))
+    for plan in _plans_for(plan_db, statements, "attendance"):
+        assert plan.startswith("SEARCH attendance USING INDEX"), plan
+        assert "(user_id=? AND date=?)" in plan, plan
+
+
+def test_used_photo_cleanup_uses_used_at_index(plan_db):
+    from bot.scheduler import purge_used_photos
+
+    with _captured() as statements:
+        purge_used_photos()
+    for plan in _plans_for(plan_db, statements, "used_photos"):
+        assert "ix_used_photos_used_at" in plan, plan
@@ -0,0 +1,42 @@
+"""
+RATE_LIMIT_ENGINE=sqlite: login_limiter holds across processes. Several
+spawned processes share one limiter database and hit the same key at once;
+exactly max_attempts hits are admitted in total.
+"""
+
+import multiprocessing
+import os
+
+PROCESSES = 4
+HITS_PER_PROCESS = 20
+
+
+def _hammer(db_path: str, start, admitted) -> None:
+    os.environ["RATE_LIMIT_ENGINE"] = "sqlite"
+    os.environ["RATE_LIMIT_DB_PATH"] = db_path
+    from bot.rate_limiter import SqliteRateLimiter, login_limiter
+
+    assert isinstance(login_limiter, SqliteRateLimiter)
+    start.wait()   # every process has its limiter open before anyone hits
+    count = sum(login_limiter.hit("203.0.113.7") for _ in range(HITS_PER_PROCESS))
+    with admitted.get_lock():
+        admitted.value += count
+
+
+def test_login_limit_is_global_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Barrier(PROCESSES)
+    admitted = ctx.Value("i", 0)
+    db_path = str(tmp_path / "rate_limits.db")
+    workers = [ctx.Process(target=_hammer, args=(db_path, start, admitted)) for _ in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    from bot.rate_limiter import SqliteRateLimiter
+
+    limiter = SqliteRateLimiter(db_path, "login", max_attempts=5, window_seconds=300)
+    assert admitted.value == limiter.max_attempts
+    assert not limiter.is_allowed("203.0.113.7")
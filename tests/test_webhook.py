@@ -0,0 +1,138 @@
+"""
+Webhook mode against a fake Telegram Bot API server: bot.main only registers
+the webhook when the admin API serves it, and an update posted with the
+secret reaches the handlers, whose reply lands on the fake server.
+"""
+
+import asyncio
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+import telebot.apihelper
+from fastapi import FastAPI
+
+SECRET = "test-webhook-secret"
+
+
+class _FakeTelegram(BaseHTTPRequestHandler):
+    calls: queue.Queue
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        params = dict(parse_qsl(url.query))
+        params.update(parse_qsl(self.rfile.read(length).decode()))
+        method = url.path.rsplit("/", 1)[-1]
+        self.calls.put((method, params))
+
+        result = True
+        if method == "sendMessage":
+            result = {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}}
+        body = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST   # telebot sends parameter-only calls as GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """Fake Bot API server; yields the queue of (method, params) it received."""
+    calls: queue.Queue = queue.Queue()
+    handler = type("Handler", (_FakeTelegram,), {"calls": calls})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(telebot.apihelper, "API_URL", base + "/bot{0}/{1}")
+
+    from bot import webhook
+    monkeypatch.setattr(webhook, "WEBHOOK_URL", "https://bot.example.com/")
+    monkeypatch.setattr(webhook, "WEBHOOK_SECRET", SECRET)
+    yield calls
+    server.shutdown()
+    server.server_close()
+
+
+def _post_update(app, update: dict, secret: str) -> int:
+    body = json.dumps(update).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/telegram/webhook",
+        "raw_path": b"/telegram/webhook", "root_path": "", "query_string": b"",
+        "headers": [
+            (b"host", b"test"),
+            (b"content-type", b"application/json"),
+            (b"x-telegram-bot-api-secret-token", secret.encode()),
+        ],
+        "client": ("149.154.160.1", 1), "server": ("test", 80),
+    }
+    status = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.Event().wait()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    asyncio.run(app(scope, receive, send))
+    return status[0]
+
+
+def test_main_only_registers_when_the_api_serves_updates(schema, telegram, monkeypatch):
+    from bot import main
+
+    started = []
+    monkeypatch.setattr(main, "BOT_MODE", "webhook")
+    monkeypatch.setattr(main, "WEBHOOK_IN_API", True)
+    monkeypatch.setattr(main.scheduler, "start", lambda: started.append("scheduler"))
+    monkeypatch.setattr(main.inference, "start", lambda: started.append("inference"))
+    monkeypatch.setattr(main.metrics, "serve", lambda *a: started.append("metrics"))
+
+    main.main()
+
+    method, params = telegram.get(timeout=5)
+    assert method == "setWebhook"
+    assert params["url"] == "https://bot.example.com/telegram/webhook"
+    assert params["secret_token"] == SECRET
+    assert started == []
+
+
+def test_update_is_handled_and_answered(telegram):
+    from bot import webhook
+
+    app = FastAPI()
+    app.include_router(webhook.router)
+    update = {
+        "update_id": 910001,
+        "message": {
+            "message_id": 5, "date": 0, "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            "chat": {"id": 4242, "type": "private"},
+            "from": {"id": 4242, "is_bot": False, "first_name": "Asha"},
+        },
+    }
+
+    assert _post_update(app, update, "wrong-secret") == 403
+    assert _post_update(app, update, SECRET) == 200
+
+    method, params = telegram.get(timeout=5)
+    assert method == "sendMessage"
+    assert str(params["chat_id"]) == "4242"
+    assert params["text"].startswith("Welcome to Attendance Bot")